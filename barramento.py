@@ -1,116 +1,534 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
+from array import array
+from contextlib import ExitStack, nullcontext
 from ram import RAM
-from colors import color
 from moesi import Estado
-import logging
+from diretorio import Diretorio
+from registro import TRANSICOES
+from estatisticas import ContadoresBarramento, MatrizTransicoes
+from temporizacao import Relogio
+from protocolo import Protocolo
+from historico import EscritorHistorico, TipoTransacao
+import registro
+import threading
 
 # Permite que o editor entenda o que é o Cache sem importar
 if TYPE_CHECKING:
     from cache import Cache
+    from linha import LinhaCache
+    from llc import CacheCompartilhada
+    from topologia import Topologia
+
+# Bloco transferido pelo barramento: (palavras, autor de cada palavra), só leitura para quem o recebe
+Bloco = tuple[array, array]
+
+# Trava vazia usada fora do modo concorrente (sem custo de sincronização)
+SEM_TRAVA = nullcontext()
 
 class Barramento():
-    def __init__ (self, ram: RAM):
-        """ Inicializa o barramento de dados """
+    def __init__ (self, ram: RAM, diretorio: Diretorio | None = None, tamanho_bloco: int = 1,
+                  concorrente: bool = False, relogio: Relogio | None = None, protocolo: Protocolo | None = None,
+                  llc: CacheCompartilhada | None = None, topologia: Topologia | None = None):
+        """
+        Inicializa o barramento de dados.
+        Sem *diretorio*, toda requisição é difundida (broadcast) para todas as caches.
+        Com *diretorio*, apenas as caches que possuem a linha são consultadas.
+        Cada transação move um bloco inteiro de *tamanho_bloco* palavras.
+        No modo *concorrente*, as transações são serializadas pelo árbitro, que quem
+        inicia a transação (cache ou leilão) adquire antes de chamar o barramento;
+        a linha de outra cache só é observada com a trava do seu conjunto.
+        Ordem das travas: item -> árbitro -> conjunto.
+        O *relogio* acumula os ciclos de cada transação na conta do processador requisitante.
+        As transições de estado seguem a tabela do *protocolo* (MOESI por padrão).
+        Com uma *llc*, os blocos que nenhuma cache fornece e os write-backs passam por ela antes da RAM.
+        Com uma *topologia* em clusters, cada transação fica no barramento local da requisitante
+        e só consulta os outros clusters quando precisa.
+        """
         self.ram : RAM = ram # conecta o barramento à Memoria Principal
+        self.tamanho_bloco : int = tamanho_bloco
+        self.sem_autores : array = array("q", [-1]) * tamanho_bloco # autores de um bloco vindo da RAM (só leitura)
         self.caches : list[Cache] = [] # lista de caches conectadas ao barramento
+        self.caches_por_id : dict[int, Cache] = {}
+        self.diretorio : Diretorio | None = diretorio
+        self.contadores : ContadoresBarramento = ContadoresBarramento()
+        self.transicoes : MatrizTransicoes = MatrizTransicoes() # compartilhada por todas as caches
+        self.write_backs_por_endereco : dict[int, int] = {}
+        self.indice_donos : dict[int, int] = {} # início do bloco -> cache que o tem sujo (M ou O), mantido por Cache.mudar_estado
+        self.autores_ram : dict[int, int] = {} # endereço -> autor da palavra gravada na RAM por write-back
+        self.pendentes : dict[int, int] = {} # início do bloco -> cache com escritas dele no buffer de escrita
+        self.protocolo : Protocolo = protocolo if protocolo is not None else Protocolo()
+        self.historico : EscritorHistorico | None = None # histórico binário das transações, se ligado
+        self.concorrente : bool = concorrente
+        self.arbitro = threading.Lock() if concorrente else SEM_TRAVA
+        self.relogio : Relogio = relogio if relogio is not None else Relogio()
+        self.llc : CacheCompartilhada | None = llc
+        if llc is not None:
+            llc.invalidar_copias = self.invalidar_copias
+        self.topologia : Topologia | None = topologia
     
-    def log(self, msg: str) -> None:
-        """ Função de log para o barramento """
-        print(color(f"[Barramento] {msg}", "barramento"))
-        logging.info(f"[Barramento] {msg}")
+    def log(self, msg: str, *args, nivel: int = TRANSICOES) -> None:
+        """ Função de log para o barramento, formatada apenas se o *nivel* estiver ativo """
+        if nivel <= registro.nivel:
+            registro.registrar(nivel, "barramento", "[Barramento] " + msg, *args)
 
-    def colocar_cache(self, cache : Cache):
-        """ Conecta uma cache ao barramento """
+    def colocar_cache(self, cache : Cache, cluster : int | None = None):
+        """ Conecta uma cache ao barramento (ao barramento local do *cluster*, se houver topologia) """
         from cache import Cache
         if isinstance(cache, Cache):
             self.caches.append(cache)
+            self.caches_por_id[cache.id] = cache
+            if self.topologia is not None:
+                self.topologia.conectar(cache, cluster)
+
+    def _candidatos(self, endereco : int, leitura : bool) -> list[Cache]:
+        """
+        Caches que precisam observar (snoop) a requisição do *endereco*.
+        No modo broadcast são todas; no modo diretório, apenas as registradas para o endereço.
+        """
+        if self.diretorio is None:
+            return self.caches
+        return [self.caches_por_id[id_cache] for id_cache in self.diretorio.consultar(endereco, leitura)]
+
+    def _grupos(self, inicio : int, id_requisitante : int | None, leitura : bool) -> Iterable[list[Cache]]:
+        """
+        Caches que observam a transação, por barramento: sem topologia, um único grupo com as candidatas;
+        com clusters, o grupo local e, se quem percorre pedir, o dos outros clusters.
+        """
+        if self.topologia is None:
+            return (self._candidatos(inicio, leitura),)
+        return self.topologia.grupos(self, inicio, id_requisitante, leitura)
+
+    def inicio_bloco(self, endereco : int) -> int:
+        """ Endereço da primeira palavra do bloco que contém o *endereco*. """
+        return endereco - endereco % self.tamanho_bloco
+
+    def bloco_da_linha(self, linha : LinhaCache) -> Bloco:
+        """
+        Bloco de uma linha, para ser entregue a outra cache. Não é copiado aqui:
+        a requisitante o copia para a sua própria linha, ainda dentro da transação.
+        """
+        return linha.dados, linha.autores
+
+    def drenar_pendentes(self, inicio : int, id_requisitante : int | None = None) -> None:
+        """
+        Antes de uma transação no bloco em *inicio*, drena o buffer de escrita da cache que tem
+        escritas pendentes nele (se não for a própria requisitante). Exige o árbitro adquirido.
+        """
+        dona = self.pendentes.get(inicio)
+        if dona is not None and dona != id_requisitante:
+            self.caches_por_id[dona].drenar_buffer()
+
+    def ler_bloco_memoria(self, inicio : int, entregar : bool = True) -> tuple[Bloco | None, int]:
+        """
+        Lê o bloco que começa em *inicio* da LLC, se houver, ou da RAM (as palavras ainda não têm autor, -1).
+        Sem *entregar*, uma LLC exclusiva mantém o bloco até saber se ele vai mesmo para a requisitante.
+        Retorna o bloco (None se o endereço for inválido) e os ciclos gastos.
+        """
+        if self.llc is not None:
+            return self.llc.ler_bloco(inicio, entregar)
+        dados = self.ram.ler_bloco(inicio, self.tamanho_bloco)
+        if dados is None:
+            return None, self.relogio.latencias.ram_leitura
+        return (dados, self.sem_autores), self.relogio.latencias.ram_leitura
+
+    def ler_memoria(self, endereco : int) -> int | None:
+        """ Palavra do *endereco* fora das caches privadas: a da LLC, se ela tiver o bloco, senão a da RAM. """
+        if self.llc is not None:
+            valor = self.llc.ler(endereco)
+            if valor is not None:
+                return valor
+        return self.ram.ler(endereco)
+
+    def write_back(self, endereco : int, dados : array, id_processador : int | None = None,
+                   autores : array | None = None) -> None:
+        """
+        Escreve na RAM (ou na LLC, se houver) o bloco de uma linha suja gravada pela cache *id_processador*.
+        Os *autores* das palavras escritas por processadores ficam guardados junto da RAM.
+        """
+        if autores is not None:
+            for deslocamento, autor in enumerate(autores):
+                if autor >= 0:
+                    self.autores_ram[endereco + deslocamento] = autor
+        self.contadores.write_backs += 1
+        self.write_backs_por_endereco[endereco] = self.write_backs_por_endereco.get(endereco, 0) + 1
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.WRITE_BACK, id_processador, endereco)
+        if self.llc is not None:
+            self.relogio.cobrar(id_processador, self.llc.escrever_bloco(endereco, dados, autores))
+            return
+        self.relogio.cobrar(id_processador, self.relogio.latencias.write_back)
+        self.ram.escrever_bloco(endereco, dados)
+
+    def vitima_limpa(self, endereco : int, dados : array, autores : array, id_processador : int) -> None:
+        """ Linha limpa substituída na cache *id_processador*: uma LLC exclusiva a guarda como vítima. """
+        if self.llc is not None:
+            self.relogio.cobrar(id_processador, self.llc.receber_vitima(endereco, dados, autores))
+
+    def invalidar_copias(self, inicio : int) -> int:
+        """
+        Back-invalidation da LLC inclusiva: invalida as cópias privadas do bloco em *inicio*,
+        com write-back das sujas. Retorna quantas cópias foram invalidadas.
+        """
+        copias = 0
+        for cache in self._caches_externas(inicio):
+            with cache.trava(inicio):
+                linha = cache.buscar_linha(inicio)
+                if linha and linha.estado != Estado.INVALID:
+                    if linha.estado in self.protocolo.sujos:
+                        cache.write_back(inicio, linha.dados, linha.autores)
+                    cache.mudar_estado(linha, Estado.INVALID)
+                    copias += 1
+                    self.registrar_remocao(inicio, cache.id)
+        if copias:
+            self.log('LLC substituiu o bloco %d: %d cópia(s) invalidada(s).', inicio, copias)
+        return copias
+
+    def escrita_externa(self, endereco : int, valor : int) -> None:
+        """
+        Escrita na RAM feita fora das caches (ex.: cadastro de um item).
+        Cópias do bloco são invalidadas antes, com write-back das sujas, para nenhuma cache ficar desatualizada.
+        """
+        inicio = self.inicio_bloco(endereco)
+        self.drenar_pendentes(inicio)
+        copias = 0
+        for cache in self._caches_externas(inicio):
+            with cache.trava(inicio):
+                linha = cache.buscar_linha(inicio)
+                if linha and linha.estado != Estado.INVALID:
+                    if linha.estado in self.protocolo.sujos:
+                        cache.write_back(inicio, linha.dados, linha.autores)
+                    cache.mudar_estado(linha, Estado.INVALID)
+                    copias += 1
+                    self.contadores.invalidacoes += 1
+                    self.relogio.cobrar(None, self.relogio.latencias.invalidacao)
+                    self.registrar_remocao(inicio, cache.id)
+        self.relogio.cobrar(None, self.relogio.latencias.ram_escrita)
+        self.autores_ram.pop(endereco, None)
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.ESCRITA_EXTERNA, None, endereco, valor=valor, copias=copias)
+        if self.llc is not None:
+            self.llc.escrever_palavra(endereco, valor)
+        self.ram.escrever(endereco, valor)
 
+    def _caches_externas(self, inicio : int) -> list[Cache]:
+        """ Caches a invalidar numa operação sem processador requisitante; depois dela, nenhuma tem o bloco. """
+        caches = [cache for grupo in self._grupos(inicio, None, leitura=False) for cache in grupo]
+        if self.topologia is not None:
+            self.topologia.esquecer(inicio)
+        return caches
 
+    def registrar_remocao(self, endereco : int, id_cache : int) -> None:
+        """ Avisa o diretório (se houver) que a cache *id_cache* descartou a linha do *endereco*. """
+        if self.diretorio is not None:
+            self.diretorio.remover(endereco, id_cache)
 
-    def solicitar_leitura(self, endereco : int, id_requisitante : int) -> tuple[int | None, Estado]:
+    def solicitar_leitura(self, endereco : int, id_requisitante : int) -> tuple[Bloco | None, Estado]:
         """
         Acontece quando uma ocorre uma READ MISS na cache, isto é, a cache requisitante não possui o dado.
-        O barramento verifica se as outras caches possuem o dado
+        O barramento verifica se as outras caches possuem o dado.
+        Retorna o bloco (só leitura) que contém o *endereco* e o estado em que a requisitante deve ficar.
         """
 
-        self.log(f'Processador {id_requisitante} pede LEITURA do endereço {endereco}.')
+        inicio = self.inicio_bloco(endereco)
+        self.log('Processador %d pede LEITURA do endereço %d.', id_requisitante, endereco)
+        self.contadores.bus_rd += 1
+        latencias = self.relogio.latencias
+        ciclos = latencias.barramento
 
-        dado_encontrado = None
-        outra_cache_tem = False
+        protocolo = self.protocolo
+        linha_fornecedora = None
+        fornecedor = None # cache que entregou o bloco (None = RAM)
+        copias = 0
+        dono = None # cache que segue respondendo pelas leituras da linha, usada pelo diretório
+
+        for remoto, grupo in enumerate(self._grupos(inicio, id_requisitante, leitura=True)):
+            if remoto:
+                ciclos += latencias.entre_clusters # nenhuma cache do cluster forneceu: a busca sai dele
+            for cache in grupo:
+                if cache.id == id_requisitante:
+                    continue # pula a cache requisitante
+
+                with cache.trava(inicio):
+                    linha = cache.buscar_linha(inicio)
 
-        for cache in self.caches:
-            if cache.id == id_requisitante:
-                continue # pula a cache requisitante
-
-            linha = cache.buscar_linha(endereco)
-
-            # verificando se a linha existe e não está inválida
-            if linha and linha.estado != Estado.INVALID:
-                dado_encontrado = linha.dado
-                outra_cache_tem = True # indica que outra cache possui o dado
-                estado_anterior = linha.estado
-
-                # Outra cache tinha o dado modificado exclusivo (M)
-                if estado_anterior == Estado.MODIFIED:
-                    # Agora ela é OWNED, pois vai compartilhar o dado e se responsabilizar pela sua atualização na RAM
-                    linha.estado = Estado.OWNED
-                    self.log(f'Cache {cache.id} (M->O): Forneceu dado modificado')
-
-                # Outra cache tinha o dado limpo exclusivo (E)
-                elif estado_anterior == Estado.EXCLUSIVE:
-                    # Vai compartilhar o dado, então passa a ser SHARED
-                    linha.estado = Estado.SHARED
-                    self.log(f'Cache {cache.id} (E->S): Forneceu dado exclusivo limpo')
-
-                # Outra cache tinha dado modificado compartilhado (O)
-                elif estado_anterior == Estado.OWNED:
-                    # Continua sendo OWNED, pois já estava compartilhado
-                    self.log(f'Cache {cache.id} (O->O): Forneceu dado compartilhado modificado')
-                
-                # Outra cache tinha dado compartilhado (S)
-                elif estado_anterior == Estado.SHARED:
-                    # Continua sendo SHARED, pois já estava compartilhado
-                    self.log(f'Cache {cache.id} (S->S): Forneceu dado compartilhado')
-
-        if outra_cache_tem:
-            return dado_encontrado, Estado.SHARED
+                    # verificando se a linha existe e não está inválida
+                    if linha and linha.estado != Estado.INVALID:
+                        copias += 1 # indica que outra cache possui o dado
+                        estado_anterior = linha.estado
+                        transicao = protocolo.bus_rd[estado_anterior]
+
+                        if transicao.fornece:
+                            linha_fornecedora = linha
+                            fornecedor = cache.id
+                        if transicao.write_back:
+                            # Sem OWNED, o bloco modificado só pode ser compartilhado depois de gravado na RAM
+                            cache.write_back(inicio, linha.dados, linha.autores)
+                        if transicao.proximo != estado_anterior:
+                            cache.mudar_estado(linha, transicao.proximo)
+                        if transicao.proximo in protocolo.donos:
+                            dono = cache.id
+                        self.log('Cache %d (%s->%s)%s', cache.id, estado_anterior.sigla, transicao.proximo.sigla,
+                                 ': forneceu o dado' if transicao.fornece else '')
+            if linha_fornecedora is not None:
+                # Uma cache do cluster já forneceu o bloco: a leitura não precisa observar os outros clusters
+                # (uma cópia em O lá fora continua dona e responde pelo write-back)
+                break
+
+        if linha_fornecedora is not None:
+            self.contadores.transferencias_cache += 1
+            self.relogio.cobrar(id_requisitante, ciclos + latencias.transferencia)
+            bloco = self.bloco_da_linha(linha_fornecedora) # bloco para a requisitante
         else:
-            dado = self.ram.ler(endereco)
-            self.log(f'Nenhuma outra cache possui o dado. Lido da RAM: {dado}')
-            return dado, Estado.EXCLUSIVE
+            # Ninguém tem o dado, ou as cópias limpas não respondem: o bloco vem da LLC ou da RAM
+            self.contadores.leituras_ram += 1
+            bloco, custo = self.ler_bloco_memoria(inicio)
+            self.relogio.cobrar(id_requisitante, ciclos + custo)
+            if bloco is None:
+                return None, Estado.INVALID # endereço fora da RAM
+            self.log('Dado lido da RAM: %s', bloco[0][endereco - inicio])
+
+        novo_estado = protocolo.carga_compartilhada if copias else protocolo.carga_exclusiva
+        if novo_estado in protocolo.donos:
+            dono = id_requisitante
+        if self.diretorio is not None:
+            self.diretorio.registrar_leitura(inicio, id_requisitante, dono)
+        if self.topologia is not None:
+            self.topologia.registrar_leitura(inicio, id_requisitante, fornecedor)
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.BUS_RD, id_requisitante, endereco, fornecedor,
+                                     bloco[0][endereco - inicio], copias, novo_estado,
+                                     linha_fornecedora.estado if linha_fornecedora is not None else None)
+        return bloco, novo_estado
         
-    def solicitar_escrita(self, endereco : int, id_requisitante : int) -> int | None:
+    def solicitar_prebusca(self, inicio : int, id_requisitante : int) -> Bloco | None:
+        """
+        Leitura especulativa (pré-busca) do bloco em *inicio*, que a requisitante guarda em SHARED.
+        Não muda o estado de nenhuma outra cache: se alguma tem o bloco num estado que escreve sem o
+        barramento (protocolo.exclusivos: M e E), a pré-busca é cancelada, sem tirar dela a
+        exclusividade, e retorna None.
+        O bloco vem da cache que já responde pelas leituras (O ou F), ou da LLC/RAM.
+        Os ciclos não são cobrados da requisitante, pois a pré-busca não a faz esperar.
+        """
+        self.log('Processador %d pede PRÉ-BUSCA do endereço %d.', id_requisitante, inicio)
+        self.contadores.bus_prebusca += 1
+        latencias = self.relogio.latencias
+        ciclos = latencias.barramento
+
+        linha_fornecedora = None
+        fornecedor = None
+        copias = 0
+        dono = None
+        for remoto, grupo in enumerate(self._grupos(inicio, id_requisitante, leitura=True)):
+            if remoto:
+                ciclos += latencias.entre_clusters
+            for cache in grupo:
+                if cache.id == id_requisitante:
+                    continue
+
+                with cache.trava(inicio):
+                    linha = cache.buscar_linha(inicio)
+                    if not linha or linha.estado == Estado.INVALID:
+                        continue
+                    if linha.estado in self.protocolo.exclusivos:
+                        self.log('Pré-busca cancelada: cache %d tem o bloco em %s.', cache.id, linha.estado.sigla)
+                        self.relogio.cobrar(None, ciclos)
+                        if self.historico is not None:
+                            self.historico.registrar(TipoTransacao.PREBUSCA, id_requisitante, inicio, None, 0, copias,
+                                                     None, linha.estado)
+                        return None
+                    copias += 1
+                    if self.protocolo.bus_rd[linha.estado].fornece:
+                        linha_fornecedora = linha
+                        fornecedor = cache.id
+                    if linha.estado in self.protocolo.donos:
+                        dono = cache.id
+            if linha_fornecedora is not None:
+                break
+
+        if linha_fornecedora is not None:
+            self.contadores.transferencias_cache += 1
+            self.relogio.cobrar(None, ciclos + latencias.transferencia)
+            bloco = self.bloco_da_linha(linha_fornecedora)
+        else:
+            self.contadores.leituras_ram += 1
+            bloco, custo = self.ler_bloco_memoria(inicio)
+            self.relogio.cobrar(None, ciclos + custo)
+            if bloco is None:
+                return None
+
+        if self.diretorio is not None:
+            self.diretorio.registrar_leitura(inicio, id_requisitante, dono)
+        if self.topologia is not None:
+            self.topologia.registrar_leitura(inicio, id_requisitante, fornecedor)
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.PREBUSCA, id_requisitante, inicio, fornecedor, bloco[0][0], copias,
+                                     Estado.SHARED, linha_fornecedora.estado if linha_fornecedora is not None else None)
+        return bloco
+
+    def solicitar_escrita(self, endereco : int, id_requisitante : int, upgrade : bool = False,
+                          valor : int = 0) -> Bloco | None:
         """
         Acontece quando ocorre uma WRITE MISS ou WRITE HIT em linha *SHARED* na cache requisitante.
         Dessa forma, garante que todas as outras caches invalidem suas cópias do dado.
         A cache requisitante ficará com o dado em estado *MODIFIED*.
+        No *upgrade* (WRITE HIT em S ou O) a requisitante já tem o dado, então a RAM não é lida.
+        O *valor* que será escrito só é usado no histórico.
+        Retorna o bloco atual, só leitura (None no upgrade ou se o endereço for inválido).
         """
 
-        self.log(f'Processador {id_requisitante} pede ESCRITA do endereço {endereco}.')
+        inicio = self.inicio_bloco(endereco)
+        deslocamento = endereco - inicio
+        self.log('Processador %d pede ESCRITA do endereço %d.', id_requisitante, endereco)
+        if upgrade:
+            self.contadores.bus_upgr += 1
+        else:
+            self.contadores.bus_rdx += 1
+        latencias = self.relogio.latencias
+        ciclos = latencias.barramento
 
         dado_encontrado = None
         outra_cache_tem = False
+        fornecedor = None
+        copias = 0
+
+        copias_remotas = 0
+        for remoto, grupo in enumerate(self._grupos(inicio, id_requisitante, leitura=False)):
+            if remoto:
+                ciclos += latencias.entre_clusters # outros clusters têm cópias a invalidar
+            for cache in grupo:
+                if cache.id == id_requisitante:
+                    continue # pula a cache requisitante
+
+                with cache.trava(inicio):
+                    linha = cache.buscar_linha(inicio)
+
+                    if linha and linha.estado != Estado.INVALID:
+                        transicao = self.protocolo.bus_rdx[linha.estado]
+                        if transicao.fornece:
+                            # Se outra cache tinha o dado modificado, ela precisa fornecer esse dado
+                            # A RAM está desatualizada
+                            dado_encontrado = self.bloco_da_linha(linha)
+                            outra_cache_tem = True
+                            fornecedor = cache.id
+                            self.log('%d tinha dado modificado, forneceu %s', cache.id, linha.dados[deslocamento])
+
+                        if linha.acessados and not linha.acessados >> deslocamento & 1:
+                            # a outra cache nunca usou a palavra escrita: invalidação só por dividir o bloco
+                            # (sem nenhuma palavra usada, a linha é uma pré-busca desperdiçada)
+                            self.contadores.invalidacoes_falso_compartilhamento += 1
+
+                        cache.mudar_estado(linha, transicao.proximo)
+                        copias += 1
+                        copias_remotas += remoto
+                        self.contadores.invalidacoes += 1
+                        ciclos += latencias.invalidacao
+                        self.log('%d (->I): Teve linha invalidada', cache.id)
+
+        if upgrade:
+            pass # a requisitante já possui o dado, só era preciso invalidar as cópias
+        elif outra_cache_tem:
+            self.contadores.transferencias_cache += 1
+            ciclos += latencias.transferencia
+        else:
+            self.contadores.leituras_ram += 1
+            dado_encontrado, custo = self.ler_bloco_memoria(inicio)
+            ciclos += custo
+            if dado_encontrado is None:
+                self.relogio.cobrar(id_requisitante, ciclos)
+                return None # endereço fora da RAM
+            self.log('Nenhuma outra cache possuía o dado modificado. Lido da RAM: %s', dado_encontrado[0][deslocamento])
+
+        self.relogio.cobrar(id_requisitante, ciclos)
+        if self.diretorio is not None:
+            self.diretorio.registrar_escrita(inicio, id_requisitante)
+        if self.topologia is not None:
+            self.topologia.registrar_escrita(inicio, id_requisitante, fornecedor, copias_remotas)
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.BUS_UPGR if upgrade else TipoTransacao.BUS_RDX, id_requisitante,
+                                     endereco, fornecedor, valor, copias, Estado.MODIFIED, Estado.INVALID if copias else None)
+
+        return dado_encontrado
+
+    def solicitar_lance(self, endereco : int, id_requisitante : int, valor : int) -> tuple[Bloco | None, int | None]:
+        """
+        Lance atômico (compare-and-swap) numa única transação de leitura exclusiva.
+        O barramento obtém o valor atual do *endereco* (da cache que tem o dado modificado, ou da RAM)
+        e o compara com *valor*: se o lance for maior, invalida as outras cópias e a requisitante
+        fica com o bloco em *MODIFIED*; senão, nenhuma linha muda de estado.
+        Retorna (bloco, valor atual); o bloco é None se o lance foi recusado ou o endereço é inválido.
+        """
+
+        inicio = self.inicio_bloco(endereco)
+        deslocamento = endereco - inicio
+        self.log('Processador %d pede LANCE de %d no endereço %d.', id_requisitante, valor, endereco)
+        self.contadores.bus_lance += 1
+        latencias = self.relogio.latencias
+        ciclos = latencias.barramento
+
+        # As linhas observadas ficam travadas até o fim da transação: entre a comparação e a
+        # invalidação, a dona em MODIFIED não pode escrever pelo caminho rápido
+        with ExitStack() as travas:
+            copias : list[tuple[Cache, LinhaCache]] = []
+            copias_remotas = 0
+            bloco = None
+            fornecedor = None
+            for remoto, grupo in enumerate(self._grupos(inicio, id_requisitante, leitura=False)):
+                if remoto:
+                    ciclos += latencias.entre_clusters
+                for cache in grupo:
+                    if cache.id == id_requisitante:
+                        continue # pula a cache requisitante
 
-        for cache in self.caches:
-            if cache.id == id_requisitante:
-                continue # pula a cache requisitante
+                    travas.enter_context(cache.trava(inicio))
+                    linha = cache.buscar_linha(inicio)
+                    if linha and linha.estado != Estado.INVALID:
+                        copias.append((cache, linha))
+                        copias_remotas += remoto
+                        if self.protocolo.bus_rdx[linha.estado].fornece:
+                            bloco = self.bloco_da_linha(linha) # a RAM está desatualizada
+                            fornecedor = cache.id
 
-            linha = cache.buscar_linha(endereco)
+            if bloco is not None:
+                self.contadores.transferencias_cache += 1
+                ciclos += latencias.transferencia
+            else:
+                self.contadores.leituras_ram += 1
+                bloco, custo = self.ler_bloco_memoria(inicio, entregar=False) # o lance ainda pode ser recusado
+                ciclos += custo
+                if bloco is None:
+                    self.relogio.cobrar(id_requisitante, ciclos)
+                    return None, None # endereço fora da RAM
 
-            if linha and linha.estado != Estado.INVALID:
-                if linha.estado in [Estado.MODIFIED, Estado.OWNED]:
-                    # Se outra cache tinha o dado modificado, ela precisa fornecer esse dado
-                    # A RAM está desatualizada
-                    dado_encontrado = linha.dado
-                    outra_cache_tem = True
-                    self.log(f'{cache.id} tinha dado modificado, forneceu {dado_encontrado}')
+            valor_atual = bloco[0][deslocamento]
+            if valor <= valor_atual:
+                self.log('Lance recusado, valor atual %d. Nenhuma linha muda de estado.', valor_atual)
+                self.contadores.lances_recusados += 1 # a transação foi gasta e o próximo lance paga outra
+                self.relogio.cobrar(id_requisitante, ciclos)
+                if self.historico is not None:
+                    self.historico.registrar(TipoTransacao.BUS_LANCE, id_requisitante, endereco, fornecedor, valor)
+                return None, valor_atual
 
-                linha.estado = Estado.INVALID
-                self.log(f'{cache.id} (->I): Teve linha invalidada')
+            for cache, linha in copias:
+                if linha.acessados and not linha.acessados >> deslocamento & 1:
+                    self.contadores.invalidacoes_falso_compartilhamento += 1
+                cache.mudar_estado(linha, self.protocolo.bus_rdx[linha.estado].proximo)
+                self.contadores.invalidacoes += 1
+                ciclos += latencias.invalidacao
+                self.log('%d (->I): Teve linha invalidada', cache.id)
 
-        if not outra_cache_tem:
-            dado_encontrado = self.ram.ler(endereco)
-            self.log(f'Nenhuma outra cache possuía o dado modificado. Lido da RAM: {dado_encontrado}')
+            if fornecedor is None and self.llc is not None:
+                ciclos += self.llc.entregar(inicio)
+            if copias:
+                # Leitura seguida de escrita pediria BusRd e depois BusUpgr para invalidar as cópias
+                self.contadores.transacoes_economizadas += 1
 
-        return dado_encontrado
\ No newline at end of file
+        self.relogio.cobrar(id_requisitante, ciclos)
+        if self.diretorio is not None:
+            self.diretorio.registrar_escrita(inicio, id_requisitante)
+        if self.topologia is not None:
+            self.topologia.registrar_escrita(inicio, id_requisitante, fornecedor, copias_remotas)
+        if self.historico is not None:
+            self.historico.registrar(TipoTransacao.BUS_LANCE, id_requisitante, endereco, fornecedor, valor,
+                                     len(copias), Estado.MODIFIED, Estado.INVALID if copias else None)
+        return bloco, valor_atual
@@ -0,0 +1,283 @@
+"""
+Benchmarks dos caminhos críticos (Cache, Barramento, Comprador.dar_lance).
+
+Executa cenários de leilão com semente fixa, sem saída na tela, variando o número
+de compradores e o tamanho das caches. Para cada combinação mede operações por
+segundo, percentis de latência por operação, pico de memória, memória das caches
+por milhão de linhas e linhas de cache criadas por operação, e grava tudo em JSON.
+
+Uso:
+    python benchmark.py --compradores 4 16 64 --tamanhos-cache 4 16 --operacoes 20000
+    python benchmark.py --cenarios rajadas --buffers-escrita 0 4 16 --tamanho-bloco 4
+    python benchmark.py --cenarios navegacao --prebuscas nenhuma proxima passo popular --grau-prebusca 2
+"""
+from typing import Callable, Iterator
+from configuracao import Configuracao
+from leilao import Leilao
+from linha import LinhaCache
+from motor import MotorRastro
+from rastro import Operacao
+from registro import SILENCIOSO
+from substituicao import POLITICAS
+from protocolo import PROTOCOLOS
+from buffer_escrita import CONSISTENCIAS
+from prebusca import MODOS_PREBUSCA
+import registro
+import estatisticas
+import argparse
+import itertools
+import json
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from estatisticas import percentil, PERCENTIS
+
+
+def _lance(rng : random.Random, maiores : list[int], id_comprador : int, id_item : int) -> Operacao:
+    """ Lance perto do maior valor atual: parte é aceita, parte rejeitada. """
+    valor = max(1, maiores[id_item] + rng.randint(-20, 50))
+    maiores[id_item] = max(maiores[id_item], valor)
+    return Operacao("lance", (id_comprador, id_item, valor))
+
+
+def cenario_item_quente(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Todos os compradores disputam um único item. """
+    maiores = [100]
+    for _ in range(operacoes):
+        yield _lance(rng, maiores, rng.randrange(compradores), 0)
+
+
+def cenario_uniforme(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Lances distribuídos uniformemente entre todos os itens. """
+    maiores = [100] * itens
+    for _ in range(operacoes):
+        yield _lance(rng, maiores, rng.randrange(compradores), rng.randrange(itens))
+
+
+def cenario_zipf(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Popularidade dos itens segue uma distribuição de Zipf (s = 1). """
+    maiores = [100] * itens
+    acumulado = list(itertools.accumulate(1 / posicao for posicao in range(1, itens + 1)))
+    populares = range(itens)
+    for _ in range(operacoes):
+        id_item = rng.choices(populares, cum_weights=acumulado)[0]
+        yield _lance(rng, maiores, rng.randrange(compradores), id_item)
+
+
+def cenario_observadores(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Maioria de consultas de preço (90%) e poucos lances. """
+    maiores = [100] * itens
+    for _ in range(operacoes):
+        id_comprador, id_item = rng.randrange(compradores), rng.randrange(itens)
+        if rng.random() < 0.9:
+            yield Operacao("ler", (id_comprador, id_item))
+        else:
+            yield _lance(rng, maiores, id_comprador, id_item)
+
+
+def cenario_rajadas(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Rajadas de lances de um comprador em itens vizinhos, intercaladas com consultas dos outros. """
+    maiores = [100] * itens
+    gerados = 0
+    while gerados < operacoes:
+        id_comprador, id_item = rng.randrange(compradores), rng.randrange(itens)
+        for _ in range(rng.randint(4, 16)):
+            vizinho = min(itens - 1, id_item + rng.randrange(4))
+            if rng.random() < 0.6:
+                yield _lance(rng, maiores, id_comprador, vizinho)
+            else:
+                yield Operacao("ler", (rng.randrange(compradores), vizinho))
+            gerados += 1
+            if gerados == operacoes:
+                return
+
+
+def cenario_navegacao(rng : random.Random, compradores : int, itens : int, operacoes : int) -> Iterator[Operacao]:
+    """ Compradores consultam itens em sequência (passo 1 a 3), com um lance de vez em quando. """
+    maiores = [100] * itens
+    gerados = 0
+    while gerados < operacoes:
+        id_comprador, id_item, passo = rng.randrange(compradores), rng.randrange(itens), rng.randint(1, 3)
+        for _ in range(rng.randint(8, 32)):
+            if rng.random() < 0.9:
+                yield Operacao("ler", (id_comprador, id_item))
+            else:
+                yield _lance(rng, maiores, id_comprador, id_item)
+            id_item = (id_item + passo) % itens
+            gerados += 1
+            if gerados == operacoes:
+                return
+
+
+CENARIOS : dict[str, tuple[Callable[..., Iterator[Operacao]], bool]] = {
+    # nome -> (gerador, usa todos os itens da RAM)
+    "item_quente": (cenario_item_quente, False),
+    "uniforme": (cenario_uniforme, True),
+    "zipf": (cenario_zipf, True),
+    "observadores": (cenario_observadores, True),
+    "rajadas": (cenario_rajadas, True),
+    "navegacao": (cenario_navegacao, True),
+}
+
+
+def preparar(config : Configuracao, cenario : str, compradores : int, operacoes : int, semente : int) -> tuple[MotorRastro, list[Operacao]]:
+    """ Cria o leilão com itens e compradores e gera as operações medidas do *cenario*. """
+    gerador, todos_os_itens = CENARIOS[cenario]
+    itens = config.tamanho_ram if todos_os_itens else 1
+    rng = random.Random(semente)
+
+    motor = MotorRastro(Leilao(config))
+    for id_item in range(itens):
+        motor.aplicar(Operacao("item", (f"item{id_item}", 100)))
+    for id_comprador in range(compradores):
+        motor.aplicar(Operacao("comprador", (f"comprador{id_comprador}",)))
+    return motor, list(gerador(rng, compradores, itens, operacoes))
+
+
+def memoria_das_linhas(config : Configuracao, compradores : int) -> float:
+    """ Bytes por milhão de linhas: memória das caches dos *compradores*, que já criam todas as suas linhas. """
+    tracemalloc.start()
+    leilao = Leilao(config)
+    antes, _ = tracemalloc.get_traced_memory()
+    for id_comprador in range(compradores):
+        leilao.adicionar_comprador(f"comprador{id_comprador}")
+    depois, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (depois - antes) / (compradores * config.tamanho_cache) * 1_000_000
+
+
+def aplicar_contando_linhas(motor : MotorRastro, ops : list[Operacao]) -> int:
+    """ Aplica as *ops* e retorna quantas LinhaCache foram criadas (o construtor só é trocado enquanto mede). """
+    original = LinhaCache.__init__
+    criadas = 0
+
+    def contar(linha, *args, **kwargs):
+        nonlocal criadas
+        criadas += 1
+        original(linha, *args, **kwargs)
+
+    LinhaCache.__init__ = contar
+    try:
+        for operacao in ops:
+            motor.aplicar(operacao)
+    finally:
+        LinhaCache.__init__ = original
+    return criadas
+
+
+def medir(config : Configuracao, cenario : str, compradores : int, operacoes : int, semente : int) -> dict:
+    """
+    Executa o cenário duas vezes: uma cronometrada e outra sob tracemalloc, para o pico de memória
+    e a contagem de linhas criadas.
+    """
+    motor, ops = preparar(config, cenario, compradores, operacoes, semente)
+    aplicar = motor.aplicar
+    relogio = time.perf_counter_ns
+    latencias = []
+    inicio = relogio()
+    for operacao in ops:
+        antes = relogio()
+        aplicar(operacao)
+        latencias.append(relogio() - antes)
+    duracao = (relogio() - inicio) / 1e9
+    dados = estatisticas.coletar(motor.leilao)
+
+    tracemalloc.start()
+    motor_memoria, ops = preparar(config, cenario, compradores, operacoes, semente)
+    linhas_criadas = aplicar_contando_linhas(motor_memoria, ops)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencias.sort()
+    return {
+        "cenario": cenario,
+        "compradores": compradores,
+        "tamanho_cache": config.tamanho_cache,
+        "associatividade": config.associatividade,
+        "tamanho_bloco": config.tamanho_bloco,
+        "coerencia": config.coerencia,
+        "politica": config.politica,
+        "protocolo": config.protocolo,
+        "clusters": config.clusters,
+        "buffer_escrita": config.buffer_escrita,
+        "consistencia": config.consistencia,
+        "prebusca": config.prebusca,
+        "grau_prebusca": config.grau_prebusca,
+        "operacoes": operacoes,
+        "ops_por_segundo": operacoes / duracao if duracao > 0 else 0.0,
+        "latencia_ns": {f"p{p}": percentil(latencias, p) for p in PERCENTIS} | {"max": latencias[-1]},
+        "pico_memoria_bytes": pico,
+        "memoria_por_milhao_de_linhas_bytes": memoria_das_linhas(config, compradores),
+        "linhas_criadas_por_operacao": linhas_criadas / operacoes if operacoes else 0.0,
+        "barramento": dados["barramento"],
+        "transacoes_por_lance": dados["transacoes_por_lance"],
+        "transacoes_barramento": sum(dados["barramento"][tipo] for tipo in ("bus_rd", "bus_rdx", "bus_upgr", "bus_lance",
+                                                                            "bus_prebusca")),
+        "leituras_miss": sum(cache["leituras_miss"] for cache in dados["caches"].values()),
+        "estatisticas_prebusca": dados.get("prebusca"),
+        "transacoes_remotas": sum(cluster["transacoes_remotas"] for cluster in dados.get("clusters", {}).values()),
+        "ciclos_simulados": dados["ciclos"],
+    }
+
+
+def ler_argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks do simulador MOESI")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--compradores", nargs="+", type=int, default=[4, 16, 64])
+    parser.add_argument("--tamanhos-cache", nargs="+", type=int, default=[4, 16])
+    parser.add_argument("--associatividade", type=int, default=None)
+    parser.add_argument("--tamanho-bloco", type=int, default=Configuracao.tamanho_bloco)
+    parser.add_argument("--coerencia", choices=["broadcast", "diretorio"], default=Configuracao.coerencia)
+    parser.add_argument("--politica", choices=list(POLITICAS), default=Configuracao.politica)
+    parser.add_argument("--protocolos", nargs="+", choices=list(PROTOCOLOS), default=[Configuracao.protocolo])
+    parser.add_argument("--clusters", nargs="+", type=int, default=[Configuracao.clusters],
+                        help="quantidades de clusters (barramentos locais) a comparar")
+    parser.add_argument("--buffers-escrita", nargs="+", type=int, default=[Configuracao.buffer_escrita],
+                        help="capacidades do buffer de escrita a comparar (0 = sem buffer)")
+    parser.add_argument("--consistencia", choices=list(CONSISTENCIAS), default=Configuracao.consistencia)
+    parser.add_argument("--prebuscas", nargs="+", choices=["nenhuma", *MODOS_PREBUSCA], default=["nenhuma"],
+                        help="modos de pré-busca a comparar")
+    parser.add_argument("--grau-prebusca", type=int, default=Configuracao.grau_prebusca)
+    parser.add_argument("--tamanho-ram", type=int, default=Configuracao.tamanho_ram)
+    parser.add_argument("--operacoes", type=int, default=20000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", default=f"benchmark_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    return parser.parse_args()
+
+
+def main():
+    args = ler_argumentos()
+    registro.definir_nivel(SILENCIOSO)
+
+    resultados = []
+    for cenario, protocolo, clusters, buffer_escrita, prebusca, compradores, tamanho_cache in itertools.product(
+            args.cenarios, args.protocolos, args.clusters, args.buffers_escrita, args.prebuscas, args.compradores,
+            args.tamanhos_cache):
+        config = Configuracao(tamanho_ram=args.tamanho_ram, semente_ram=args.semente, tamanho_cache=tamanho_cache,
+                              associatividade=args.associatividade, tamanho_bloco=args.tamanho_bloco,
+                              coerencia=args.coerencia,
+                              politica=args.politica, protocolo=protocolo, clusters=clusters,
+                              buffer_escrita=buffer_escrita, consistencia=args.consistencia,
+                              prebusca=prebusca if prebusca != "nenhuma" else None, grau_prebusca=args.grau_prebusca)
+        resultado = medir(config, cenario, compradores, args.operacoes, args.semente)
+        resultados.append(resultado)
+        print(f"{cenario:>13} | {protocolo:>5} | {clusters:>3} cluster(s) | buffer {buffer_escrita:>3} | pré-busca {prebusca:>7} | {compradores:>4} compradores | cache {tamanho_cache:>4} | "
+              f"{resultado['ops_por_segundo']:>10.0f} op/s | p99 {resultado['latencia_ns']['p99'] / 1000:>8.1f} us | "
+              f"pico {resultado['pico_memoria_bytes'] / 1024:>8.0f} KiB | "
+              f"{resultado['memoria_por_milhao_de_linhas_bytes'] / 2**20:>6.0f} MiB/milhão de linhas | "
+              f"{resultado['linhas_criadas_por_operacao']:.3f} linhas/op | "
+              f"{resultado['transacoes_barramento']:>7} transações | {resultado['leituras_miss']:>6} misses de leitura")
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "semente": args.semente,
+            "resultados": resultados,
+        }, arquivo, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Buffer de escrita (store buffer) de uma cache.
+
+As escritas do processador vão para o buffer em vez de pedirem o barramento na hora,
+e escritas seguidas no mesmo endereço se juntam numa só entrada (coalescência).
+O buffer é drenado de uma vez, com o árbitro do barramento: numa barreira, quando
+fica cheio, quando outra cache precisa de um bloco com escrita pendente, no encerramento
+de um item e no fim do rastro. Na drenagem, cada bloco compartilhado pede um único
+upgrade (e invalida as outras cópias uma vez) para todas as suas escritas pendentes.
+O processador sempre lê as próprias escritas pendentes (read-your-own-writes).
+
+Só entram no buffer escritas em blocos que a cache tem válidos, e um bloco tem escritas
+pendentes em no máximo uma cache: qualquer outra que vá usar o bloco pelo barramento, ou
+escrever nele, drena antes o buffer da dona das pendências. Assim o valor pendente é
+sempre o valor atual do endereço, e o compare-and-swap do lance continua correto.
+As outras caches podem ler, nos seus hits, o valor anterior à escrita pendente.
+
+Modos de consistência:
+    sequencial: uma leitura de outro endereço drena o buffer antes (nenhuma leitura
+                passa à frente de uma escrita anterior do mesmo processador);
+    tso:        (total store order) leituras de outros endereços passam à frente das
+                escritas pendentes, que ficam visíveis juntas, na drenagem.
+"""
+CONSISTENCIAS = ("sequencial", "tso")
+CONSISTENCIA_PADRAO = "sequencial"
+
+
+class BufferEscrita():
+    def __init__(self, capacidade : int, consistencia : str = CONSISTENCIA_PADRAO):
+        """ Inicializa um buffer vazio com *capacidade* endereços, no modo de *consistencia* dado. """
+        if capacidade <= 0:
+            raise ValueError(f"Capacidade do buffer de escrita inválida: {capacidade}")
+        if consistencia not in CONSISTENCIAS:
+            raise ValueError(f"Modo de consistência desconhecido: {consistencia} (opções: {', '.join(CONSISTENCIAS)})")
+        self.capacidade : int = capacidade
+        self.consistencia : str = consistencia
+        self.sequencial : bool = consistencia == "sequencial"
+        self.entradas : dict[int, int] = {} # endereço -> valor pendente, na ordem da primeira escrita
+
+    def cheio(self) -> bool:
+        return len(self.entradas) >= self.capacidade
+
+    def retirar(self) -> dict[int, int]:
+        """ Entradas pendentes, que saem do buffer para serem escritas. """
+        entradas = self.entradas
+        self.entradas = {}
+        return entradas
@@ -1,146 +1,556 @@
 from __future__ import annotations
-from collections import deque
+from array import array
 from moesi import Estado
-from barramento import Barramento
-from colors import color
+from barramento import Barramento, SEM_TRAVA
 from linha import LinhaCache
-import logging
+from protocolo import Protocolo
+from registro import TRANSICOES, COMPLETO
+from estatisticas import ContadoresCache
+from temporizacao import Relogio
+from substituicao import PoliticaSubstituicao, criar_politica
+from buffer_escrita import BufferEscrita, CONSISTENCIA_PADRAO
+from prebusca import Prebusca, criar_prebusca
+import registro
+import threading
 TAMANHO_CACHE = 5
+POLITICA_PADRAO = "fifo"
+
+
+class Conjunto():
+    def __init__ (self, associatividade : int, politica : PoliticaSubstituicao, trava = SEM_TRAVA,
+                  tamanho_bloco : int = 1):
+        """
+        Inicializa um conjunto (set) da cache, com *associatividade* vias.
+        As linhas de todas as vias são criadas aqui (vazias, tag None) e reaproveitadas
+        a cada substituição; as ocupadas são indexadas pela *tag*,
+        acompanhadas pela *politica* de substituição do conjunto.
+        """
+        self.linhas : dict[int, LinhaCache] = {}
+        self.vias : list[LinhaCache] = [LinhaCache(via, tamanho_bloco) for via in range(associatividade)]
+        self.politica : PoliticaSubstituicao = politica
+        self.trava = trava # protege linhas, vias e política do conjunto no modo concorrente
 
 
 class Cache():
-    def __init__ (self, id_cache : int, barramento : Barramento, tamanho : int = TAMANHO_CACHE):
-        """ Inicializa uma cache com o barramento, id, tamanho e suas linhas. """
+    def __init__ (self, id_cache : int, barramento : Barramento, tamanho : int = TAMANHO_CACHE,
+                  associatividade : int | None = None, politica : str = POLITICA_PADRAO,
+                  buffer_escrita : int = 0, consistencia : str = CONSISTENCIA_PADRAO,
+                  prebusca : str | None = None, grau_prebusca : int = 1):
+        """
+        Inicializa uma cache com o barramento, id, tamanho e seus conjuntos.
+        A *associatividade* é o número de vias por conjunto:
+        1 = mapeamento direto, *tamanho* (ou None) = totalmente associativa.
+        A *politica* de substituição pode ser "fifo", "lru", "plru" ou "aleatoria".
+        Cada linha guarda um bloco com o tamanho definido pelo barramento,
+        e as transições seguem a tabela do protocolo do barramento.
+        Com *buffer_escrita* > 0, as escritas passam por um buffer com essa capacidade,
+        no modo de *consistencia* "sequencial" ou "tso" (ver buffer_escrita.py).
+        Com *prebusca* ("proxima", "passo" ou "popular"), uma unidade de pré-busca traz até
+        *grau_prebusca* blocos a cada miss de leitura (ver prebusca.py).
+        """
+        if associatividade is None:
+            associatividade = tamanho # totalmente associativa
+
+        if associatividade <= 0 or tamanho % associatividade != 0:
+            raise ValueError(f"Associatividade {associatividade} inválida para cache de tamanho {tamanho}.")
+        if buffer_escrita and barramento.concorrente:
+            raise ValueError("O buffer de escrita não é suportado no modo concorrente.")
+
         self.id : int = id_cache
         self.barramento : Barramento = barramento
         self.tamanho : int = tamanho
-        self.linhas : deque[LinhaCache] = deque()
+        self.associatividade : int = associatividade
+        self.num_conjuntos : int = tamanho // associatividade
+        self.tamanho_bloco : int = barramento.tamanho_bloco
+        self.politica : str = politica
+        self.conjuntos : list[Conjunto] = [
+            # Reentrante: a back-invalidation da LLC pode observar um conjunto que a própria transação já travou
+            Conjunto(associatividade, criar_politica(politica, associatividade, f"{id_cache}:{indice}"),
+                     threading.RLock() if barramento.concorrente else SEM_TRAVA, self.tamanho_bloco)
+            for indice in range(self.num_conjuntos)
+        ]
+        self.contadores : ContadoresCache = ContadoresCache()
+        self.relogio : Relogio = barramento.relogio
+        self.protocolo : Protocolo = barramento.protocolo
+        self.buffer : BufferEscrita | None = BufferEscrita(buffer_escrita, consistencia) if buffer_escrita else None
+        self.prebusca : Prebusca | None = None
+        if prebusca is not None:
+            self.prebusca = criar_prebusca(prebusca, grau_prebusca, self.tamanho_bloco, barramento.ram.tamanho)
+
+    def log(self, msg: str, *args, nivel: int = TRANSICOES) -> None:
+        """ Função de log para a cache, formatada apenas se o *nivel* estiver ativo """
+        if nivel <= registro.nivel:
+            registro.registrar(nivel, "cache", "[Cache %d] " + msg, self.id, *args)
 
-    def log(self, msg: str) -> None:
-        """ Função de log para o barramento """
-        print(color(f"[Cache {self.id}] {msg}", "cache"))
-        logging.info(f"[Cache {self.id}] {msg}")
 
+    @property
+    def linhas(self) -> list[LinhaCache]:
+        """ Todas as linhas presentes na cache, conjunto a conjunto e via a via. """
+        return [linha for conjunto in self.conjuntos for linha in conjunto.vias if linha.tag is not None]
+
+    def dividir_endereco(self, endereco : int) -> tuple[int, int, int]:
+        """
+        Divide o *endereco* em (índice do conjunto, tag, deslocamento da palavra no bloco).
+        """
+        bloco, deslocamento = divmod(endereco, self.tamanho_bloco)
+        tag, indice = divmod(bloco, self.num_conjuntos)
+        return indice, tag, deslocamento
+
+    def montar_endereco(self, indice : int, tag : int) -> int:
+        """ Endereço da primeira palavra do bloco de (*indice*, *tag*). """
+        return (tag * self.num_conjuntos + indice) * self.tamanho_bloco
 
     def buscar_linha(self, endereco : int) -> LinhaCache | None:
         """
-        Busca uma linha de cache pelo endereço *tag*.
+        Busca a linha que contém o *endereco*, em tempo constante:
+        o índice seleciona o conjunto e a tag é procurada no dicionário do conjunto.
         Retorna a linha se encontrada, ou None se não existir.
         """
-        for linha in self.linhas:
-            if linha.tag == endereco:
-                return linha
-        return None
-    
-    def _logica_fifo(self):
+        tag, indice = divmod(endereco // self.tamanho_bloco, self.num_conjuntos)
+        return self.conjuntos[indice].linhas.get(tag)
+
+    def mudar_estado(self, linha : LinhaCache, novo_estado : Estado) -> None:
         """
-        Responsável por manter a política FIFO, isto é, remover o mais antigo. 
-        Se for sujo (M ou O), escreve de volta na RAM, write-back.
+        Altera o estado da *linha*, registrando a transição nas estatísticas
+        e mantendo o índice de donas (linhas sujas) do barramento.
         """
+        estado_anterior = linha.estado
+        self.barramento.transicoes.registrar(estado_anterior, novo_estado)
+        linha.estado = novo_estado
+        if novo_estado == Estado.INVALID and not linha.acessados and estado_anterior != Estado.INVALID:
+            self.contadores.prebuscas_inuteis += 1 # pré-buscada e perdida sem ser usada
 
-        
-        if len(self.linhas) >= self.tamanho:    
-            linha_removida = self.linhas.popleft() # remove a linha mais antiga
+        sujos = self.protocolo.sujos
+        if novo_estado in sujos:
+            self.barramento.indice_donos[linha.inicio] = self.id
+        elif estado_anterior in sujos and self.barramento.indice_donos.get(linha.inicio) == self.id:
+            del self.barramento.indice_donos[linha.inicio]
     
-            if linha_removida.estado in [Estado.MODIFIED, Estado.OWNED]:
-                # Write-back na RAM
-                self.write_back(linha_removida.tag, linha_removida.dado)
+    def _alocar_linha(self, indice : int, tag : int) -> LinhaCache:
+        """
+        Reserva uma via do conjunto *indice* para a *tag* e retorna a sua linha (ainda INVALID).
+        Usa primeiro uma via vazia ou com linha inválida; só se todas forem válidas
+        a política de substituição escolhe a vítima.
+        Se a vítima for suja (M ou O), escreve de volta na RAM, write-back;
+        se for limpa, é oferecida à LLC (que só a guarda se for exclusiva).
+        A linha da via é reaproveitada: nenhuma linha nova é criada.
+        """
+        conjunto = self.conjuntos[indice]
+        via = None
+        for posicao, ocupante in enumerate(conjunto.vias):
+            if ocupante.estado == Estado.INVALID: # vias vazias também estão INVALID
+                via = posicao
+                break
+
+        if via is None:
+            via = conjunto.politica.vitima()
+
+        linha = conjunto.vias[via]
+        if linha.tag is not None:
+            del conjunto.linhas[linha.tag]
+            if linha.estado != Estado.INVALID:
+                endereco_removido = self.montar_endereco(indice, linha.tag)
+                self.contadores.substituicoes += 1
+
+                if linha.estado in self.protocolo.sujos:
+                    # Write-back na RAM
+                    self.write_back(endereco_removido, linha.dados, linha.autores)
+                elif self.barramento.llc is not None:
+                    self.barramento.vitima_limpa(endereco_removido, linha.dados, linha.autores, self.id)
+
+                self.mudar_estado(linha, Estado.INVALID)
+                self.barramento.registrar_remocao(endereco_removido, self.id)
+
+        linha.tag = tag
+        linha.inicio = self.montar_endereco(indice, tag)
+        conjunto.linhas[tag] = linha
+        conjunto.politica.inserir(via)
+        return linha
     
-    def write_back(self, tag : int , dado : int ) -> None:
-        """ Realiza o write-back de uma linha suja (M ou O) para a RAM. """
-        self.log(f"Write-back do endereço {tag} para RAM.")
-        self.barramento.ram.escrever(tag, dado)
+    def write_back(self, endereco : int , dados : array, autores : array | None = None) -> None:
+        """ Realiza o write-back do bloco de uma linha suja (M ou O) para a RAM. """
+        self.log('Write-back do endereço %d para RAM.', endereco)
+        self.contadores.write_backs += 1
+        self.barramento.write_back(endereco, dados, self.id, autores)
+
 
+    def trava(self, endereco : int):
+        """ Trava do conjunto que contém o *endereco* (usada pelo barramento ao observar a linha). """
+        return self.conjuntos[(endereco // self.tamanho_bloco) % self.num_conjuntos].trava
 
     def ler(self, endereco : int) -> int | None:
         """ 
         Le (load) um valor armazenado em um *endereco* especifico na cache. 
         Retorna o valor se encontrado, ou None se não existir. 
+        O read hit trava apenas o conjunto; o miss passa antes pelo árbitro do barramento.
+        Com a pré-busca, o miss e o primeiro uso de uma linha pré-buscada treinam a unidade.
         """
-        linha = self.buscar_linha(endereco)
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        conjunto = self.conjuntos[indice]
+        if self.buffer is not None:
+            if endereco in self.buffer.entradas:
+                return self._ler_pendente(endereco)
+            self._ordenar_leitura()
+
+        primeiro_uso = False
+        with conjunto.trava:
+            linha = conjunto.linhas.get(tag)
+            if linha and linha.estado != Estado.INVALID:
+                if linha.acessados or self.prebusca is None:
+                    return self._read_hit(conjunto, linha, endereco, deslocamento)
+                dado = self._read_hit(conjunto, linha, endereco, deslocamento)
+                primeiro_uso = True
+
+        if primeiro_uso:
+            # Primeiro uso de uma linha pré-buscada: a unidade segue a sequência
+            with self.barramento.arbitro:
+                self._prebuscar(endereco - deslocamento)
+            return dado
+
+        # Ordem das travas: barramento -> conjunto; o estado é conferido de novo, pois pode ter mudado
+        with self.barramento.arbitro:
+            with conjunto.trava:
+                if self.buffer is not None:
+                    self.barramento.drenar_pendentes(endereco - deslocamento, self.id)
+                dado = self._ler(conjunto, indice, tag, deslocamento, endereco)
+            if self.prebusca is not None:
+                self._prebuscar(endereco - deslocamento)
+            return dado
+
+    def _read_hit(self, conjunto : Conjunto, linha : LinhaCache, endereco : int, deslocamento : int) -> int:
+        """ Leitura de uma linha válida, sem passar pelo barramento. """
+        self.contadores.leituras_hit += 1
+        self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+        conjunto.politica.acessar(linha.via)
+        if not linha.acessados:
+            self.contadores.prebuscas_uteis += 1 # a linha pré-buscada evitou um miss
+        linha.acessados |= 1 << deslocamento
+        dado = linha.dados[deslocamento]
+        self.log('READ HIT no endereço %d. Dado: %s. Estado: %s', endereco, dado, linha.estado.sigla, nivel=COMPLETO)
+        return dado
+
+    def _ler(self, conjunto : Conjunto, indice : int, tag : int, deslocamento : int, endereco : int) -> int | None:
+        """ Leitura completa (hit ou miss), com o árbitro e a trava do conjunto já adquiridos. """
+        linha = conjunto.linhas.get(tag)
 
         # Read hit
         if linha and linha.estado != Estado.INVALID:
-            print(f'[Cache {self.id}]: READ HIT no endereço {endereco}. Dado: {linha.dado}. Estado: {linha.estado.value}')
-            return linha.dado
+            return self._read_hit(conjunto, linha, endereco, deslocamento)
         
         # Read miss
-        self.log(f'READ MISS no endereço {endereco}.')
-        self._logica_fifo() # aplica a política FIFO
-
-        dado, novo_estado = self.barramento.solicitar_leitura(endereco, self.id)
+        self.contadores.leituras_miss += 1
+        self.relogio.cobrar(self.id, self.relogio.latencias.hit) # a consulta que descobriu o miss
+        self.log('READ MISS no endereço %d.', endereco)
 
-        if linha: 
-            # Atualiza a linha existente
-            linha.dado = dado
-            linha.estado = novo_estado
-            return dado
+        if linha:
+            # A linha ainda ocupa uma via (INVALID): reaproveita a mesma via, sem substituir ninguém
+            conjunto.politica.inserir(linha.via)
         else:
-            # Cria uma nova linha
-            nova_linha = LinhaCache()
-            nova_linha.tag = endereco
-            nova_linha.dado = dado
-            nova_linha.estado = novo_estado
-            self.linhas.append(nova_linha)
-            return dado
+            linha = self._alocar_linha(indice, tag) # aplica a política de substituição no conjunto
+
+        bloco, novo_estado = self.barramento.solicitar_leitura(endereco, self.id)
+        if bloco is None:
+            return None # endereço inválido, a linha continua INVALID
+
+        linha.dados[:], linha.autores[:] = bloco # copiado para os arrays da própria linha
+        linha.acessados = 1 << deslocamento
+        self.mudar_estado(linha, novo_estado)
+        return linha.dados[deslocamento]
     
     def escrever(self, endereco : int, valor : int) :
         """
         Realiza uma escrita na cache (store).
+        Só o write hit que não muda de estado (MODIFIED) dispensa o árbitro; os demais casos passam por ele.
+        Com o buffer de escrita, a escrita numa linha válida fica pendente nele (e retorna None).
         """
-        
-        linha = self.buscar_linha(endereco)
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        conjunto = self.conjuntos[indice]
+        if self.buffer is not None and self._bufferizar(conjunto, tag, endereco, valor):
+            return None # a escrita ficou no buffer
 
-        # Write hit
-        if linha and linha.estado != Estado.INVALID:
-            self.log(f"WRITE HIT no endereço {endereco}.")
+        with conjunto.trava:
+            linha = conjunto.linhas.get(tag)
+            if linha and linha.estado in self.protocolo.escrita_local:
+                self.contadores.escritas_hit += 1
+                self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+                conjunto.politica.acessar(linha.via)
+                self.log('WRITE HIT no endereço %d.', endereco, nivel=COMPLETO)
+                linha.dados[deslocamento] = valor
+                linha.autores[deslocamento] = self.id
+                linha.acessados |= 1 << deslocamento
+                return linha
+
+        with self.barramento.arbitro, conjunto.trava:
+            if self.buffer is not None:
+                self._drenar_antes(endereco - deslocamento)
+            return self._escrever(conjunto, indice, tag, deslocamento, endereco, valor)
 
-            if linha.estado == Estado.MODIFIED:
-                # Já está em MODIFIED, nada a fazer
-                pass
+    def _escrever(self, conjunto : Conjunto, indice : int, tag : int, deslocamento : int, endereco : int, valor : int):
+        """ Escrita completa (hit ou miss), com o árbitro e a trava do conjunto já adquiridos. """
+        linha = conjunto.linhas.get(tag)
 
-            elif linha.estado == Estado.EXCLUSIVE:
-                linha.estado = Estado.MODIFIED
+        # Write hit
+        if linha and linha.estado != Estado.INVALID:
+            self.contadores.escritas_hit += 1
+            self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+            conjunto.politica.acessar(linha.via)
+            self.log('WRITE HIT no endereço %d.', endereco, nivel=COMPLETO)
 
-            elif linha.estado in [Estado.SHARED, Estado.OWNED]:
-                # Necessário chamar o barramento para invalidar outras caches
-                self.barramento.solicitar_escrita(endereco, self.id)
-                linha.estado = Estado.MODIFIED
+            transicao = self.protocolo.escrita[linha.estado]
+            if transicao.barramento:
+                # Linha compartilhada: necessário chamar o barramento para invalidar outras caches
+                self.barramento.solicitar_escrita(endereco, self.id, upgrade=True, valor=valor)
+            if transicao.proximo != linha.estado:
+                self.mudar_estado(linha, transicao.proximo)
             
-            linha.dado = valor
+            if not linha.acessados:
+                self.contadores.prebuscas_uteis += 1
+            linha.dados[deslocamento] = valor
+            linha.autores[deslocamento] = self.id
+            linha.acessados |= 1 << deslocamento
             return linha # Retorna a linha atualizada
         
         # Write miss
-        self.log(f"WRITE MISS no endereço {endereco}.")
-        self._logica_fifo()
+        self.contadores.escritas_miss += 1
+        self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+        self.log('WRITE MISS no endereço %d.', endereco)
+
+        if linha:
+            # Reaproveita a via da linha INVALID
+            conjunto.politica.inserir(linha.via)
+        else:
+            linha = self._alocar_linha(indice, tag)
 
         # Solicita a propriedade da escrita
         # Garantir que outras caches invalidem suas cópias
-        self.barramento.solicitar_escrita(endereco, self.id)
+        bloco = self.barramento.solicitar_escrita(endereco, self.id, valor=valor)
+        if bloco is None:
+            return None # endereço inválido, a linha continua INVALID
+
+        linha.dados[:], linha.autores[:] = bloco
+        linha.dados[deslocamento] = valor
+        linha.autores[deslocamento] = self.id
+        linha.acessados = 1 << deslocamento
+        self.mudar_estado(linha, Estado.MODIFIED)
+        return linha
 
+    def comparar_e_escrever(self, endereco : int, valor : int) -> tuple[bool, int | None]:
+        """
+        Escreve *valor* no *endereco* apenas se ele for maior que o valor atual (compare-and-swap).
+        Com a linha válida, a comparação é local; um miss custa uma única transação no barramento,
+        que traz o bloco em *MODIFIED* se o valor for aceito, ou não muda estado nenhum se for recusado.
+        Retorna se o valor foi escrito e o valor que estava no endereço (None se o endereço for inválido).
+        """
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        conjunto = self.conjuntos[indice]
+        if self.buffer is not None:
+            resultado = self._comparar_no_buffer(conjunto, tag, deslocamento, endereco, valor)
+            if resultado is not None:
+                return resultado
+
+        with conjunto.trava:
+            linha = conjunto.linhas.get(tag)
+            if linha and linha.estado != Estado.INVALID:
+                valor_atual = linha.dados[deslocamento]
+                if valor <= valor_atual:
+                    self._read_hit(conjunto, linha, endereco, deslocamento)
+                    return False, valor_atual
+                if linha.estado in self.protocolo.escrita_local:
+                    self._escrever(conjunto, indice, tag, deslocamento, endereco, valor) # write hit sem barramento
+                    return True, valor_atual
+
+        with self.barramento.arbitro, conjunto.trava:
+            if self.buffer is not None:
+                self._drenar_antes(endereco - deslocamento)
+            return self._comparar_e_escrever(conjunto, indice, tag, deslocamento, endereco, valor)
+
+    def _comparar_e_escrever(self, conjunto : Conjunto, indice : int, tag : int, deslocamento : int,
+                             endereco : int, valor : int) -> tuple[bool, int | None]:
+        """ Compare-and-swap completo, com o árbitro e a trava do conjunto já adquiridos. """
+        linha = conjunto.linhas.get(tag)
+
+        # Hit: a linha válida tem o valor atual; só a escrita aceita pode precisar do barramento (upgrade)
+        if linha and linha.estado != Estado.INVALID:
+            valor_atual = linha.dados[deslocamento]
+            if valor <= valor_atual:
+                self._read_hit(conjunto, linha, endereco, deslocamento)
+                return False, valor_atual
+            self._escrever(conjunto, indice, tag, deslocamento, endereco, valor)
+            return True, valor_atual
+
+        # Miss: leitura exclusiva condicional, numa única transação
+        self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+        self.log('MISS no lance do endereço %d.', endereco)
+        bloco, valor_atual = self.barramento.solicitar_lance(endereco, self.id, valor)
+        if bloco is None:
+            self.contadores.leituras_miss += 1 # recusado (ou endereço inválido): nada é trazido para a cache
+            return False, valor_atual
+
+        self.contadores.escritas_miss += 1
         if linha:
-            # Atualiza a linha existente
-            linha.dado = valor
-            linha.estado = Estado.MODIFIED
-            return linha
+            conjunto.politica.inserir(linha.via) # reaproveita a via da linha INVALID
         else:
-            # Cria uma nova linha
-            nova_linha = LinhaCache()
-            nova_linha.tag = endereco
-            nova_linha.dado = valor
-            nova_linha.estado = Estado.MODIFIED
-            self.linhas.append(nova_linha)
-            return nova_linha
+            linha = self._alocar_linha(indice, tag)
+        linha.dados[:], linha.autores[:] = bloco
+        linha.dados[deslocamento] = valor
+        linha.autores[deslocamento] = self.id
+        linha.acessados = 1 << deslocamento
+        self.mudar_estado(linha, Estado.MODIFIED)
+        return True, valor_atual
+
+    def _prebuscar(self, inicio : int) -> None:
+        """
+        Treina a unidade de pré-busca com o evento no bloco em *inicio*, com o árbitro adquirido,
+        e traz em SHARED os blocos sugeridos que a cache ainda não tem. Blocos com escritas
+        pendentes no buffer de outra cache ficam de fora, para não forçar a drenagem.
+        """
+        for alvo in self.prebusca.observar(inicio):
+            indice, tag, _ = self.dividir_endereco(alvo)
+            conjunto = self.conjuntos[indice]
+            with conjunto.trava:
+                linha = conjunto.linhas.get(tag)
+                if linha and linha.estado != Estado.INVALID:
+                    continue
+                dona = self.barramento.pendentes.get(alvo)
+                if dona is not None and dona != self.id:
+                    continue
+
+                self.contadores.prebuscas += 1
+                bloco = self.barramento.solicitar_prebusca(alvo, self.id)
+                if bloco is None:
+                    self.contadores.prebuscas_canceladas += 1
+                    continue
+                # A via só é ocupada depois da transação: uma pré-busca cancelada não substitui ninguém
+                if linha:
+                    conjunto.politica.inserir(linha.via)
+                else:
+                    linha = self._alocar_linha(indice, tag)
+                linha.dados[:], linha.autores[:] = bloco
+                linha.acessados = 0 # ainda não usada pelo processador
+                self.mudar_estado(linha, Estado.SHARED)
+                self.log('Bloco %d pré-buscado.', alvo, nivel=COMPLETO)
+
+    def _ler_pendente(self, endereco : int) -> int:
+        """ Leitura de um endereço com escrita no buffer: o processador lê a própria escrita. """
+        self.contadores.leituras_hit += 1
+        self.relogio.cobrar(self.id, self.relogio.latencias.hit)
+        dado = self.buffer.entradas[endereco]
+        self.log('READ HIT no buffer de escrita, endereço %d. Dado: %s', endereco, dado, nivel=COMPLETO)
+        return dado
+
+    def _ordenar_leitura(self) -> None:
+        """ Na consistência sequencial, uma leitura de outro endereço espera as escritas pendentes. """
+        if self.buffer.sequencial and self.buffer.entradas:
+            with self.barramento.arbitro:
+                self.drenar_buffer()
+
+    def _bufferizar(self, conjunto : Conjunto, tag : int, endereco : int, valor : int) -> bool:
+        """
+        Tenta deixar a escrita de *valor* no buffer. Retorna False quando ela deve seguir
+        o caminho normal: miss, write hit local com o buffer vazio, ou outra cache com
+        escritas pendentes no bloco (que o caminho normal drena antes).
+        """
+        buffer = self.buffer
+        if endereco in buffer.entradas:
+            buffer.entradas[endereco] = valor
+            self.contadores.escritas_coalescidas += 1
+            return True
+
+        linha = conjunto.linhas.get(tag)
+        if not linha or linha.estado == Estado.INVALID:
+            return False
+        if not buffer.entradas and linha.estado in self.protocolo.escrita_local:
+            return False
+        dona = self.barramento.pendentes.get(linha.inicio)
+        if dona is not None and dona != self.id:
+            return False
+        if buffer.cheio():
+            with self.barramento.arbitro:
+                self.drenar_buffer()
+            return self._bufferizar(conjunto, tag, endereco, valor) # a drenagem pode ter substituído a linha
+
+        buffer.entradas[endereco] = valor
+        self.barramento.pendentes[linha.inicio] = self.id
+        conjunto.politica.acessar(linha.via)
+        self.contadores.escritas_no_buffer += 1
+        self.log('Escrita no endereço %d retida no buffer de escrita.', endereco, nivel=COMPLETO)
+        return True
+
+    def _comparar_no_buffer(self, conjunto : Conjunto, tag : int, deslocamento : int, endereco : int,
+                            valor : int) -> tuple[bool, int | None] | None:
+        """
+        Compare-and-swap resolvido sem o barramento, com o buffer de escrita: compara com a
+        escrita pendente no endereço (se houver) ou com a linha válida, e deixa o valor aceito
+        no buffer. Retorna None quando o caminho normal precisa resolver (miss, por exemplo).
+        """
+        buffer = self.buffer
+        pendente = buffer.entradas.get(endereco)
+        if pendente is not None:
+            if valor <= pendente:
+                self._ler_pendente(endereco)
+                return False, pendente
+            buffer.entradas[endereco] = valor
+            self.contadores.escritas_coalescidas += 1
+            return True, pendente
+
+        self._ordenar_leitura()
+        linha = conjunto.linhas.get(tag)
+        if not linha or linha.estado == Estado.INVALID:
+            return None
+        valor_atual = linha.dados[deslocamento]
+        if valor <= valor_atual:
+            self._read_hit(conjunto, linha, endereco, deslocamento)
+            return False, valor_atual
+        if self._bufferizar(conjunto, tag, endereco, valor):
+            return True, valor_atual
+        return None
+
+    def _drenar_antes(self, inicio : int) -> None:
+        """
+        Antes de uma escrita pelo caminho normal: drena o próprio buffer (a escrita não pode
+        passar à frente das pendentes) e o da cache com escritas pendentes no bloco em *inicio*.
+        """
+        self.drenar_buffer()
+        self.barramento.drenar_pendentes(inicio, self.id)
+
+    def drenar_buffer(self) -> None:
+        """
+        Esvazia o buffer de escrita, com o árbitro já adquirido: cada endereço pendente é escrito
+        pelo caminho normal, e um bloco compartilhado pede um único upgrade para todas as suas escritas.
+        """
+        if self.buffer is None or not self.buffer.entradas:
+            return
+        entradas = self.buffer.retirar()
+        self.contadores.drenagens += 1
+        for endereco in entradas:
+            self.barramento.pendentes.pop(self.barramento.inicio_bloco(endereco), None)
+        self.log('Drenando %d escrita(s) do buffer de escrita.', len(entradas))
+        for endereco, valor in entradas.items():
+            indice, tag, deslocamento = self.dividir_endereco(endereco)
+            conjunto = self.conjuntos[indice]
+            with conjunto.trava:
+                self._escrever(conjunto, indice, tag, deslocamento, endereco, valor)
+
+    def barreira(self) -> None:
+        """ Barreira de memória (fence): as escritas pendentes ficam visíveis para todas as caches. """
+        if self.buffer is not None:
+            with self.barramento.arbitro:
+                self.drenar_buffer()
 
     def __repr__ (self):
         """
         Representação em string da cache
         """
-        res = f"[Cache {self.id}, tamanho {self.tamanho}]\n"
+        res = f"[Cache {self.id}, tamanho {self.tamanho}, {self.num_conjuntos} conjunto(s) de {self.associatividade} via(s)]\n"
 
-        if not self.linhas:
+        if not any(conjunto.linhas for conjunto in self.conjuntos):
             res += "Vazia\n"
         else:
-            for linha in self.linhas:
-                res += f" Estado: {linha.estado.value} | Tag: {linha.tag} | Dado: {linha.dado}\n"
+            for indice, conjunto in enumerate(self.conjuntos):
+                for linha in conjunto.vias:
+                    if linha.tag is None:
+                        continue
+                    endereco = self.montar_endereco(indice, linha.tag)
+                    dados = linha.dados.tolist()
+                    res += f" Estado: {linha.estado.sigla} | Conjunto: {indice} | Via: {linha.via} | Tag: {linha.tag} | Endereço: {endereco} | Dado: {dados}\n"
         return res
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Gerador de carga assíncrono para o servidor do leilão (servidor.py).
+
+Abre muitas conexões simultâneas, cada uma um comprador que alterna consultas
+de preço e lances em itens sorteados, e mede a latência de cada requisição.
+Ao final mostra a vazão e os percentis de latência por tipo de operação.
+
+Uso:
+    python carga.py --clientes 1000 --requisicoes 50 --itens 20
+"""
+from __future__ import annotations
+from estatisticas import percentil, PERCENTIS
+import argparse
+import asyncio
+import json
+import random
+import time
+
+PORTA_PADRAO = 8765 # também a do servidor.py, que a importa daqui: o cliente não carrega o simulador
+
+
+class Cliente():
+    def __init__(self, leitor : asyncio.StreamReader, escritor : asyncio.StreamWriter):
+        """ Conexão com o servidor, com uma requisição pendente por vez. """
+        self.leitor : asyncio.StreamReader = leitor
+        self.escritor : asyncio.StreamWriter = escritor
+
+    @classmethod
+    async def conectar(cls, host : str, porta : int) -> Cliente:
+        leitor, escritor = await asyncio.open_connection(host, porta, limit=2 ** 20)
+        return cls(leitor, escritor)
+
+    async def pedir(self, **requisicao) -> dict:
+        """ Envia a *requisicao* e espera a resposta. """
+        self.escritor.write(json.dumps(requisicao).encode() + b"\n")
+        await self.escritor.drain()
+        return json.loads(await self.leitor.readline())
+
+    async def fechar(self) -> None:
+        self.escritor.close()
+        await self.escritor.wait_closed()
+
+
+async def comprador(host : str, porta : int, indice : int, requisicoes : int, itens : list[int],
+                    proporcao_leitura : float, semente : int, latencias : dict[str, list[int]]) -> None:
+    """ Um cliente: *requisicoes* consultas ou lances, registrando a latência de cada uma. """
+    rng = random.Random(f"{semente}:{indice}")
+    cliente = await Cliente.conectar(host, porta)
+    await cliente.pedir(op="ola", nome=f"carga{indice}")
+    relogio = time.perf_counter_ns
+    for _ in range(requisicoes):
+        id_item = rng.choice(itens)
+        antes = relogio()
+        if rng.random() < proporcao_leitura:
+            resposta = await cliente.pedir(op="preco", item=id_item)
+            tipo = "preco"
+        else:
+            resposta = await cliente.pedir(op="lance", item=id_item, valor=rng.randint(1, 100000))
+            tipo = "lance"
+        latencias[tipo].append(relogio() - antes)
+        if not resposta.get("ok"):
+            latencias["erros"].append(0)
+    await cliente.fechar()
+
+
+async def gerar_carga(host : str, porta : int, clientes : int, requisicoes : int, itens : int,
+                      proporcao_leitura : float, semente : int) -> dict:
+    """ Cadastra os itens, dispara os *clientes* em paralelo e devolve o relatório de latências. """
+    cadastro = await Cliente.conectar(host, porta)
+    ids = [(await cadastro.pedir(op="item", nome=f"item{indice}", preco=100))["item"] for indice in range(itens)]
+    await cadastro.fechar()
+
+    latencias : dict[str, list[int]] = {"preco": [], "lance": [], "erros": []}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(comprador(host, porta, indice, requisicoes, ids, proporcao_leitura, semente, latencias)
+                           for indice in range(clientes)))
+    duracao = time.perf_counter() - inicio
+
+    total = len(latencias["preco"]) + len(latencias["lance"])
+    relatorio = {
+        "clientes": clientes,
+        "requisicoes": total,
+        "erros": len(latencias["erros"]),
+        "duracao_s": duracao,
+        "requisicoes_por_segundo": total / duracao if duracao > 0 else 0.0,
+        "latencia_us": {},
+    }
+    for tipo in ("preco", "lance"):
+        ordenados = sorted(latencias[tipo])
+        if ordenados:
+            relatorio["latencia_us"][tipo] = {f"p{p}": percentil(ordenados, p) / 1000 for p in PERCENTIS} | {"max": ordenados[-1] / 1000}
+    return relatorio
+
+
+def ler_argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gerador de carga para o servidor do leilão")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--clientes", type=int, default=100)
+    parser.add_argument("--requisicoes", type=int, default=50, help="requisições por cliente")
+    parser.add_argument("--itens", type=int, default=10)
+    parser.add_argument("--proporcao-leitura", type=float, default=0.5)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = ler_argumentos()
+    relatorio = asyncio.run(gerar_carga(args.host, args.porta, args.clientes, args.requisicoes, args.itens,
+                                        args.proporcao_leitura, args.semente))
+    print(f"{relatorio['requisicoes']} requisições de {relatorio['clientes']} clientes em {relatorio['duracao_s']:.2f} s "
+          f"({relatorio['requisicoes_por_segundo']:.0f} req/s, {relatorio['erros']} erros)")
+    for tipo, valores in relatorio["latencia_us"].items():
+        print(f"  {tipo:>6}: " + " | ".join(f"{nome} {valor:.0f} us" for nome, valor in valores.items()))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+
+if __name__ == "__main__":
+    main()
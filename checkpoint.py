@@ -0,0 +1,418 @@
+"""
+Checkpoint e restauração binários do estado completo de um Leilao.
+
+O formato é compacto e versionado: um cabeçalho (MAGICO, VERSAO) seguido das
+seções na ordem configuração, RAM, itens, compradores (com cada conjunto da cache:
+estado da política de substituição e as linhas em colunas; o buffer de escrita e a unidade de pré-busca), barramento (contadores, transições,
+autores gravados na RAM, relógio, diretório, clusters e LLC) e resumo do motor. Inteiros são empacotados com struct e
+vetores (memória, dados das linhas) com array, sem pickle do grafo de objetos.
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import fields
+from typing import Iterable, Iterator
+from cache import Conjunto
+from configuracao import Configuracao
+from leilao import Leilao
+from linha import LinhaCache
+from moesi import Estado
+from motor import MotorRastro, Resumo
+from ram import RAM, TAMANHO_PAGINA
+from rastro import Operacao
+from temporizacao import Latencias
+import gc
+import os
+import struct
+
+MAGICO = b"MOESICKP"
+VERSAO = 10
+
+CABECALHO = struct.Struct("<8sH")
+INTEIRO = struct.Struct("<q")
+BYTE = struct.Struct("<B")
+DUPLO = struct.Struct("<d")
+SEMENTE = struct.Struct("<BQ") # tem semente, semente
+
+ESTADOS = list(Estado) # na ordem dos valores: ESTADOS[int(estado)] é o estado
+
+
+class Escritor():
+    def __init__(self):
+        """ Acumula o checkpoint num bytearray antes de gravá-lo de uma vez. """
+        self.buffer : bytearray = bytearray()
+
+    def pacote(self, formato : struct.Struct, *valores) -> None:
+        self.buffer += formato.pack(*valores)
+
+    def inteiro(self, valor : int) -> None:
+        self.buffer += INTEIRO.pack(valor)
+
+    def texto(self, valor : str) -> None:
+        dados = valor.encode("utf-8")
+        self.inteiro(len(dados))
+        self.buffer += dados
+
+    def vetor(self, valores : Iterable[int] | array) -> None:
+        """ Sequência de inteiros de 64 bits, precedida do tamanho. """
+        if not isinstance(valores, array) or valores.typecode != "q":
+            valores = array("q", valores)
+        self.inteiro(len(valores))
+        self.buffer += valores.tobytes()
+
+
+class Leitor():
+    def __init__(self, dados : bytes):
+        """ Percorre o conteúdo de um checkpoint, seção a seção. """
+        self.dados : memoryview = memoryview(dados)
+        self.posicao : int = 0
+
+    def pacote(self, formato : struct.Struct) -> tuple:
+        valores = formato.unpack_from(self.dados, self.posicao)
+        self.posicao += formato.size
+        return valores
+
+    def inteiro(self) -> int:
+        return self.pacote(INTEIRO)[0]
+
+    def texto(self) -> str:
+        tamanho = self.inteiro()
+        valor = bytes(self.dados[self.posicao:self.posicao + tamanho]).decode("utf-8")
+        self.posicao += tamanho
+        return valor
+
+    def bruto(self, tamanho : int) -> memoryview:
+        """ Os próximos *tamanho* bytes, sem cópia. """
+        valor = self.dados[self.posicao:self.posicao + tamanho]
+        self.posicao += tamanho
+        return valor
+
+    def vetor(self) -> array:
+        tamanho = self.inteiro()
+        valores = array("q")
+        valores.frombytes(self.dados[self.posicao:self.posicao + 8 * tamanho])
+        self.posicao += 8 * tamanho
+        return valores
+
+
+def _pares(dicionario : dict[int, int]) -> array:
+    """ Achata {chave: valor} em [chave, valor, chave, valor, ...]. """
+    return array("q", [numero for par in dicionario.items() for numero in par])
+
+
+def _dicionario(valores : array) -> dict[int, int]:
+    return dict(zip(valores[::2], valores[1::2]))
+
+
+def _gravar_configuracao(escritor : Escritor, config : Configuracao) -> None:
+    escritor.vetor([config.tamanho_ram, config.tamanho_cache, config.tamanho_bloco,
+                    config.associatividade or 0, int(config.concorrente)])
+    escritor.pacote(SEMENTE, config.semente_ram is not None, config.semente_ram or 0)
+    escritor.texto(config.coerencia)
+    escritor.texto(config.politica)
+    escritor.texto(config.protocolo)
+    escritor.vetor([config.tamanho_llc, config.associatividade_llc or 0, config.clusters, config.compradores_por_cluster])
+    escritor.texto(config.inclusao_llc)
+    escritor.inteiro(config.buffer_escrita)
+    escritor.texto(config.consistencia)
+    escritor.texto(config.prebusca or "")
+    escritor.inteiro(config.grau_prebusca)
+    escritor.vetor(getattr(config.latencias, campo.name) for campo in fields(Latencias))
+
+
+def _ler_configuracao(leitor : Leitor) -> Configuracao:
+    tamanho_ram, tamanho_cache, tamanho_bloco, associatividade, concorrente = leitor.vetor()
+    tem_semente, semente_ram = leitor.pacote(SEMENTE)
+    coerencia = leitor.texto()
+    politica = leitor.texto()
+    protocolo = leitor.texto()
+    tamanho_llc, associatividade_llc, clusters, compradores_por_cluster = leitor.vetor()
+    inclusao_llc = leitor.texto()
+    buffer_escrita = leitor.inteiro()
+    consistencia = leitor.texto()
+    prebusca = leitor.texto() or None
+    grau_prebusca = leitor.inteiro()
+    latencias = Latencias(*leitor.vetor())
+    return Configuracao(tamanho_ram=tamanho_ram, semente_ram=semente_ram if tem_semente else None,
+                        tamanho_cache=tamanho_cache, tamanho_bloco=tamanho_bloco,
+                        associatividade=associatividade or None, coerencia=coerencia, politica=politica,
+                        protocolo=protocolo, tamanho_llc=tamanho_llc, associatividade_llc=associatividade_llc or None,
+                        inclusao_llc=inclusao_llc, clusters=clusters, compradores_por_cluster=compradores_por_cluster,
+                        buffer_escrita=buffer_escrita, consistencia=consistencia,
+                        prebusca=prebusca, grau_prebusca=grau_prebusca,
+                        concorrente=bool(concorrente), latencias=latencias)
+
+
+def _gravar_conjunto(escritor : Escritor, conjunto : Conjunto, tamanho_bloco : int) -> None:
+    """
+    Estado da política de substituição e linhas ocupadas de um conjunto (cache privada ou LLC), em colunas:
+    (via, tag, estado) de cada linha, as máscaras de palavras acessadas e os blocos (dados e autores).
+    """
+    escritor.vetor(conjunto.politica.exportar())
+    ocupadas = [linha for linha in conjunto.vias if linha.tag is not None]
+    escritor.vetor([valor for linha in ocupadas for valor in (linha.via, linha.tag, linha.estado)])
+    largura = (tamanho_bloco + 7) // 8
+    escritor.buffer += b"".join(linha.acessados.to_bytes(largura, "little") for linha in ocupadas)
+    for linha in ocupadas:
+        escritor.buffer += linha.dados.tobytes()
+        escritor.buffer += linha.autores.tobytes()
+
+
+def _ler_conjunto(leitor : Leitor, conjunto : Conjunto, tamanho_bloco : int, indice : int,
+                  num_conjuntos : int) -> list[LinhaCache]:
+    """
+    Restaura o conjunto *indice* (de *num_conjuntos*) gravado por _gravar_conjunto nas linhas
+    já criadas com ele; retorna as linhas restauradas.
+    """
+    conjunto.politica.importar(leitor.vetor().tolist())
+    metadados = leitor.vetor()
+    quantidade = len(metadados) // 3
+    largura = (tamanho_bloco + 7) // 8
+    mascaras = leitor.bruto(quantidade * largura)
+    blocos = array("q")
+    blocos.frombytes(leitor.bruto(quantidade * 16 * tamanho_bloco))
+
+    linhas = []
+    vias, ocupadas = conjunto.vias, conjunto.linhas
+    for posicao, (via, tag, codigo) in enumerate(zip(metadados[::3], metadados[1::3], metadados[2::3])):
+        linha = vias[via]
+        linha.tag = tag
+        linha.inicio = (tag * num_conjuntos + indice) * tamanho_bloco # como em montar_endereco
+        linha.estado = ESTADOS[codigo]
+        linha.acessados = int.from_bytes(mascaras[posicao * largura:(posicao + 1) * largura], "little")
+        inicio = 2 * tamanho_bloco * posicao
+        linha.dados = blocos[inicio:inicio + tamanho_bloco] # a fatia já é uma cópia: substitui os vetores vazios
+        linha.autores = blocos[inicio + tamanho_bloco:inicio + 2 * tamanho_bloco]
+        ocupadas[tag] = linha
+        linhas.append(linha)
+    return linhas
+
+
+def _gravar_resumo(escritor : Escritor, resumo : Resumo) -> None:
+    escritor.vetor([resumo.operacoes, resumo.invalidas, resumo.lances_aceitos, resumo.lances_rejeitados])
+    escritor.pacote(DUPLO, resumo.duracao)
+    escritor.inteiro(len(resumo.por_tipo))
+    for tipo, total in resumo.por_tipo.items():
+        escritor.texto(tipo)
+        escritor.inteiro(total)
+    escritor.inteiro(len(resumo.vencedores))
+    for id_item, (vencedor, preco) in resumo.vencedores.items():
+        escritor.vetor([id_item, vencedor is not None, preco is not None, preco or 0])
+        escritor.texto(vencedor or "")
+
+
+def _ler_resumo(leitor : Leitor) -> Resumo:
+    resumo = Resumo()
+    resumo.operacoes, resumo.invalidas, resumo.lances_aceitos, resumo.lances_rejeitados = leitor.vetor()
+    resumo.duracao = leitor.pacote(DUPLO)[0]
+    for _ in range(leitor.inteiro()):
+        tipo = leitor.texto()
+        resumo.por_tipo[tipo] = leitor.inteiro()
+    for _ in range(leitor.inteiro()):
+        id_item, tem_vencedor, tem_preco, preco = leitor.vetor()
+        vencedor = leitor.texto()
+        resumo.vencedores[id_item] = (vencedor if tem_vencedor else None, preco if tem_preco else None)
+    return resumo
+
+
+def salvar(leilao : Leilao, caminho : str, resumo : Resumo | None = None) -> None:
+    """
+    Grava o estado completo do *leilao* (e o *resumo* do motor, se houver) em *caminho*.
+    A gravação é atômica: o arquivo anterior só é substituído quando o novo está completo.
+    """
+    escritor = Escritor()
+    escritor.pacote(CABECALHO, MAGICO, VERSAO)
+    _gravar_configuracao(escritor, leilao.config)
+
+    # RAM: a semente e apenas as páginas já criadas (as outras são geradas de novo pela semente)
+    ram = leilao.ram
+    escritor.pacote(SEMENTE, True, ram.semente)
+    escritor.vetor(ram.contadores.como_dict().values())
+    paginas = ram.paginas_criadas()
+    escritor.vetor(paginas)
+    for numero in paginas:
+        escritor.buffer += ram.ler_intervalo(numero * TAMANHO_PAGINA, TAMANHO_PAGINA).tobytes()
+
+    # Itens
+    escritor.inteiro(len(leilao.itens))
+    for item in leilao.itens:
+        escritor.texto(item.nome)
+        escritor.vetor([item.preco, int(item.encerrado)])
+
+    # Compradores e suas caches
+    topologia = leilao.barramento.topologia
+    escritor.inteiro(len(leilao.compradores))
+    for comprador in leilao.compradores:
+        cache = comprador.cache
+        escritor.texto(comprador.nome)
+        escritor.texto(cache.politica)
+        escritor.inteiro(topologia.cluster_de[cache.id] if topologia is not None else 0)
+        escritor.vetor([comprador.lances, comprador.lances_aceitos, *cache.contadores.como_dict().values()])
+        for conjunto in cache.conjuntos:
+            _gravar_conjunto(escritor, conjunto, cache.tamanho_bloco)
+        escritor.vetor(_pares(cache.buffer.entradas) if cache.buffer is not None else [])
+        escritor.vetor(cache.prebusca.exportar() if cache.prebusca is not None else [])
+
+    # Barramento: contadores, transições, write-backs, relógio e diretório
+    barramento = leilao.barramento
+    escritor.vetor(barramento.contadores.como_dict().values())
+    escritor.vetor(barramento.transicoes.contagem.get((de, para), 0) for de in ESTADOS for para in ESTADOS)
+    escritor.vetor(_pares(barramento.write_backs_por_endereco))
+    escritor.vetor(_pares(barramento.autores_ram))
+    escritor.inteiro(barramento.relogio.ciclos_sem_processador)
+    escritor.vetor(_pares(barramento.relogio.ciclos_por_processador))
+    diretorio = barramento.diretorio
+    escritor.pacote(BYTE, diretorio is not None)
+    if diretorio is not None:
+        escritor.inteiro(len(diretorio.compartilhadores))
+        for endereco, compartilhadores in diretorio.compartilhadores.items():
+            escritor.inteiro(endereco)
+            escritor.vetor(compartilhadores)
+        escritor.vetor(_pares(diretorio.donos))
+    if topologia is not None: # a topologia também já está na configuração
+        for contadores in topologia.contadores:
+            escritor.vetor(contadores.como_dict().values())
+        escritor.inteiro(len(topologia.presenca))
+        for inicio, clusters in topologia.presenca.items():
+            escritor.inteiro(inicio)
+            escritor.vetor(sorted(clusters))
+    llc = barramento.llc
+    if llc is not None: # a presença da LLC já está na configuração
+        escritor.vetor(llc.contadores.como_dict().values())
+        for conjunto in llc.conjuntos:
+            _gravar_conjunto(escritor, conjunto, llc.tamanho_bloco)
+
+    escritor.pacote(BYTE, resumo is not None)
+    if resumo is not None:
+        _gravar_resumo(escritor, resumo)
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(escritor.buffer)
+    os.replace(temporario, caminho)
+
+
+def carregar(caminho : str) -> tuple[Leilao, Resumo | None]:
+    """ Reconstrói o leilão (e o resumo, se gravado) a partir do checkpoint em *caminho*. """
+    with open(caminho, "rb") as arquivo:
+        leitor = Leitor(arquivo.read())
+
+    magico, versao = leitor.pacote(CABECALHO)
+    if magico != MAGICO:
+        raise ValueError(f"{caminho} não é um checkpoint do simulador.")
+    if versao != VERSAO:
+        raise ValueError(f"Versão de checkpoint {versao} não suportada (esperada {VERSAO}).")
+
+    # Milhares de linhas e vetores são criados de uma vez, e nenhum deles forma ciclos:
+    # as passagens do coletor de ciclos no meio da restauração só a atrasariam
+    coletor_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        return _ler_leilao(leitor)
+    finally:
+        if coletor_ativo:
+            gc.enable()
+
+
+def _ler_leilao(leitor : Leitor) -> tuple[Leilao, Resumo | None]:
+    """ Seções do checkpoint após o cabeçalho, na ordem em que salvar as grava. """
+    config = _ler_configuracao(leitor)
+
+    # RAM (sempre restaurada em memória, mesmo que a original fosse uma imagem em arquivo);
+    # cada página só é copiada do checkpoint no primeiro acesso
+    _, semente = leitor.pacote(SEMENTE)
+    ram = RAM(config.tamanho_ram, semente)
+    for nome, valor in zip(ram.contadores.__slots__, leitor.vetor()):
+        setattr(ram.contadores, nome, valor)
+    for numero in leitor.vetor():
+        ram.carregar_pagina(numero, leitor.bruto(8 * TAMANHO_PAGINA))
+    leilao = Leilao(config, ram)
+
+    # Itens
+    for _ in range(leitor.inteiro()):
+        nome = leitor.texto()
+        preco, encerrado = leitor.vetor()
+        item = leilao.adicionar_item(nome, preco, inicializar_ram=False)
+        item.encerrado = bool(encerrado)
+
+    # Compradores e suas caches
+    tamanho_bloco = config.tamanho_bloco
+    sujos, indice_donos = leilao.barramento.protocolo.sujos, leilao.barramento.indice_donos
+    for _ in range(leitor.inteiro()):
+        nome = leitor.texto()
+        politica = leitor.texto()
+        cluster = leitor.inteiro()
+        comprador = leilao.adicionar_comprador(nome, politica, cluster if config.clusters > 1 else None)
+        cache = comprador.cache
+        comprador.lances, comprador.lances_aceitos, *contadores = leitor.vetor()
+        for nome_contador, valor in zip(cache.contadores.__slots__, contadores):
+            setattr(cache.contadores, nome_contador, valor)
+        for indice, conjunto in enumerate(cache.conjuntos):
+            for linha in _ler_conjunto(leitor, conjunto, tamanho_bloco, indice, cache.num_conjuntos):
+                if linha.estado in sujos:
+                    indice_donos[linha.inicio] = cache.id
+        for endereco, valor in _dicionario(leitor.vetor()).items():
+            cache.buffer.entradas[endereco] = valor
+            leilao.barramento.pendentes[leilao.barramento.inicio_bloco(endereco)] = cache.id
+        estado_prebusca = leitor.vetor().tolist()
+        if cache.prebusca is not None:
+            cache.prebusca.importar(estado_prebusca)
+
+    # Barramento
+    barramento = leilao.barramento
+    for nome, valor in zip(barramento.contadores.__slots__, leitor.vetor()):
+        setattr(barramento.contadores, nome, valor)
+    transicoes = iter(leitor.vetor())
+    barramento.transicoes.contagem = {(de, para): total for de in ESTADOS for para in ESTADOS
+                                      if (total := next(transicoes))}
+    barramento.write_backs_por_endereco = _dicionario(leitor.vetor())
+    barramento.autores_ram = _dicionario(leitor.vetor())
+    barramento.relogio.ciclos_sem_processador = leitor.inteiro()
+    barramento.relogio.ciclos_por_processador = _dicionario(leitor.vetor())
+    if leitor.pacote(BYTE)[0]:
+        diretorio = barramento.diretorio
+        for _ in range(leitor.inteiro()):
+            endereco = leitor.inteiro()
+            diretorio.compartilhadores[endereco] = set(leitor.vetor())
+        diretorio.donos = _dicionario(leitor.vetor())
+    topologia = barramento.topologia
+    if topologia is not None:
+        for contadores in topologia.contadores:
+            for nome, valor in zip(contadores.__slots__, leitor.vetor()):
+                setattr(contadores, nome, valor)
+        for _ in range(leitor.inteiro()):
+            inicio = leitor.inteiro()
+            topologia.presenca[inicio] = set(leitor.vetor())
+    llc = barramento.llc
+    if llc is not None:
+        for nome, valor in zip(llc.contadores.__slots__, leitor.vetor()):
+            setattr(llc.contadores, nome, valor)
+        for indice, conjunto in enumerate(llc.conjuntos):
+            _ler_conjunto(leitor, conjunto, tamanho_bloco, indice, llc.num_conjuntos)
+
+    resumo = _ler_resumo(leitor) if leitor.pacote(BYTE)[0] else None
+    return leilao, resumo
+
+
+def restaurar(caminho : str) -> MotorRastro:
+    """ Motor pronto para continuar o rastro do ponto em que o checkpoint foi gravado. """
+    leilao, resumo = carregar(caminho)
+    motor = MotorRastro(leilao)
+    if resumo is not None:
+        motor.resumo = resumo
+    return motor
+
+
+def executar_com_checkpoints(motor : MotorRastro, operacoes : Iterable[Operacao], caminho : str,
+                             a_cada : int) -> Resumo:
+    """
+    Executa as *operacoes* no *motor*, gravando um checkpoint em *caminho*
+    a cada *a_cada* operações do rastro (contadas desde o início, inclusive as já restauradas).
+    """
+    def intercalar() -> Iterator[Operacao]:
+        for operacao in operacoes:
+            yield operacao
+            # o gerador só continua depois que o motor aplicou a operação
+            if motor.resumo.operacoes % a_cada == 0:
+                salvar(motor.leilao, caminho, motor.resumo)
+
+    return motor.executar(intercalar())
@@ -0,0 +1,104 @@
+"""
+Execução concorrente de um rastro, com cada comprador em sua própria thread.
+
+As operações 'ler' e 'lance' vão para a fila da thread do comprador e executam
+em paralelo com as dos demais. As operações 'item', 'comprador' e 'encerrar' são
+barreiras: as filas são esvaziadas antes, para o encerramento ver todos os lances
+anteriores a ele no rastro.
+
+O leilão precisa ter sido criado com Configuracao(concorrente=True), que liga as
+travas do barramento (árbitro), dos conjuntos das caches e dos itens.
+"""
+from __future__ import annotations
+from typing import Iterable
+from leilao import Leilao
+from motor import MotorRastro, Resumo
+from rastro import Operacao
+import queue
+import threading
+import time
+
+# Marca de fim na fila de uma thread
+FIM = None
+
+
+class MotorConcorrente(MotorRastro):
+    def __init__(self, leilao : Leilao):
+        """ Motor que distribui as operações dos compradores entre threads. """
+        if not leilao.config.concorrente:
+            raise ValueError("O motor concorrente exige um leilão criado com Configuracao(concorrente=True).")
+        super().__init__(leilao)
+        self.filas : dict[int, queue.Queue] = {}
+        self.threads : list[threading.Thread] = []
+        self.motores : list[MotorRastro] = [] # um por thread, cada um com o seu resumo
+        self.erros : list[BaseException] = []
+
+    def _trabalhador(self, fila : queue.Queue, motor : MotorRastro) -> None:
+        """ Laço da thread de um comprador: aplica as operações da *fila* até a marca de fim. """
+        while True:
+            operacao = fila.get()
+            try:
+                if operacao is FIM:
+                    return
+                motor.aplicar(operacao)
+            except Exception as erro:
+                self.erros.append(erro) # repassado à thread principal no encerramento
+            finally:
+                fila.task_done()
+
+    def _fila(self, id_comprador : int) -> queue.Queue:
+        """ Fila da thread do comprador, criada no primeiro uso. """
+        fila = self.filas.get(id_comprador)
+        if fila is None:
+            fila = self.filas[id_comprador] = queue.Queue()
+            motor = MotorRastro(self.leilao)
+            thread = threading.Thread(target=self._trabalhador, args=(fila, motor),
+                                      name=f"comprador-{id_comprador}", daemon=True)
+            self.motores.append(motor)
+            self.threads.append(thread)
+            thread.start()
+        return fila
+
+    def sincronizar(self) -> None:
+        """ Espera todas as threads terminarem as operações já enfileiradas. """
+        for fila in self.filas.values():
+            fila.join()
+
+    def aplicar(self, operacao : Operacao) -> None:
+        if operacao.tipo in ("ler", "lance") and self._comprador(operacao.args[0]) is not None:
+            self._fila(operacao.args[0]).put(operacao)
+            return
+        self.sincronizar()
+        super().aplicar(operacao)
+
+    def encerrar(self) -> None:
+        """ Encerra as threads e junta os resumos delas ao resumo do motor. """
+        for fila in self.filas.values():
+            fila.put(FIM)
+        for thread in self.threads:
+            thread.join()
+
+        resumo = self.resumo
+        for motor in self.motores:
+            parcial : Resumo = motor.resumo
+            resumo.operacoes += parcial.operacoes
+            for tipo, total in parcial.por_tipo.items():
+                resumo.por_tipo[tipo] = resumo.por_tipo.get(tipo, 0) + total
+            resumo.invalidas += parcial.invalidas
+            resumo.lances_aceitos += parcial.lances_aceitos
+            resumo.lances_rejeitados += parcial.lances_rejeitados
+        self.filas, self.threads, self.motores = {}, [], []
+        if self.erros:
+            raise self.erros[0]
+
+    def executar(self, operacoes : Iterable[Operacao]) -> Resumo:
+        """ Distribui as *operacoes* entre as threads e retorna o resumo quando todas terminarem. """
+        inicio = time.perf_counter()
+        try:
+            for operacao in operacoes:
+                self.aplicar(operacao)
+        finally:
+            self.encerrar()
+        self.resumo.duracao += time.perf_counter() - inicio
+        self.medir_tempo()
+        return self.resumo
@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+from ram import TAMANHO_RAM
+from cache import TAMANHO_CACHE, POLITICA_PADRAO
+from temporizacao import Latencias
+from protocolo import PROTOCOLO_PADRAO
+from llc import INCLUSAO_PADRAO
+from buffer_escrita import CONSISTENCIA_PADRAO
+from substituicao import validar_vias
+
+# Parâmetros da simulação, agrupados para serem repassados ao Leilão
+@dataclass
+class Configuracao:
+    tamanho_ram : int = TAMANHO_RAM # quantidade de endereços da memória principal
+    semente_ram : int | None = None # conteúdo inicial da RAM; None = sorteada
+    arquivo_ram : str | None = None # imagem persistente da RAM (mmap); None = apenas em memória
+    tamanho_cache : int = TAMANHO_CACHE # quantidade total de linhas de cada cache
+    tamanho_bloco : int = 1 # palavras por linha (bloco transferido pelo barramento)
+    associatividade : int | None = None # vias por conjunto; None = totalmente associativa
+    coerencia : str = "broadcast" # "broadcast" (snooping) ou "diretorio" (snoop filter)
+    politica : str = POLITICA_PADRAO # substituição: "fifo", "lru", "plru" ou "aleatoria"
+    protocolo : str = PROTOCOLO_PADRAO # coerência: "moesi", "mesi", "msi" ou "mesif"
+    tamanho_llc : int = 0 # linhas da cache compartilhada de último nível; 0 = sem LLC
+    associatividade_llc : int | None = None # vias por conjunto da LLC; None = totalmente associativa
+    inclusao_llc : str = INCLUSAO_PADRAO # "inclusiva", "exclusiva" ou "nine"
+    clusters : int = 1 # barramentos locais ligados por uma camada de coerência; 1 = barramento único
+    compradores_por_cluster : int = 0 # compradores consecutivos em cada cluster; 0 = rodízio
+    buffer_escrita : int = 0 # endereços no buffer de escrita de cada cache; 0 = sem buffer
+    consistencia : str = CONSISTENCIA_PADRAO # ordem das escritas do buffer: "sequencial" ou "tso"
+    prebusca : str | None = None # pré-busca de cada cache: "proxima", "passo" ou "popular"; None = sem pré-busca
+    grau_prebusca : int = 1 # blocos sugeridos por evento da pré-busca
+    concorrente : bool = False # travas no barramento, conjuntos e itens para compradores em threads
+    latencias : Latencias = field(default_factory=Latencias) # custo em ciclos de cada evento de memória
+
+    def __post_init__(self):
+        """ Confere a geometria das caches e da LLC antes da execução, e não no primeiro comprador. """
+        associatividade = self.associatividade if self.associatividade is not None else self.tamanho_cache
+        if associatividade <= 0 or self.tamanho_cache % associatividade != 0:
+            raise ValueError(f"Associatividade {associatividade} inválida para cache de tamanho {self.tamanho_cache}.")
+        validar_vias(self.politica, associatividade)
+        if self.tamanho_llc > 0:
+            associatividade_llc = self.associatividade_llc if self.associatividade_llc is not None else self.tamanho_llc
+            if associatividade_llc <= 0 or self.tamanho_llc % associatividade_llc != 0:
+                raise ValueError(f"Associatividade {associatividade_llc} inválida para LLC de tamanho {self.tamanho_llc}.")
+            validar_vias(self.politica, associatividade_llc)
@@ -0,0 +1,43 @@
+class Diretorio():
+    def __init__(self):
+        """
+        Inicializa o diretório (snoop filter) do barramento.
+        Para cada endereço da RAM guarda o conjunto de caches que possuem a linha
+        e a cache dona, isto é, aquela que a detém em M, O ou E.
+        """
+        self.compartilhadores : dict[int, set[int]] = {}
+        self.donos : dict[int, int] = {}
+
+    def consultar(self, endereco : int, leitura : bool) -> tuple[int, ...]:
+        """
+        Retorna os ids das caches que precisam ser consultadas para o *endereco*.
+        Numa leitura basta a dona, se existir; numa escrita, todas as que possuem a linha.
+        """
+        if leitura:
+            dono = self.donos.get(endereco)
+            if dono is not None:
+                return (dono,)
+        return tuple(self.compartilhadores.get(endereco, ()))
+
+    def registrar_leitura(self, endereco : int, id_cache : int, dono : int | None) -> None:
+        """ A cache *id_cache* recebeu a linha numa leitura; *dono* é a dona resultante. """
+        self.compartilhadores.setdefault(endereco, set()).add(id_cache)
+        if dono is None:
+            self.donos.pop(endereco, None)
+        else:
+            self.donos[endereco] = dono
+
+    def registrar_escrita(self, endereco : int, id_cache : int) -> None:
+        """ A cache *id_cache* passa a ser a única com a linha, em MODIFIED. """
+        self.compartilhadores[endereco] = {id_cache}
+        self.donos[endereco] = id_cache
+
+    def remover(self, endereco : int, id_cache : int) -> None:
+        """ A cache *id_cache* deixou de ter a linha (invalidação ou substituição). """
+        compartilhadores = self.compartilhadores.get(endereco)
+        if compartilhadores is not None:
+            compartilhadores.discard(id_cache)
+            if not compartilhadores:
+                del self.compartilhadores[endereco]
+        if self.donos.get(endereco) == id_cache:
+            del self.donos[endereco]
@@ -0,0 +1,271 @@
+"""
+Contadores de desempenho da simulação e exportação em JSON/CSV.
+
+Os contadores são objetos com __slots__ e inteiros simples, incrementados
+diretamente no caminho crítico; por isso podem ficar sempre ligados.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from moesi import Estado
+import csv
+import json
+
+if TYPE_CHECKING:
+    from leilao import Leilao
+
+
+class Contadores():
+    """ Base dos contadores: cada nome em __slots__ é um inteiro iniciado em zero. """
+    __slots__ = ()
+
+    def __init__(self):
+        for nome in self.__slots__:
+            setattr(self, nome, 0)
+
+    def como_dict(self) -> dict[str, int]:
+        return {nome: getattr(self, nome) for nome in self.__slots__}
+
+    def somar(self, outro : Contadores) -> None:
+        """ Acumula os valores de *outro* contador do mesmo tipo. """
+        for nome in self.__slots__:
+            setattr(self, nome, getattr(self, nome) + getattr(outro, nome))
+
+
+class ContadoresCache(Contadores):
+    __slots__ = ("leituras_hit", "leituras_miss", "escritas_hit", "escritas_miss",
+                 "substituicoes", "write_backs", "escritas_no_buffer", "escritas_coalescidas", "drenagens",
+                 "prebuscas", "prebuscas_canceladas", "prebuscas_uteis", "prebuscas_inuteis")
+
+
+class ContadoresBarramento(Contadores):
+    __slots__ = ("bus_rd", "bus_rdx", "bus_upgr", "bus_lance", "transacoes_economizadas", "invalidacoes", "invalidacoes_falso_compartilhamento",
+                 "transferencias_cache", "leituras_ram", "write_backs", "bus_prebusca", "lances_recusados")
+
+
+class ContadoresRAM(Contadores):
+    __slots__ = ("leituras", "escritas")
+
+
+class ContadoresCluster(Contadores):
+    __slots__ = ("transacoes", "transacoes_remotas", "transferencias_remotas", "invalidacoes_remotas", "snoops_recebidos")
+
+
+class ContadoresLLC(Contadores):
+    __slots__ = ("acertos", "faltas", "write_backs_absorvidos", "substituicoes", "invalidacoes_inclusao",
+                 "write_backs_ram")
+
+
+class MatrizTransicoes():
+    def __init__(self):
+        """ Conta as transições de estado (de -> para) das linhas de todas as caches. """
+        self.contagem : dict[tuple[Estado, Estado], int] = {}
+
+    def registrar(self, de : Estado, para : Estado) -> None:
+        chave = (de, para)
+        self.contagem[chave] = self.contagem.get(chave, 0) + 1
+
+    def como_dict(self) -> dict[str, dict[str, int]]:
+        """ Matriz completa, com linhas e colunas para todos os estados. """
+        return {de.sigla: {para.sigla: self.contagem.get((de, para), 0) for para in Estado} for de in Estado}
+
+
+PERCENTIS = (50, 90, 99) # percentis de latência relatados pelo benchmark e pelo gerador de carga
+
+
+def percentil(ordenados : list[int], p : float) -> int:
+    """ Percentil *p* (0-100) de uma lista já ordenada, pelo método do vizinho mais próximo. """
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _taxa(parte : int, total : int) -> float:
+    return parte / total if total else 0.0
+
+
+def _transacoes(barramento : dict[str, int]) -> int:
+    """ Total de transações no barramento (leituras, leituras exclusivas, upgrades, lances atômicos e pré-buscas). """
+    return (barramento["bus_rd"] + barramento["bus_rdx"] + barramento["bus_upgr"] + barramento["bus_lance"]
+            + barramento["bus_prebusca"])
+
+
+def _resumir_llc(llc : dict[str, int]) -> None:
+    """ Taxa de acerto e acessos à RAM evitados pela LLC: hits e write-backs absorvidos, menos os que ela gravou depois. """
+    llc["taxa_acerto"] = _taxa(llc["acertos"], llc["acertos"] + llc["faltas"])
+    llc["acessos_ram_evitados"] = llc["acertos"] + llc["write_backs_absorvidos"] - llc["write_backs_ram"]
+
+
+def _resumir_prebusca(prebusca : dict[str, int], transacoes : int) -> None:
+    """
+    Precisão (linhas pré-buscadas que foram usadas), cobertura (misses de leitura evitados)
+    e tráfego desperdiçado (pré-buscas que não evitaram miss nenhum, inclusive as canceladas).
+    """
+    trazidas = prebusca["prebuscas"] - prebusca["prebuscas_canceladas"]
+    prebusca["precisao"] = _taxa(prebusca["prebuscas_uteis"], trazidas)
+    prebusca["cobertura"] = _taxa(prebusca["prebuscas_uteis"], prebusca["prebuscas_uteis"] + prebusca["leituras_miss"])
+    prebusca["trafego_desperdicado"] = prebusca["prebuscas"] - prebusca["prebuscas_uteis"]
+    prebusca["fracao_desperdicada"] = _taxa(prebusca["trafego_desperdicado"], transacoes)
+
+
+def _somar_prebusca(caches : dict[str, dict]) -> dict[str, int]:
+    """ Contadores de pré-busca de todas as caches, com os misses de leitura que sobraram. """
+    nomes = ("prebuscas", "prebuscas_canceladas", "prebuscas_uteis", "prebuscas_inuteis", "leituras_miss")
+    return {nome: sum(contadores[nome] for contadores in caches.values()) for nome in nomes}
+
+
+def _resumir_clusters(clusters : dict[str, dict[str, int]]) -> None:
+    """ Transações resolvidas no barramento local de cada cluster e fração das que saíram dele. """
+    for contadores in clusters.values():
+        contadores["transacoes_locais"] = contadores["transacoes"] - contadores["transacoes_remotas"]
+        contadores["fracao_remota"] = _taxa(contadores["transacoes_remotas"], contadores["transacoes"])
+
+
+def coletar(leilao : Leilao) -> dict:
+    """ Reúne todos os contadores do *leilao* num dicionário pronto para exportação. """
+    barramento = leilao.barramento
+    caches = {}
+    for comprador in leilao.compradores:
+        contadores = comprador.cache.contadores.como_dict()
+        acessos = sum(contadores[nome] for nome in ("leituras_hit", "leituras_miss", "escritas_hit", "escritas_miss"))
+        acertos = contadores["leituras_hit"] + contadores["escritas_hit"]
+        contadores["taxa_acerto"] = _taxa(acertos, acessos)
+        contadores["ciclos"] = barramento.relogio.ciclos_de(comprador.id)
+        contadores["amat"] = _taxa(contadores["ciclos"], acessos)
+        contadores["lances"] = comprador.lances
+        contadores["lances_aceitos"] = comprador.lances_aceitos
+        caches[comprador.nome] = contadores
+
+    contadores_barramento = barramento.contadores.como_dict()
+    transacoes = _transacoes(contadores_barramento)
+    lances = sum(comprador.lances for comprador in leilao.compradores)
+
+    dados = {
+        "caches": caches,
+        "barramento": contadores_barramento,
+        "ram": leilao.ram.contadores.como_dict(),
+        "transicoes": barramento.transicoes.como_dict(),
+        "write_backs_por_endereco": {str(endereco): total for endereco, total in sorted(barramento.write_backs_por_endereco.items())},
+        "lances": lances,
+        "transacoes_por_lance": _taxa(transacoes, lances),
+        "ciclos": barramento.relogio.ciclos,
+    }
+    if barramento.topologia is not None:
+        dados["clusters"] = {str(indice): contadores.como_dict()
+                             for indice, contadores in enumerate(barramento.topologia.contadores)}
+        _resumir_clusters(dados["clusters"])
+    if barramento.llc is not None:
+        dados["llc"] = barramento.llc.contadores.como_dict()
+        _resumir_llc(dados["llc"])
+    if contadores_barramento["bus_prebusca"]:
+        dados["prebusca"] = _somar_prebusca(caches)
+        _resumir_prebusca(dados["prebusca"], transacoes)
+    return dados
+
+
+def _somar(a : dict, b : dict) -> dict:
+    """ Soma, chave a chave, dois dicionários aninhados de contadores. """
+    res = dict(a)
+    for chave, valor in b.items():
+        if chave not in res:
+            res[chave] = valor
+        elif isinstance(valor, dict):
+            res[chave] = _somar(res[chave], valor)
+        else:
+            res[chave] = res[chave] + valor
+    return res
+
+
+def combinar(partes : list[dict]) -> dict:
+    """
+    Junta as estatísticas de execuções independentes (fragmentos da execução paralela)
+    somando os contadores; as taxas são recalculadas a partir dos totais.
+    """
+    dados = partes[0]
+    for parte in partes[1:]:
+        dados = _somar(dados, parte)
+
+    for contadores in dados["caches"].values():
+        acessos = sum(contadores[nome] for nome in ("leituras_hit", "leituras_miss", "escritas_hit", "escritas_miss"))
+        contadores["taxa_acerto"] = _taxa(contadores["leituras_hit"] + contadores["escritas_hit"], acessos)
+        contadores["amat"] = _taxa(contadores["ciclos"], acessos)
+
+    barramento = dados["barramento"]
+    transacoes = _transacoes(barramento)
+    dados["transacoes_por_lance"] = _taxa(transacoes, dados["lances"])
+    if "clusters" in dados:
+        _resumir_clusters(dados["clusters"])
+    if "llc" in dados:
+        _resumir_llc(dados["llc"])
+    if "prebusca" in dados:
+        dados["prebusca"] = _somar_prebusca(dados["caches"])
+        _resumir_prebusca(dados["prebusca"], transacoes)
+    dados["write_backs_por_endereco"] = dict(sorted(dados["write_backs_por_endereco"].items(), key=lambda par: int(par[0])))
+    return dados
+
+
+def _linhas_csv(dados : dict, prefixo : str = ""):
+    """ Achata o dicionário aninhado em pares (métrica, valor). """
+    for chave, valor in dados.items():
+        nome = f"{prefixo}.{chave}" if prefixo else str(chave)
+        if isinstance(valor, dict):
+            yield from _linhas_csv(valor, nome)
+        else:
+            yield nome, valor
+
+
+def exportar(dados : dict, caminho : str) -> None:
+    """ Grava as estatísticas em *caminho*, em CSV se a extensão for .csv, senão em JSON. """
+    if caminho.lower().endswith(".csv"):
+        with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(["metrica", "valor"])
+            escritor.writerows(_linhas_csv(dados))
+    else:
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+
+
+def formatar(dados : dict) -> str:
+    """ Texto legível das estatísticas, usado pela opção do menu do leilão. """
+    res = "Caches:\n"
+    for nome, contadores in dados["caches"].items():
+        res += (f"  {nome}: taxa de acerto {contadores['taxa_acerto']:.1%} | "
+                f"RH {contadores['leituras_hit']} RM {contadores['leituras_miss']} "
+                f"WH {contadores['escritas_hit']} WM {contadores['escritas_miss']} | "
+                f"substituições {contadores['substituicoes']} | write-backs {contadores['write_backs']} | "
+                f"AMAT {contadores['amat']:.1f} ciclos\n")
+        if contadores["escritas_no_buffer"]:
+            res += (f"    buffer de escrita: {contadores['escritas_no_buffer']} escritas retidas | "
+                    f"{contadores['escritas_coalescidas']} coalescidas | {contadores['drenagens']} drenagens\n")
+        if contadores["prebuscas"]:
+            res += (f"    pré-busca: {contadores['prebuscas']} emitidas | {contadores['prebuscas_canceladas']} canceladas | "
+                    f"{contadores['prebuscas_uteis']} úteis | {contadores['prebuscas_inuteis']} descartadas sem uso\n")
+    res += "Barramento:\n"
+    for nome, valor in dados["barramento"].items():
+        res += f"  {nome}: {valor}\n"
+    res += f"  transações por lance: {dados['transacoes_por_lance']:.2f}\n"
+    barramento = dados["barramento"]
+    res += (f"  lances atômicos: {barramento['transacoes_economizadas']} transações economizadas | "
+            f"{barramento['lances_recusados']} lances recusados no barramento, sem trazer o bloco (custo) | "
+            f"saldo {barramento['transacoes_economizadas'] - barramento['lances_recusados']}\n")
+    res += f"Ciclos simulados: {dados['ciclos']}\n"
+    res += f"RAM: {dados['ram']['leituras']} leituras | {dados['ram']['escritas']} escritas\n"
+    if "clusters" in dados:
+        res += "Clusters:\n"
+        for indice, cluster in dados["clusters"].items():
+            res += (f"  {indice}: {cluster['transacoes_locais']} locais | {cluster['transacoes_remotas']} remotas "
+                    f"({cluster['fracao_remota']:.1%}) | transferências remotas {cluster['transferencias_remotas']} | "
+                    f"invalidações remotas {cluster['invalidacoes_remotas']} | snoops recebidos {cluster['snoops_recebidos']}\n")
+    if "llc" in dados:
+        llc = dados["llc"]
+        res += (f"LLC: taxa de acerto {llc['taxa_acerto']:.1%} | write-backs absorvidos {llc['write_backs_absorvidos']} | "
+                f"back-invalidações {llc['invalidacoes_inclusao']} | acessos à RAM evitados {llc['acessos_ram_evitados']}\n")
+    if "prebusca" in dados:
+        prebusca = dados["prebusca"]
+        res += (f"Pré-busca: precisão {prebusca['precisao']:.1%} | cobertura {prebusca['cobertura']:.1%} | "
+                f"tráfego desperdiçado {prebusca['trafego_desperdicado']} transações "
+                f"({prebusca['fracao_desperdicada']:.1%} do barramento)\n")
+    res += "Transições (de -> para):\n"
+    res += "      " + " ".join(f"{para:>5}" for para in dados["transicoes"]) + "\n"
+    for de, linha in dados["transicoes"].items():
+        res += f"  {de:>3} " + " ".join(f"{total:>5}" for total in linha.values()) + "\n"
+    return res
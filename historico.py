@@ -0,0 +1,236 @@
+"""
+Histórico binário das transações do barramento.
+
+Cada transação vira um registro de tamanho fixo (struct), acrescentado ao fim
+de um arquivo por um escritor com buffer. O leitor é um gerador que percorre o
+arquivo em blocos, sem carregá-lo inteiro, e alimenta as análises: histórico
+por endereço, estatísticas offline e reprodução num Leilao novo.
+
+Uso:
+    python main.py rastro.txt --historico barramento.bin
+    python historico.py barramento.bin --endereco 3
+"""
+from __future__ import annotations
+from enum import Enum
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple
+from moesi import Estado
+import argparse
+import json
+import os
+import struct
+import time
+
+if TYPE_CHECKING:
+    from leilao import Leilao
+
+MAGICO = b"MOESIBUS"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sHq") # mágico, versão, palavras por bloco
+# sequência, instante (ns), tipo, requisitante, endereço, fornecedor, valor, cópias, estados resultantes
+REGISTRO = struct.Struct("<QqBiqiqHcc")
+SEM_PROCESSADOR = -1 # requisitante externo (cadastro de item) ou fornecedor RAM / nenhum
+SEM_ESTADO = b"-"
+
+
+class TipoTransacao(Enum):
+    BUS_RD = 0 # miss de leitura
+    BUS_RDX = 1 # miss de escrita (leitura exclusiva)
+    BUS_UPGR = 2 # escrita em linha compartilhada (só invalida)
+    BUS_LANCE = 3 # compare-and-swap do lance
+    WRITE_BACK = 4 # linha suja gravada na RAM
+    ESCRITA_EXTERNA = 5 # escrita direta na RAM, fora das caches
+    PREBUSCA = 6 # leitura especulativa da unidade de pré-busca
+
+
+class Transacao(NamedTuple):
+    seq : int
+    instante : int # time.time_ns() no momento da transação
+    tipo : TipoTransacao
+    requisitante : int
+    endereco : int
+    fornecedor : int # cache que entregou o bloco; SEM_PROCESSADOR = RAM ou nenhuma
+    valor : int # palavra lida ou escrita (0 no write-back)
+    copias : int # cópias em outras caches observadas (leitura) ou invalidadas (escrita)
+    estado_requisitante : Estado | None
+    estado_fornecedor : Estado | None
+
+
+ESTADO_POR_CODIGO = {estado.sigla.encode(): estado for estado in Estado} | {SEM_ESTADO: None}
+
+
+class EscritorHistorico():
+    def __init__(self, caminho : str, tamanho_bloco : int = 1, registros_por_buffer : int = 4096):
+        """
+        Abre o histórico em *caminho* para acréscimo; um arquivo já existente continua a sequência.
+        Os registros ficam num buffer e vão para o disco a cada *registros_por_buffer*.
+        """
+        existente = os.path.exists(caminho) and os.path.getsize(caminho) > 0
+        if existente:
+            with open(caminho, "rb") as arquivo:
+                _validar_cabecalho(arquivo.read(CABECALHO.size), caminho)
+            self.seq : int = (os.path.getsize(caminho) - CABECALHO.size) // REGISTRO.size
+        else:
+            self.seq = 0
+        self.arquivo = open(caminho, "ab")
+        if not existente:
+            self.arquivo.write(CABECALHO.pack(MAGICO, VERSAO, tamanho_bloco))
+        self.buffer : bytearray = bytearray()
+        self.limite : int = registros_por_buffer * REGISTRO.size
+
+    def registrar(self, tipo : TipoTransacao, requisitante : int | None, endereco : int, fornecedor : int | None = None,
+                  valor : int = 0, copias : int = 0, estado_requisitante : Estado | None = None,
+                  estado_fornecedor : Estado | None = None) -> None:
+        """ Acrescenta uma transação ao histórico. """
+        self.buffer += REGISTRO.pack(
+            self.seq, time.time_ns(), tipo.value,
+            SEM_PROCESSADOR if requisitante is None else requisitante, endereco,
+            SEM_PROCESSADOR if fornecedor is None else fornecedor, valor, copias,
+            estado_requisitante.sigla.encode() if estado_requisitante is not None else SEM_ESTADO,
+            estado_fornecedor.sigla.encode() if estado_fornecedor is not None else SEM_ESTADO)
+        self.seq += 1
+        if len(self.buffer) >= self.limite:
+            self.descarregar()
+
+    def descarregar(self) -> None:
+        """ Grava no arquivo os registros acumulados no buffer. """
+        self.arquivo.write(self.buffer)
+        self.buffer.clear()
+
+    def fechar(self) -> None:
+        if self.arquivo.closed:
+            return
+        self.descarregar()
+        self.arquivo.close()
+
+
+def _validar_cabecalho(dados : bytes, caminho : str) -> int:
+    """ Confere o cabeçalho e retorna o tamanho do bloco gravado nele. """
+    if len(dados) < CABECALHO.size:
+        raise ValueError(f"{caminho} não é um histórico do barramento.")
+    magico, versao, tamanho_bloco = CABECALHO.unpack(dados)
+    if magico != MAGICO:
+        raise ValueError(f"{caminho} não é um histórico do barramento.")
+    if versao != VERSAO:
+        raise ValueError(f"Versão de histórico {versao} não suportada (esperada {VERSAO}).")
+    return tamanho_bloco
+
+
+def ler_historico(caminho : str, registros_por_leitura : int = 4096) -> Iterator[Transacao]:
+    """ Percorre as transações do histórico em fluxo, *registros_por_leitura* de cada vez. """
+    with open(caminho, "rb") as arquivo:
+        _validar_cabecalho(arquivo.read(CABECALHO.size), caminho)
+        while dados := arquivo.read(registros_por_leitura * REGISTRO.size):
+            completo = len(dados) - len(dados) % REGISTRO.size # descarta um registro final incompleto
+            for seq, instante, tipo, requisitante, endereco, fornecedor, valor, copias, estado, estado_fornecedor \
+                    in REGISTRO.iter_unpack(memoryview(dados)[:completo]):
+                yield Transacao(seq, instante, TipoTransacao(tipo), requisitante, endereco, fornecedor, valor, copias,
+                                ESTADO_POR_CODIGO[estado], ESTADO_POR_CODIGO[estado_fornecedor])
+
+
+def historico_por_endereco(transacoes : Iterable[Transacao],
+                           enderecos : Iterable[int] | None = None) -> dict[int, list[Transacao]]:
+    """ Agrupa as transações por endereço (apenas os *enderecos* pedidos, se informados). """
+    filtro = set(enderecos) if enderecos is not None else None
+    historicos : dict[int, list[Transacao]] = {}
+    for transacao in transacoes:
+        if filtro is None or transacao.endereco in filtro:
+            historicos.setdefault(transacao.endereco, []).append(transacao)
+    return historicos
+
+
+def resumir(transacoes : Iterable[Transacao], mais_disputados : int = 10) -> dict:
+    """ Estatísticas offline do histórico, calculadas numa única passada. """
+    por_tipo = {tipo.name: 0 for tipo in TipoTransacao}
+    por_requisitante : dict[int, int] = {}
+    por_endereco : dict[int, int] = {}
+    fornecidas_cache = fornecidas_ram = invalidacoes = lances_aceitos = lances_recusados = 0
+    for transacao in transacoes:
+        tipo = transacao.tipo
+        por_tipo[tipo.name] += 1
+        if tipo == TipoTransacao.WRITE_BACK:
+            continue
+        if tipo not in (TipoTransacao.BUS_RD, TipoTransacao.PREBUSCA):
+            invalidacoes += transacao.copias # na leitura, as cópias observadas continuam válidas
+        if tipo == TipoTransacao.ESCRITA_EXTERNA:
+            continue
+
+        por_requisitante[transacao.requisitante] = por_requisitante.get(transacao.requisitante, 0) + 1
+        por_endereco[transacao.endereco] = por_endereco.get(transacao.endereco, 0) + 1
+        if tipo == TipoTransacao.BUS_LANCE:
+            if transacao.estado_requisitante is None:
+                lances_recusados += 1
+            else:
+                lances_aceitos += 1
+        if tipo != TipoTransacao.BUS_UPGR: # o upgrade não transfere o bloco
+            if transacao.fornecedor == SEM_PROCESSADOR:
+                fornecidas_ram += 1
+            else:
+                fornecidas_cache += 1
+
+    disputados = sorted(por_endereco.items(), key=lambda par: (-par[1], par[0]))[:mais_disputados]
+    return {
+        "transacoes": sum(por_tipo.values()),
+        "por_tipo": por_tipo,
+        "blocos_de_outra_cache": fornecidas_cache,
+        "blocos_da_ram": fornecidas_ram,
+        "invalidacoes": invalidacoes,
+        "lances_aceitos": lances_aceitos,
+        "lances_recusados": lances_recusados,
+        "por_requisitante": {str(requisitante): total for requisitante, total in sorted(por_requisitante.items())},
+        "enderecos_mais_disputados": {str(endereco): total for endereco, total in disputados},
+    }
+
+
+def reproduzir(transacoes : Iterable[Transacao], leilao : Leilao) -> Leilao:
+    """
+    Reaplica as transações no *leilao* (normalmente novo, com a mesma configuração):
+    cada uma vira o acesso que a originou, feito pelo comprador de mesmo id, criado se preciso.
+    Write-backs e pré-buscas não são reaplicados, pois resultam das substituições e dos misses;
+    hits não passam pelo barramento e por isso não estão no histórico.
+    """
+    for transacao in transacoes:
+        tipo = transacao.tipo
+        if tipo in (TipoTransacao.WRITE_BACK, TipoTransacao.PREBUSCA):
+            continue
+        if tipo == TipoTransacao.ESCRITA_EXTERNA:
+            with leilao.barramento.arbitro:
+                leilao.barramento.escrita_externa(transacao.endereco, transacao.valor)
+            continue
+
+        while len(leilao.compradores) <= transacao.requisitante:
+            leilao.adicionar_comprador(f"Processador {len(leilao.compradores)}")
+        comprador = leilao.compradores[transacao.requisitante]
+        if tipo == TipoTransacao.BUS_RD:
+            comprador.ler(transacao.endereco)
+        elif tipo == TipoTransacao.BUS_LANCE:
+            comprador.comparar_e_escrever(transacao.endereco, transacao.valor)
+        else:
+            comprador.escrever(transacao.endereco, transacao.valor)
+    return leilao
+
+
+def ler_argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Análise do histórico binário do barramento")
+    parser.add_argument("historico")
+    parser.add_argument("--endereco", type=int, action="append",
+                        help="mostra as transações do endereço em vez do resumo; pode repetir")
+    return parser.parse_args()
+
+
+def main():
+    args = ler_argumentos()
+    transacoes = ler_historico(args.historico)
+    if not args.endereco:
+        print(json.dumps(resumir(transacoes), indent=2))
+        return
+    for endereco, historico in sorted(historico_por_endereco(transacoes, args.endereco).items()):
+        print(f"Endereço {endereco}:")
+        for transacao in historico:
+            estados = "/".join(estado.sigla if estado is not None else "-" for estado in (transacao.estado_requisitante,
+                                                                              transacao.estado_fornecedor))
+            fornecedor = "RAM" if transacao.fornecedor == SEM_PROCESSADOR else f"cache {transacao.fornecedor}"
+            print(f"  #{transacao.seq} {transacao.tipo.name:<15} P{transacao.requisitante:<4} "
+                  f"valor {transacao.valor:<8} de {fornecedor:<9} cópias {transacao.copias} estados {estados}")
+
+if __name__ == "__main__":
+    main()
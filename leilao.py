@@ -1,18 +1,28 @@
-from moesi import Estado
 from colors import color
-from ram import RAM, TAMANHO_RAM
+from ram import RAM
 from cache import Cache
 from processador import Processador
-from barramento import Barramento
-import logging
+from barramento import Barramento, SEM_TRAVA
+from configuracao import Configuracao
+from diretorio import Diretorio
+from registro import TRANSICOES, registrar
+from temporizacao import Relogio
+from protocolo import Protocolo
+from llc import CacheCompartilhada
+from topologia import Topologia
+import registro
+import estatisticas
+import threading
+from typing import Iterable
 # Classe dos itens do leilão
 class Item:
-    def __init__(self, id_item: int, nome: str, preco_inicial: int):
-        """ Representa um item em leilão """
+    def __init__(self, id_item: int, nome: str, preco_inicial: int, trava = SEM_TRAVA):
+        """ Representa um item em leilão; a *trava* serializa lances e encerramento no modo concorrente """
         self.id: int = id_item
         self.nome: str = nome
         self.preco: int = preco_inicial
         self.encerrado: bool = False
+        self.trava = trava
 
     def __repr__(self):
         status = "Encerrado" if self.encerrado else "Ativo"
@@ -27,126 +37,202 @@ class Comprador(Processador):
     def __init__(self, id_proc: int, cache: Cache, nome : str):
         super().__init__(id_processador = id_proc, cache = cache)
         self.nome : str = nome 
+        self.lances : int = 0 # lances tentados
+        self.lances_aceitos : int = 0
 
     def verificar_preco(self, item: Item) -> int | None:
         """
         Verifica o preço atual do item - Uma operação de leitura (READ).
         """
         preco = self.ler(item.id)
-        print(f"[{self.nome}] Consultou Item {item.id}: R$ {preco}")
+        registrar(TRANSICOES, "reset", "[%s] Consultou Item %d: R$ %s", self.nome, item.id, preco)
         return preco
     
     def dar_lance(self, item: Item, valor_lance: int) -> bool:
         """
-        Ação de dar um lance, realiza uma leitura (READ) do valor atual e,
-        se o lance for maior, realiza uma escrita (WRITE) do novo valor.
+        Ação de dar um lance: lê o valor atual do item e, se o lance for maior,
+        escreve o novo valor, numa única operação atômica (compare-and-swap).
+        Num miss, basta uma transação de leitura exclusiva no barramento, em vez de
+        uma leitura (READ) seguida de uma escrita (WRITE) que invalida as outras cópias.
         """
 
-        print(color(f"\n[{self.nome}] Tentando lance de R$ {valor_lance}", "ciano"))
-        if item.encerrado:
-            print(color(f"O leilão desse item já foi encerrado.", "vermelho"))
-            return False
-        
-        if valor_lance <= 0:
-            print(color(f"Lance inválido. O valor do lance deve ser maior que zero.", "vermelho"))
-            return False
-
-        # Gera Read Miss/Hit, na tentativa de ler o valor atual do item
-        valor_atual: int | None = self.ler(item.id)
-
-        if valor_atual is not None and valor_lance > valor_atual:
-            # Se o lance for maior, realiza a escrita do novo valor
-            # Gera um Write Miss/Hit
-            # Invalida as outras cópias na cache dos outros processadores
-            self.escrever(item.id, valor_lance)
+        registrar(TRANSICOES, "ciano", "\n[%s] Tentando lance de R$ %d", self.nome, valor_lance)
+        self.lances += 1
+        # A comparação e a escrita do lance são atômicas em relação aos lances concorrentes no mesmo item
+        with item.trava:
+            if item.encerrado:
+                registrar(TRANSICOES, "vermelho", "O leilão desse item já foi encerrado.")
+                return False
+
+            if valor_lance <= 0:
+                registrar(TRANSICOES, "vermelho", "Lance inválido. O valor do lance deve ser maior que zero.")
+                return False
+
+            # Gera um Hit ou uma única transação no barramento; se aceito, as outras cópias são invalidadas
+            aceito, valor_atual = self.comparar_e_escrever(item.id, valor_lance)
+
+            if aceito:
+                self.lances_aceitos += 1
+                registrar(TRANSICOES, "verde", "\n[Leilão] Lance aceito! %s valor R$ %d", self.nome, valor_lance)
+                return True
+            else:
+                registrar(TRANSICOES, "vermelho", "\n[Leilão] Lance rejeitado! o valor atual é R$ %s", valor_atual)
+                return False
 
-            print(color(f"\n[Leilão] Lance aceito! {self.nome} valor R$ {valor_lance}", "verde"))
-            return True
-        else:
-            print(color(f"\n[Leilão] Lance rejeitado! o valor atual é R$ {valor_atual}", "vermelho"))
-            return False
-        
 class Leilao:
-    def __init__(self):
-        self.ram: RAM = RAM(TAMANHO_RAM) 
-        self.barramento: Barramento = Barramento(self.ram)
+    def __init__(self, config: Configuracao | None = None, ram: RAM | None = None):
+        self.config: Configuracao = config if config is not None else Configuracao()
+        self.ram: RAM = ram if ram is not None else RAM(self.config.tamanho_ram, self.config.semente_ram,
+                                                        self.config.arquivo_ram)
+        self.barramento: Barramento = Barramento(self.ram, self.criar_diretorio(), self.config.tamanho_bloco,
+                                                 self.config.concorrente, Relogio(self.config.latencias),
+                                                 Protocolo(self.config.protocolo), self.criar_llc(),
+                                                 self.criar_topologia())
         self.compradores: list[Comprador] = []
         self.itens: list[Item] = []
         self.id_item_prox: int = 0
         
-    def adicionar_item(self, nome: str, preco_inicial: int) -> Item:
+    def criar_diretorio(self) -> Diretorio | None:
+        """ Cria o diretório de coerência, caso a configuração peça esse modo. """
+        if self.config.coerencia == "diretorio":
+            return Diretorio()
+        if self.config.coerencia != "broadcast":
+            raise ValueError(f"Modo de coerência desconhecido: {self.config.coerencia}")
+        return None
+
+    def criar_llc(self) -> CacheCompartilhada | None:
+        """ Cria a cache compartilhada de último nível, caso a configuração tenha tamanho para ela. """
+        if self.config.tamanho_llc <= 0:
+            return None
+        return CacheCompartilhada(self.ram, self.config.tamanho_llc, self.config.tamanho_bloco,
+                                  self.config.associatividade_llc, self.config.politica, self.config.inclusao_llc,
+                                  self.config.latencias)
+
+    def criar_topologia(self) -> Topologia | None:
+        """ Cria a topologia em clusters, caso a configuração peça mais de um. """
+        if self.config.clusters <= 1:
+            return None
+        return Topologia(self.config.clusters, self.config.compradores_por_cluster)
+
+    def adicionar_item(self, nome: str, preco_inicial: int, inicializar_ram: bool = True) -> Item:
         """
         Adiciona um novo item ao leilão, a partir da entrada *nome* e *preco_incial*.
+        Com *inicializar_ram* falso o item é apenas registrado, sem escrever o preço na memória
+        (usado pelos fragmentos da execução paralela que não são donos do endereço).
         """
         id = self.id_item_prox
-        item: Item = Item(id, nome, preco_inicial)
+        item: Item = Item(id, nome, preco_inicial, threading.Lock() if self.config.concorrente else SEM_TRAVA)
         self.itens.append(item)
 
         # Inicializa o preço na RAM
-        # Setup inicial, antes dos compradores entrarem em ação
-        self.ram.escrever(id, preco_inicial)
+        # Passa pelo barramento, pois caches podem ter o bloco do endereço (itens vizinhos)
+        if inicializar_ram:
+            with self.barramento.arbitro:
+                self.barramento.escrita_externa(id, preco_inicial)
         self.id_item_prox += 1  
-        print(color(f"[Leilão] Item adicionado: {item}, no endereço {item.id}", "azul_claro"))
+        registrar(TRANSICOES, "azul_claro", "[Leilão] Item adicionado: %s, no endereço %d", item, item.id)
         return item
     
-    def adicionar_comprador(self, nome: str) -> Comprador:
+    def adicionar_comprador(self, nome: str, politica: str | None = None, cluster: int | None = None) -> Comprador:
         """
         Adiciona um novo comprador ao leilão, a partir do *nome*.
+        A *politica* de substituição da cache dele é a da configuração, salvo se informada,
+        e o *cluster* (com topologia em clusters) segue a distribuição da configuração, salvo se informado.
         """
 
         id_proc = len(self.compradores) 
         # Cria a cache de cada comprador
-        cache = Cache(id_proc, self.barramento)
+        cache = Cache(id_proc, self.barramento, self.config.tamanho_cache, self.config.associatividade,
+                      politica if politica is not None else self.config.politica,
+                      self.config.buffer_escrita, self.config.consistencia,
+                      self.config.prebusca, self.config.grau_prebusca)
 
         comprador = Comprador(id_proc, cache, nome)
-        self.compradores.append(comprador)
-        self.barramento.colocar_cache(cache)
+        with self.barramento.arbitro:
+            self.compradores.append(comprador)
+            self.barramento.colocar_cache(cache, cluster)
 
-        print(color(f"[Leilão] Comprador adicionado: {comprador.nome}", "azul_claro"))
+        registrar(TRANSICOES, "azul_claro", "[Leilão] Comprador adicionado: %s", comprador.nome)
         return comprador
     
     def descobrir_vencedor(self, item: Item) -> tuple[Comprador | None, int]:
         """
         Descobre o vencedor do leilão do *item* especificado.
-        Se alguma cache tiver o dado em 'MODIFIED' ou 'OWNED', esse é o vencedor."
+        Se alguma cache tiver o dado em 'MODIFIED' ou 'OWNED', ela tem o preço atual,
+        e o vencedor é o autor da escrita dessa palavra (com blocos de várias palavras,
+        a dona do bloco pode ter recebido o lance de outro comprador)."
+        A dona vem do índice de donas do barramento, sem varrer as caches.
+        Sem cópia suja, o preço vem da LLC ou da RAM e o vencedor é o autor gravado no último
+        write-back da palavra (Barramento.autores_ram). Isso vale para todos os protocolos, inclusive
+        o MOESI: quando a linha com o lance vencedor foi substituída (e gravada na RAM), o item
+        tem vencedor, onde antes do registro dos autores o resultado era "nenhum vencedor".
+        A consulta é feita com o árbitro do barramento, sem transações em andamento,
+        depois de drenar o buffer de escrita que tiver um lance pendente no item.
         """
-        linha, comprador = None, None
-        
-        if self.compradores == []:
-            return None, self.ram.ler(item.id)
-    
-        # Varre as caches dos compradores
-        for comprador in self.compradores:
-            linha = comprador.cache.buscar_linha(item.id)
-            if linha == None:
-                continue
-            # Se encontrar M ou O
-            if linha.estado in [Estado.MODIFIED, Estado.OWNED]:
-                valor = linha.dado
-                return comprador, valor
-        
-        # Se ninguém tem o dado em M ou O, vale o que está na RAM
-        valor_ram: int = self.ram.ler(item.id)
-        return None, valor_ram
+        with self.barramento.arbitro:
+            return self._descobrir_vencedor(item)
+
+    def _descobrir_vencedor(self, item: Item) -> tuple[Comprador | None, int]:
+        self.barramento.drenar_pendentes(self.barramento.inicio_bloco(item.id))
+        dono = self.barramento.indice_donos.get(self.barramento.inicio_bloco(item.id))
+        if dono is not None:
+            linha = self.barramento.caches_por_id[dono].buscar_linha(item.id)
+            deslocamento = item.id % self.config.tamanho_bloco
+            valor = linha.dados[deslocamento]
+            autor = linha.autores[deslocamento]
+            return (self.compradores[autor] if autor >= 0 else None), valor
+
+        # Se ninguém tem o dado sujo, vale o que está na LLC ou na RAM, com o autor gravado no último write-back
+        valor_ram: int = self.barramento.ler_memoria(item.id)
+        autor = self.barramento.autores_ram.get(item.id, -1)
+        return (self.compradores[autor] if autor >= 0 else None), valor_ram
               
-    def encerrar_item(self, item: Item) -> None:
+    def drenar_buffers(self) -> None:
+        """ Barreira em todos os compradores: as escritas pendentes nos buffers de escrita ficam visíveis. """
+        if self.config.buffer_escrita:
+            with self.barramento.arbitro:
+                for comprador in self.compradores:
+                    comprador.cache.drenar_buffer()
+
+    def encerrar_item(self, item: Item) -> tuple[Comprador | None, int] | None:
         """
         Encerra o leilão do *item* especificado.
+        Retorna o vencedor e o preço final, ou None se o item já estava encerrado.
         """
-        if item.encerrado:
-            print(f"[Leilão] O leilão desse item já foi encerrado.")
-            return
+        with item.trava: # nenhum lance no item fica pela metade durante o encerramento
+            if item.encerrado:
+                registrar(TRANSICOES, "reset", "[Leilão] O leilão desse item já foi encerrado.")
+                return None
 
-        vencedor, preco_final = self.descobrir_vencedor(item)        
-        item.encerrado = True
+            vencedor, preco_final = self.descobrir_vencedor(item)        
+            item.encerrado = True
 
-        print(color(f"[Leilão] Item encerrado: {item}", "azul_claro"))
+        registrar(TRANSICOES, "azul_claro", "[Leilão] Item encerrado: %s", item)
         if vencedor:
-            print(color(f"[Leilão] Vencedor: {vencedor.nome}", "verde"))
-            print(vencedor.cache)
+            registrar(TRANSICOES, "verde", "[Leilão] Vencedor: %s", vencedor.nome)
+            if registro.ativo(TRANSICOES):
+                print(vencedor.cache)
         else:
-            print(color(f"[Leilão] Nenhum vencedor", "vermelho"))
-        print(color(f"[Leilão] Preço final: R$ {preco_final}", "amarelo_claro"))
+            registrar(TRANSICOES, "vermelho", "[Leilão] Nenhum vencedor")
+        registrar(TRANSICOES, "amarelo_claro", "[Leilão] Preço final: R$ %s", preco_final)
+        return vencedor, preco_final
+
+    def encerrar_itens(self, itens : Iterable[Item] | None = None) -> dict[int, tuple[Comprador | None, int]]:
+        """
+        Encerra de uma vez os leilões dos *itens* (todos, se omitidos), sem mensagens por item.
+        Retorna {id do item: (vencedor, preço final)} apenas dos itens encerrados agora;
+        os que já estavam encerrados são ignorados.
+        """
+        resultados : dict[int, tuple[Comprador | None, int]] = {}
+        for item in (self.itens if itens is None else itens):
+            with item.trava:
+                if item.encerrado:
+                    continue
+                with self.barramento.arbitro:
+                    resultados[item.id] = self._descobrir_vencedor(item)
+                item.encerrado = True
+        registrar(TRANSICOES, "azul_claro", "[Leilão] %d itens encerrados.", len(resultados))
+        return resultados
 
     def interface(self) -> None:
         """
@@ -157,7 +243,7 @@ class Leilao:
             self.mostrar_menu()
             escolha = input(color("Escolha uma opção: ", "azul_claro"))
 
-            if escolha == '7':
+            if escolha == '8':
                 print(color("Encerrando o leilão. Obrigado por participar!", "amarelo_claro"))
                 break
 
@@ -170,7 +256,8 @@ class Leilao:
         '3': self.verificar_preco_interface,
         '4': self.dar_lance_interface,
         '5': self.encerrar_item_interface,
-        '6': self.mostrar_caches
+        '6': self.mostrar_caches,
+        '7': self.mostrar_estatisticas
         }
         acao = acoes.get(escolha)
         if acao:
@@ -246,6 +333,11 @@ class Leilao:
             print(color(f"\nComprador: {comprador.nome}", "ciano_claro"))
             print(comprador.cache)
 
+    def mostrar_estatisticas(self) -> None:
+        """Exibe os contadores de caches, barramento, RAM e a matriz de transições."""
+        print(color("\n--- Estatísticas de Coerência ---", "azul_claro"))
+        print(estatisticas.formatar(estatisticas.coletar(self)))
+
     def validar_existencia_basica(self) -> bool:
         """Valida se existem compradores e itens cadastrados."""
         if not self.compradores:
@@ -314,7 +406,8 @@ class Leilao:
             "4. Dar Lance",
             "5. Encerrar Leilão do Item",
             "6. Mostrar as caches",
-            "7. Sair"
+            "7. Estatísticas",
+            "8. Sair"
         ]
         for opcao in opcoes:
             print(opcao)
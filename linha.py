@@ -1,20 +1,35 @@
+from array import array
 from moesi import Estado
 
+# Bloco vazio (dados, autores) por tamanho de bloco: copiar a fatia é mais rápido que montar o array
+_VAZIOS : dict[int, tuple[array, array]] = {}
+
 class LinhaCache:
-    def __init__(self):
+    # Sem __dict__: as linhas são criadas uma vez, com a cache, e reaproveitadas a cada substituição
+    __slots__ = ("tag", "inicio", "dados", "autores", "acessados", "estado", "via")
+
+    def __init__(self, via : int = 0, tamanho_bloco : int = 1):
         """
-        Inicializa uma linha de cache vazia, com estado inicial padrão inválido (*INVALID*)
+        Inicializa uma linha de cache vazia na *via*, com estado inicial padrão inválido (*INVALID*)
+        e espaço para um bloco de *tamanho_bloco* palavras, copiado para ela a cada preenchimento.
         """
-        self.tag : int | None = None # endereço do bloco na RAM
-        self.dado : int | None = None # dado armazenado na linha de cache
+        self.tag : int | None = None # tag do endereço (o índice do conjunto fica implícito); None = via vazia
+        self.inicio : int = 0 # endereço da primeira palavra do bloco guardado na linha
+        vazio = _VAZIOS.get(tamanho_bloco)
+        if vazio is None:
+            vazio = _VAZIOS[tamanho_bloco] = (array("q", bytes(8 * tamanho_bloco)), array("q", [-1]) * tamanho_bloco)
+        self.dados : array = vazio[0][:] # bloco de palavras armazenado na linha de cache
+        self.autores : array = vazio[1][:] # id do processador que escreveu cada palavra (-1 = valor da RAM)
+        self.acessados : int = 0 # máscara das palavras do bloco usadas pelo processador local
         self.estado : Estado = Estado.INVALID # estado inicial é sempre inválido
+        self.via : int = via # posição da linha dentro do conjunto
 
 
     def __repr__ (self):
         """
         Representação em string da linha de cache
-        Exemplo: [LINHA] Tag: 10 , Dado: 500 , Estado: E
+        Exemplo: [LINHA] Tag: 10 , Dado: [500] , Estado: E
         """
-        dado_str = str(self.dado) if self.dado is not None else "Vazio"
+        dado_str = str(self.dados.tolist()) if self.tag is not None else "Vazio"
         tag_str = str(self.tag) if self.tag is not None else "-"
-        return f"[LINHA] Tag: {tag_str} | Dado: {dado_str} | Estado: {self.estado.value}"
\ No newline at end of file
+        return f"[LINHA] Tag: {tag_str} | Dado: {dado_str} | Estado: {self.estado.sigla}"
@@ -0,0 +1,188 @@
+"""
+Cache de último nível (LLC) compartilhada, entre o barramento e a RAM.
+
+Os blocos que nenhuma cache privada fornece são procurados aqui antes da RAM,
+e os write-backs das privadas param aqui em vez de ir direto para a RAM.
+Políticas de inclusão:
+    inclusiva: todo bloco das privadas também está na LLC; ao substituir um bloco,
+               a LLC invalida as cópias das privadas (back-invalidation);
+    exclusiva: a LLC guarda só o que sai das privadas (vítimas) e um hit
+               entrega o bloco e o retira da LLC;
+    nine:      (non-inclusive non-exclusive) preenchida nos misses, sem forçar
+               inclusão nem exclusão.
+As linhas são LinhaCache: MODIFIED = precisa de write-back na RAM ao sair, EXCLUSIVE = não precisa.
+Enquanto uma cache privada tem o bloco sujo, é ela quem o fornece; a LLC só responde
+quando nenhuma tem, e então a sua cópia é a mais recente.
+A LLC só é acessada dentro de transações do barramento (com o árbitro adquirido).
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable
+from array import array
+from moesi import Estado
+from linha import LinhaCache
+from ram import RAM
+from cache import Conjunto, POLITICA_PADRAO
+from estatisticas import ContadoresLLC
+from substituicao import criar_politica
+from temporizacao import Latencias
+
+if TYPE_CHECKING:
+    from barramento import Bloco
+
+INCLUSOES = ("inclusiva", "exclusiva", "nine")
+INCLUSAO_PADRAO = "nine"
+
+
+class CacheCompartilhada():
+    def __init__(self, ram : RAM, tamanho : int, tamanho_bloco : int = 1, associatividade : int | None = None,
+                 politica : str = POLITICA_PADRAO, inclusao : str = INCLUSAO_PADRAO,
+                 latencias : Latencias | None = None):
+        """
+        Inicializa a LLC com *tamanho* linhas de *tamanho_bloco* palavras na frente da *ram*.
+        A *associatividade* e a *politica* de substituição seguem as regras das caches privadas;
+        a *inclusao* pode ser "inclusiva", "exclusiva" ou "nine".
+        """
+        if associatividade is None:
+            associatividade = tamanho # totalmente associativa
+        if tamanho <= 0 or associatividade <= 0 or tamanho % associatividade != 0:
+            raise ValueError(f"Associatividade {associatividade} inválida para LLC de tamanho {tamanho}.")
+        if inclusao not in INCLUSOES:
+            raise ValueError(f"Política de inclusão desconhecida: {inclusao} (opções: {', '.join(INCLUSOES)})")
+
+        self.ram : RAM = ram
+        self.tamanho : int = tamanho
+        self.tamanho_bloco : int = tamanho_bloco
+        self.associatividade : int = associatividade
+        self.num_conjuntos : int = tamanho // associatividade
+        self.inclusao : str = inclusao
+        self.conjuntos : list[Conjunto] = [
+            Conjunto(associatividade, criar_politica(politica, associatividade, f"llc:{indice}"), tamanho_bloco=tamanho_bloco)
+            for indice in range(self.num_conjuntos)
+        ]
+        self.sem_autores : array = array("q", [-1]) * tamanho_bloco # autores de um bloco vindo da RAM (só leitura)
+        self.contadores : ContadoresLLC = ContadoresLLC()
+        self.latencias : Latencias = latencias if latencias is not None else Latencias()
+        # Back-invalidation: invalida as cópias privadas de um bloco e retorna quantas eram (ligada pelo barramento)
+        self.invalidar_copias : Callable[[int], int] | None = None
+
+    def montar_endereco(self, indice : int, tag : int) -> int:
+        """ Endereço da primeira palavra do bloco de (*indice*, *tag*). """
+        return (tag * self.num_conjuntos + indice) * self.tamanho_bloco
+
+    def buscar_linha(self, inicio : int) -> LinhaCache | None:
+        tag, indice = divmod(inicio // self.tamanho_bloco, self.num_conjuntos)
+        return self.conjuntos[indice].linhas.get(tag)
+
+    def ler_bloco(self, inicio : int, entregar : bool = True) -> tuple[Bloco | None, int]:
+        """
+        Bloco que começa em *inicio*, da LLC ou, num miss, da RAM.
+        Sem *entregar*, quem lê ainda não sabe se o bloco vai para uma cache privada
+        e chama entregar() depois, se for o caso.
+        Retorna o bloco (None se o endereço for inválido) e os ciclos gastos.
+        """
+        latencias = self.latencias
+        linha = self.buscar_linha(inicio)
+        if linha is not None:
+            self.contadores.acertos += 1
+            # Cópia: a via da linha pode ser reaproveitada (vítima de uma privada) antes de a requisitante copiar o bloco
+            bloco = array("q", linha.dados), array("q", linha.autores)
+            if self.inclusao == "exclusiva" and entregar:
+                return bloco, latencias.llc + self._retirar(linha) # o bloco sobe para a cache privada e sai da LLC
+            self.conjuntos[(inicio // self.tamanho_bloco) % self.num_conjuntos].politica.acessar(linha.via)
+            return bloco, latencias.llc
+
+        self.contadores.faltas += 1
+        dados = self.ram.ler_bloco(inicio, self.tamanho_bloco)
+        if dados is None:
+            return None, latencias.llc
+        bloco = dados, self.sem_autores
+        ciclos = latencias.llc + latencias.ram_leitura
+        if self.inclusao != "exclusiva":
+            ciclos += self._inserir(inicio, dados, self.sem_autores, Estado.EXCLUSIVE)
+        return bloco, ciclos
+
+    def escrever_bloco(self, inicio : int, dados : array, autores : array | None = None) -> int:
+        """ Write-back de uma cache privada, absorvido pela LLC. Retorna os ciclos gastos. """
+        self.contadores.write_backs_absorvidos += 1
+        if autores is None:
+            autores = self.sem_autores
+        linha = self.buscar_linha(inicio)
+        if linha is None:
+            return self.latencias.llc + self._inserir(inicio, dados, autores, Estado.MODIFIED)
+        linha.dados[:], linha.autores[:] = dados, autores
+        linha.estado = Estado.MODIFIED
+        self.conjuntos[(inicio // self.tamanho_bloco) % self.num_conjuntos].politica.acessar(linha.via)
+        return self.latencias.llc
+
+    def entregar(self, inicio : int) -> int:
+        """ O bloco lido com ler_bloco(entregar=False) foi para uma cache privada: a LLC exclusiva o retira. """
+        linha = self.buscar_linha(inicio)
+        if self.inclusao != "exclusiva" or linha is None:
+            return 0
+        return self._retirar(linha)
+
+    def receber_vitima(self, inicio : int, dados : array, autores : array) -> int:
+        """ Linha limpa que saiu de uma cache privada; só a LLC exclusiva a guarda. Retorna os ciclos gastos. """
+        if self.inclusao != "exclusiva" or self.buscar_linha(inicio) is not None:
+            return 0
+        return self.latencias.llc + self._inserir(inicio, dados, autores, Estado.EXCLUSIVE)
+
+    def escrever_palavra(self, endereco : int, valor : int) -> None:
+        """ Mantém a cópia da LLC em dia com uma escrita feita direto na RAM. """
+        inicio = endereco - endereco % self.tamanho_bloco
+        linha = self.buscar_linha(inicio)
+        if linha is not None:
+            linha.dados[endereco - inicio] = valor
+            linha.autores[endereco - inicio] = -1
+
+    def ler(self, endereco : int) -> int | None:
+        """ Palavra do *endereco* guardada na LLC, ou None se o bloco não estiver nela. """
+        inicio = endereco - endereco % self.tamanho_bloco
+        linha = self.buscar_linha(inicio)
+        return linha.dados[endereco - inicio] if linha is not None else None
+
+    def _inserir(self, inicio : int, dados : array, autores : array, estado : Estado) -> int:
+        """
+        Copia o bloco para uma via do seu conjunto (a primeira vazia ou a de uma vítima substituída).
+        Retorna os ciclos gastos.
+        """
+        tag, indice = divmod(inicio // self.tamanho_bloco, self.num_conjuntos)
+        conjunto = self.conjuntos[indice]
+        ciclos = 0
+        via = next((linha.via for linha in conjunto.vias if linha.tag is None), None)
+        if via is None:
+            via = conjunto.politica.vitima()
+            ciclos = self._retirar(conjunto.vias[via], substituicao=True)
+
+        linha = conjunto.vias[via]
+        linha.tag = tag
+        linha.inicio = inicio
+        linha.estado = estado
+        linha.dados[:], linha.autores[:] = dados, autores
+        conjunto.linhas[tag] = linha
+        conjunto.politica.inserir(via)
+        return ciclos
+
+    def _retirar(self, linha : LinhaCache, substituicao : bool = False) -> int:
+        """
+        Tira a *linha* da LLC. Na substituição de uma LLC inclusiva, as cópias privadas são
+        invalidadas antes (as sujas fazem write-back nesta mesma linha); se a linha estiver
+        mais nova que a RAM, é gravada nela. Retorna os ciclos gastos.
+        """
+        ciclos = 0
+        if substituicao:
+            self.contadores.substituicoes += 1
+            if self.inclusao == "inclusiva" and self.invalidar_copias is not None:
+                copias = self.invalidar_copias(linha.inicio)
+                self.contadores.invalidacoes_inclusao += copias
+                ciclos += copias * self.latencias.invalidacao
+
+        conjunto = self.conjuntos[(linha.inicio // self.tamanho_bloco) % self.num_conjuntos]
+        del conjunto.linhas[linha.tag]
+        linha.tag = None # a via fica vazia, com a linha pronta para ser reaproveitada
+        if linha.estado == Estado.MODIFIED:
+            self.contadores.write_backs_ram += 1
+            self.ram.escrever_bloco(linha.inicio, linha.dados)
+            ciclos += self.latencias.write_back
+        linha.estado = Estado.INVALID
+        return ciclos
@@ -7,25 +7,234 @@ Feito por:
 - Vinicius Taguchi Okada
 """
 from leilao import Leilao
+from configuracao import Configuracao
+from motor import MotorRastro
+from paralelo import executar_paralelo
+from concorrencia import MotorConcorrente
+from checkpoint import executar_com_checkpoints, restaurar, salvar
+from rastro import ler_rastro
+from registro import NIVEIS, RESUMO
+from substituicao import POLITICAS
+from protocolo import PROTOCOLOS
+from llc import INCLUSOES
+from buffer_escrita import CONSISTENCIAS
+from prebusca import MODOS_PREBUSCA
+from temporizacao import interpretar_latencias
+from historico import EscritorHistorico
+from perfil import MODOS, perfilar
+from vetorial import MotorVetorial, validar
+from logging.handlers import QueueHandler, QueueListener
+import registro
+import estatisticas
+import argparse
+import atexit
+import itertools
 import logging
+import queue
 from datetime import datetime
 import os
 
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+def configurar_log() -> QueueListener:
+    """
+    Configura o log em arquivo. As mensagens são apenas enfileiradas pela simulação
+    e gravadas no arquivo por uma thread em segundo plano (QueueListener).
+    """
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
 
-nome_arquivo = f"logs/simulacao_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log" # nome do arquivo do log gerado baseando-se no horario
+    nome_arquivo = f"logs/simulacao_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log" # nome do arquivo do log gerado baseando-se no horario
 
-logging.basicConfig(
-    filename=nome_arquivo,  # nome do arquivo
-    level=logging.INFO,         
-    format="%(asctime)s - %(message)s", # formato das linhas do log
-    datefmt="%H:%M:%S" # formato da data
-)
+    arquivo = logging.FileHandler(nome_arquivo, encoding="utf-8")
+    arquivo.setFormatter(logging.Formatter(
+        "%(asctime)s - %(message)s", # formato das linhas do log
+        datefmt="%H:%M:%S" # formato da data
+    ))
+
+    fila = queue.SimpleQueue()
+    enfileirador = QueueHandler(fila)
+    enfileirador.setFormatter(logging.Formatter("%(message)s")) # a data é formatada pelo handler do arquivo
+    ouvinte = QueueListener(fila, arquivo)
+    logging.basicConfig(level=logging.INFO, handlers=[enfileirador])
+    ouvinte.start()
+    atexit.register(ouvinte.stop) # esvazia a fila antes de encerrar
+    return ouvinte
+
+def ler_argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulador MOESI - Leilão")
+    parser.add_argument("rastro", nargs="?", help="arquivo de rastro para execução não interativa")
+    parser.add_argument("--mmap", action="store_true", help="lê o rastro por mapeamento em memória")
+    parser.add_argument("--estatisticas", metavar="ARQUIVO",
+                        help="grava as estatísticas ao final (.json ou .csv)")
+    parser.add_argument("--verbosidade", choices=list(NIVEIS), default=None,
+                        help="padrão: 'resumo' com rastro, 'completo' na interface")
+    parser.add_argument("--tamanho-ram", type=int, default=Configuracao.tamanho_ram)
+    parser.add_argument("--arquivo-ram", metavar="ARQUIVO",
+                        help="imagem persistente da RAM, mapeada em memória (criada se não existir)")
+    parser.add_argument("--tamanho-cache", type=int, default=Configuracao.tamanho_cache)
+    parser.add_argument("--associatividade", type=int, default=None)
+    parser.add_argument("--tamanho-bloco", type=int, default=Configuracao.tamanho_bloco)
+    parser.add_argument("--coerencia", choices=["broadcast", "diretorio"], default=Configuracao.coerencia)
+    parser.add_argument("--politica", choices=list(POLITICAS), default=Configuracao.politica)
+    parser.add_argument("--protocolo", choices=list(PROTOCOLOS), default=Configuracao.protocolo)
+    parser.add_argument("--tamanho-llc", type=int, default=Configuracao.tamanho_llc,
+                        help="linhas da cache compartilhada de último nível (0 = sem LLC)")
+    parser.add_argument("--associatividade-llc", type=int, default=None)
+    parser.add_argument("--inclusao-llc", choices=list(INCLUSOES), default=Configuracao.inclusao_llc)
+    parser.add_argument("--clusters", type=int, default=Configuracao.clusters,
+                        help="barramentos locais, ligados por uma camada de coerência entre clusters")
+    parser.add_argument("--compradores-por-cluster", type=int, default=Configuracao.compradores_por_cluster,
+                        help="compradores consecutivos em cada cluster (0 = rodízio)")
+    parser.add_argument("--buffer-escrita", type=int, default=Configuracao.buffer_escrita, metavar="N",
+                        help="buffer de escrita com N endereços em cada cache (0 = sem buffer)")
+    parser.add_argument("--consistencia", choices=list(CONSISTENCIAS), default=Configuracao.consistencia,
+                        help="ordem das escritas do buffer em relação às leituras")
+    parser.add_argument("--prebusca", choices=list(MODOS_PREBUSCA), default=Configuracao.prebusca,
+                        help="unidade de pré-busca em cada cache: próximo bloco, passo constante ou itens populares")
+    parser.add_argument("--grau-prebusca", type=int, default=Configuracao.grau_prebusca, metavar="N",
+                        help="blocos pré-buscados a cada miss de leitura")
+    parser.add_argument("--processos", type=int, default=1,
+                        help="divide o rastro em fragmentos executados em paralelo (exige cache com vários conjuntos)")
+    parser.add_argument("--latencia", action="append", default=[], metavar="NOME=CICLOS",
+                        help="custo de um evento no modelo de temporização (ex.: ram_leitura=200); pode repetir")
+    parser.add_argument("--concorrente", action="store_true",
+                        help="executa o rastro com cada comprador em sua própria thread")
+    parser.add_argument("--checkpoint", metavar="ARQUIVO", help="grava o estado da simulação ao final (e periodicamente)")
+    parser.add_argument("--checkpoint-a-cada", type=int, default=0, metavar="N",
+                        help="grava o checkpoint a cada N operações do rastro")
+    parser.add_argument("--restaurar", metavar="ARQUIVO", help="continua a partir de um checkpoint")
+    parser.add_argument("--semente", type=int, default=None, help="semente do conteúdo inicial da RAM")
+    parser.add_argument("--perfil", choices=list(MODOS),
+                        help="executa sob o cProfile, o amostrador de pilhas ou os cronômetros de trechos")
+    parser.add_argument("--perfil-saida", default="perfil", metavar="PREFIXO",
+                        help="grava PREFIXO.txt (relatório) e PREFIXO.folded (pilhas para gráfico de chama)")
+    parser.add_argument("--historico", metavar="ARQUIVO",
+                        help="acrescenta as transações do barramento a um histórico binário (ver historico.py)")
+    parser.add_argument("--vetorial", action="store_true",
+                        help="executa o rastro no motor vetorial (NumPy), para populações muito grandes de compradores")
+    parser.add_argument("--validar-vetorial", action="store_true",
+                        help="executa o rastro nos dois motores e compara RAM, linhas das caches e vencedores")
+    return parser.parse_args()
+
+def criar_configuracao(args: argparse.Namespace) -> Configuracao:
+    return Configuracao(
+        tamanho_ram=args.tamanho_ram,
+        semente_ram=args.semente,
+        arquivo_ram=args.arquivo_ram,
+        tamanho_cache=args.tamanho_cache,
+        associatividade=args.associatividade,
+        tamanho_bloco=args.tamanho_bloco,
+        coerencia=args.coerencia,
+        politica=args.politica,
+        protocolo=args.protocolo,
+        tamanho_llc=args.tamanho_llc,
+        associatividade_llc=args.associatividade_llc,
+        inclusao_llc=args.inclusao_llc,
+        clusters=args.clusters,
+        compradores_por_cluster=args.compradores_por_cluster,
+        buffer_escrita=args.buffer_escrita,
+        consistencia=args.consistencia,
+        prebusca=args.prebusca,
+        grau_prebusca=args.grau_prebusca,
+        concorrente=args.concorrente,
+        latencias=interpretar_latencias(args.latencia),
+    )
 
 def main():
-    leilao = Leilao()
-    leilao.interface()
+    args = ler_argumentos()
+    configurar_log()
+
+    if args.verbosidade is not None:
+        registro.definir_nivel(NIVEIS[args.verbosidade])
+    elif args.rastro:
+        registro.definir_nivel(RESUMO)
+
+    try:
+        config = criar_configuracao(args)
+    except ValueError as erro:
+        raise SystemExit(f"Configuração inválida: {erro}")
+    if args.perfil:
+        perfilar(lambda: executar(args, config), args.perfil, args.perfil_saida)
+    else:
+        executar(args, config)
+
+def executar(args: argparse.Namespace, config: Configuracao) -> None:
+    """ Executa o modo pedido na linha de comando: paralelo, rastro ou interface interativa. """
+    if args.processos > 1:
+        if not args.rastro:
+            raise SystemExit("--processos exige um arquivo de rastro.")
+        if args.historico:
+            raise SystemExit("--historico não é suportado com --processos.")
+        # Modo paralelo: cada processo executa um fragmento do rastro; o relatório é unificado
+        resultado = executar_paralelo(ler_rastro(args.rastro, usar_mmap=args.mmap), config, args.processos)
+        if registro.ativo(RESUMO):
+            print(resultado.resumo)
+        if args.estatisticas:
+            estatisticas.exportar(resultado.estatisticas, args.estatisticas)
+        return
+
+    if args.vetorial or args.validar_vetorial:
+        executar_vetorial(args, config)
+        return
+
+    if args.checkpoint and args.concorrente:
+        raise SystemExit("--checkpoint não é suportado com --concorrente.")
+
+    if args.restaurar:
+        # A configuração vem do checkpoint; o rastro continua de onde parou
+        motor = restaurar(args.restaurar)
+        leilao = motor.leilao
+    else:
+        leilao = Leilao(config)
+        motor = MotorConcorrente(leilao) if args.concorrente else MotorRastro(leilao)
+    if args.historico:
+        leilao.barramento.historico = EscritorHistorico(args.historico, leilao.config.tamanho_bloco)
+
+    if args.rastro:
+        # Modo não interativo: reproduz o rastro e mostra apenas o resumo final
+        operacoes = ler_rastro(args.rastro, usar_mmap=args.mmap)
+        if motor.resumo.operacoes:
+            operacoes = itertools.islice(operacoes, motor.resumo.operacoes, None) # já aplicadas antes do checkpoint
+        if args.checkpoint and args.checkpoint_a_cada:
+            resumo = executar_com_checkpoints(motor, operacoes, args.checkpoint, args.checkpoint_a_cada)
+        else:
+            resumo = motor.executar(operacoes)
+        if registro.ativo(RESUMO):
+            print(resumo)
+    else:
+        leilao.interface()
+
+    if args.checkpoint:
+        salvar(leilao, args.checkpoint, motor.resumo)
+    leilao.ram.fechar() # grava a imagem da RAM, se houver
+    if leilao.barramento.historico is not None:
+        leilao.barramento.historico.fechar()
+
+    if args.estatisticas:
+        estatisticas.exportar(estatisticas.coletar(leilao), args.estatisticas)
+
+def executar_vetorial(args: argparse.Namespace, config: Configuracao) -> None:
+    """ Executa o rastro no motor vetorial ou, com --validar-vetorial, compara-o com o motor de objetos. """
+    if not args.rastro:
+        raise SystemExit("--vetorial exige um arquivo de rastro.")
+    if args.concorrente or args.checkpoint or args.restaurar or args.historico:
+        raise SystemExit("--vetorial não é suportado com --concorrente, --checkpoint, --restaurar ou --historico.")
+
+    if args.validar_vetorial:
+        diferencas = validar(args.rastro, config, usar_mmap=args.mmap)
+        for diferenca in diferencas:
+            print(diferenca)
+        if diferencas:
+            raise SystemExit(f"{len(diferencas)} diferença(s) entre os motores.")
+        print("Motores equivalentes: RAM, linhas das caches, vencedores e contadores iguais.")
+        return
+
+    motor = MotorVetorial(config)
+    resumo = motor.executar(ler_rastro(args.rastro, usar_mmap=args.mmap))
+    if registro.ativo(RESUMO):
+        print(resumo)
+    motor.ram.fechar()
+    if args.estatisticas:
+        estatisticas.exportar(motor.estatisticas(), args.estatisticas)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
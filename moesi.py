@@ -1,8 +1,15 @@
-from enum import Enum
-# definição dos estados da MOESI
-class Estado(Enum):
-    MODIFIED = "M" # Dado sujo, exclusivo de uma cache. Responsabilidade de write-back
-    OWNED = "O" # Dado sujo, compartilhado. Fornece dados para outros caches
-    EXCLUSIVE = "E" # Dado limpo igual a MP, exclusivo.
-    SHARED = "S" # Dado limpo (ou cópia de um Processador), compartilhado
-    INVALID = "I" # Dado inválido/vazio
+from enum import IntEnum
+# definição dos estados da MOESI (e do FORWARD da MESIF); as transições ficam em protocolo.py
+# Os estados são inteiros pequenos (IntEnum); a letra de cada um é a sigla
+class Estado(IntEnum):
+    MODIFIED = 0 # Dado sujo, exclusivo de uma cache. Responsabilidade de write-back
+    OWNED = 1 # Dado sujo, compartilhado. Fornece dados para outros caches
+    EXCLUSIVE = 2 # Dado limpo igual a MP, exclusivo.
+    SHARED = 3 # Dado limpo (ou cópia de um Processador), compartilhado
+    INVALID = 4 # Dado inválido/vazio
+    FORWARD = 5 # Dado limpo, compartilhado; a única cópia que responde às leituras (MESIF)
+
+    @property
+    def sigla(self) -> str:
+        """ Letra do estado (M, O, E, S, I ou F), usada nas mensagens e nos arquivos binários. """
+        return self.name[0]
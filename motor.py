@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import Iterable
+from colors import color
+from leilao import Leilao, Comprador, Item
+from rastro import Operacao
+import time
+
+class Resumo():
+    def __init__(self):
+        """ Totais acumulados durante a execução de um rastro. """
+        self.operacoes : int = 0
+        self.por_tipo : dict[str, int] = {}
+        self.invalidas : int = 0
+        self.lances_aceitos : int = 0
+        self.lances_rejeitados : int = 0
+        self.vencedores : dict[int, tuple[str | None, int | None]] = {} # id do item -> (vencedor, preço final)
+        self.duracao : float = 0.0
+        self.ciclos : int = 0 # ciclos simulados pelo modelo de temporização
+        self.amat : dict[str, float] = {} # comprador -> tempo médio de acesso à memória, em ciclos
+
+    def __repr__(self):
+        """ Representação em string do resumo da simulação. """
+        taxa = self.operacoes / self.duracao if self.duracao > 0 else 0.0
+        res = "\n" + color("--- Resumo da Simulação ---", "azul_claro") + "\n"
+        res += f"Operações: {self.operacoes} ({taxa:.0f} op/s em {self.duracao:.3f} s)\n"
+        for tipo, total in sorted(self.por_tipo.items()):
+            res += f"  {tipo}: {total}\n"
+        if self.invalidas:
+            res += color(f"Operações inválidas ignoradas: {self.invalidas}", "vermelho") + "\n"
+        res += f"Lances aceitos: {self.lances_aceitos} | rejeitados: {self.lances_rejeitados}\n"
+        res += f"Ciclos simulados: {self.ciclos}\n"
+        for nome, amat in self.amat.items():
+            res += f"  AMAT {nome}: {amat:.2f} ciclos\n"
+        res += f"Itens encerrados: {len(self.vencedores)}\n"
+        for id_item, (vencedor, preco) in sorted(self.vencedores.items()):
+            res += f"  Item {id_item}: {vencedor or 'Nenhum vencedor'} - R$ {preco}\n"
+        return res
+
+
+class MotorRastro():
+    def __init__(self, leilao : Leilao):
+        """
+        Motor não interativo: aplica as operações de um rastro diretamente
+        no *leilao*, sem passar pela interface de menus.
+        """
+        self.leilao : Leilao = leilao
+        self.resumo : Resumo = Resumo()
+
+    def _comprador(self, id_comprador : int) -> Comprador | None:
+        if 0 <= id_comprador < len(self.leilao.compradores):
+            return self.leilao.compradores[id_comprador]
+        return None
+
+    def _item(self, id_item : int) -> Item | None:
+        if 0 <= id_item < len(self.leilao.itens):
+            return self.leilao.itens[id_item]
+        return None
+
+    def aplicar(self, operacao : Operacao) -> None:
+        """ Executa uma única *operacao* no leilão. """
+        resumo = self.resumo
+        resumo.operacoes += 1
+        resumo.por_tipo[operacao.tipo] = resumo.por_tipo.get(operacao.tipo, 0) + 1
+        tipo, args = operacao
+
+        if tipo == "ler":
+            comprador, item = self._comprador(args[0]), self._item(args[1])
+            if comprador is None or item is None:
+                resumo.invalidas += 1
+                return
+            comprador.verificar_preco(item)
+
+        elif tipo == "lance":
+            comprador, item = self._comprador(args[0]), self._item(args[1])
+            if comprador is None or item is None:
+                resumo.invalidas += 1
+                return
+            if comprador.dar_lance(item, args[2]):
+                resumo.lances_aceitos += 1
+            else:
+                resumo.lances_rejeitados += 1
+
+        elif tipo == "item":
+            self.leilao.adicionar_item(*args)
+
+        elif tipo == "comprador":
+            self.leilao.adicionar_comprador(*args)
+
+        elif tipo == "encerrar":
+            item = self._item(args[0])
+            if item is None or item.encerrado:
+                resumo.invalidas += 1
+                return
+            vencedor, preco = self.leilao.encerrar_item(item)
+            resumo.vencedores[item.id] = (vencedor.nome if vencedor else None, preco)
+
+        else:
+            resumo.invalidas += 1
+
+    def medir_tempo(self) -> None:
+        """ Copia para o resumo o total de ciclos e o AMAT de cada comprador. """
+        relogio = self.leilao.barramento.relogio
+        self.resumo.ciclos = relogio.ciclos
+        for comprador in self.leilao.compradores:
+            contadores = comprador.cache.contadores
+            acessos = contadores.leituras_hit + contadores.leituras_miss + contadores.escritas_hit + contadores.escritas_miss
+            self.resumo.amat[comprador.nome] = relogio.amat(comprador.id, acessos)
+
+    def executar(self, operacoes : Iterable[Operacao]) -> Resumo:
+        """
+        Consome as *operacoes* (tipicamente um gerador de *ler_rastro*) uma a uma.
+        O quanto é exibido por operação depende do nível de verbosidade (módulo registro).
+        Retorna o resumo acumulado.
+        """
+        inicio = time.perf_counter()
+        for operacao in operacoes:
+            self.aplicar(operacao)
+        self.leilao.drenar_buffers() # o fim do rastro é uma barreira
+        self.resumo.duracao += time.perf_counter() - inicio
+        self.medir_tempo()
+        return self.resumo
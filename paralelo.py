@@ -0,0 +1,169 @@
+"""
+Execução paralela de um rastro, dividida em fragmentos (shards) por endereço.
+
+Cada fragmento é um leilão completo (RAM, Barramento e caches de todos os compradores)
+executado num processo do ProcessPoolExecutor. Os endereços são distribuídos pelo
+índice do conjunto da cache: como blocos de conjuntos diferentes nunca disputam as
+mesmas vias, e a coerência é mantida por bloco, cada fragmento reproduz exatamente
+o que aconteceria com os seus endereços numa execução em um único processo.
+
+As operações 'item' e 'comprador' vão para todos os fragmentos (os ids ficam iguais);
+'ler', 'lance' e 'encerrar' vão apenas para o fragmento dono do endereço do item.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Iterable
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro, Resumo
+from ram import RAM, TAMANHO_PAGINA
+from rastro import Operacao, formatar_operacao, ler_rastro
+from registro import SILENCIOSO
+import registro
+import estatisticas
+import os
+import random
+import tempfile
+import time
+
+
+def num_conjuntos(config : Configuracao) -> int:
+    """ Quantidade de conjuntos das caches da *config*. """
+    associatividade = config.associatividade if config.associatividade is not None else config.tamanho_cache
+    return config.tamanho_cache // associatividade
+
+
+def fragmento_do_endereco(endereco : int, config : Configuracao, fragmentos : int) -> int:
+    """ Fragmento dono do *endereco*: o índice do conjunto do bloco, distribuído entre os *fragmentos*. """
+    return (max(endereco, 0) // config.tamanho_bloco) % num_conjuntos(config) % fragmentos
+
+
+class MotorFragmento(MotorRastro):
+    def __init__(self, leilao : Leilao, indice : int, fragmentos : int):
+        """
+        Motor de um fragmento: itens de outros fragmentos são registrados
+        (para manter os ids), mas o preço só é escrito na RAM do fragmento dono.
+        """
+        super().__init__(leilao)
+        self.indice : int = indice
+        self.fragmentos : int = fragmentos
+
+    def aplicar(self, operacao : Operacao) -> None:
+        if operacao.tipo == "item":
+            dono = fragmento_do_endereco(self.leilao.id_item_prox, self.leilao.config, self.fragmentos)
+            self.leilao.adicionar_item(*operacao.args, inicializar_ram=(dono == self.indice))
+            return
+        super().aplicar(operacao)
+
+
+def _executar_fragmento(config : Configuracao, caminho : str, indice : int, fragmentos : int,
+                        coletar_ram : bool) -> tuple[Resumo, dict, dict[int, int] | None]:
+    """
+    Executa um fragmento num processo do pool e devolve (resumo, estatísticas, palavras da RAM).
+    As palavras devolvidas são as do fragmento nas páginas que ele criou; as demais têm o conteúdo da semente.
+    """
+    registro.definir_nivel(SILENCIOSO) # mensagens de vários processos misturadas não ajudam
+    leilao = Leilao(config)
+    resumo = MotorFragmento(leilao, indice, fragmentos).executar(ler_rastro(caminho))
+
+    memoria = None
+    if coletar_ram:
+        memoria = {}
+        for numero in leilao.ram.paginas_criadas():
+            inicio = numero * TAMANHO_PAGINA
+            for deslocamento, valor in enumerate(leilao.ram.ler_intervalo(inicio, min(TAMANHO_PAGINA, config.tamanho_ram - inicio))):
+                if fragmento_do_endereco(inicio + deslocamento, config, fragmentos) == indice:
+                    memoria[inicio + deslocamento] = valor
+    return resumo, estatisticas.coletar(leilao), memoria
+
+
+class ResultadoParalelo():
+    def __init__(self, resumo : Resumo, estatisticas : dict, ram : RAM | None):
+        """ Relatório unificado da execução paralela. """
+        self.resumo : Resumo = resumo
+        self.estatisticas : dict = estatisticas
+        self.ram : RAM | None = ram # conteúdo final da RAM, se solicitado
+
+
+def particionar(operacoes : Iterable[Operacao], config : Configuracao, fragmentos : int,
+                pasta : str) -> tuple[list[str], Resumo]:
+    """
+    Distribui as *operacoes* em um arquivo de rastro por fragmento, dentro de *pasta*,
+    sem carregá-las todas na memória. Retorna os caminhos e um resumo com a contagem por tipo.
+    """
+    caminhos = [os.path.join(pasta, f"fragmento_{indice}.txt") for indice in range(fragmentos)]
+    arquivos = [open(caminho, "w", encoding="utf-8") for caminho in caminhos]
+    resumo = Resumo()
+    try:
+        for operacao in operacoes:
+            resumo.operacoes += 1
+            resumo.por_tipo[operacao.tipo] = resumo.por_tipo.get(operacao.tipo, 0) + 1
+            linha = formatar_operacao(operacao) + "\n"
+            if operacao.tipo in ("item", "comprador"):
+                for arquivo in arquivos:
+                    arquivo.write(linha)
+            else:
+                id_item = operacao.args[0] if operacao.tipo == "encerrar" else operacao.args[1]
+                arquivos[fragmento_do_endereco(id_item, config, fragmentos)].write(linha)
+    finally:
+        for arquivo in arquivos:
+            arquivo.close()
+    return caminhos, resumo
+
+
+def executar_paralelo(operacoes : Iterable[Operacao], config : Configuracao, fragmentos : int,
+                      coletar_ram : bool = False) -> ResultadoParalelo:
+    """
+    Executa as *operacoes* em *fragmentos* processos e junta os resultados.
+    O resultado é idêntico ao de um único processo com a mesma semente da RAM
+    (config.semente_ram, sorteada se None).
+    Com *coletar_ram*, o conteúdo final da RAM também é reconstruído a partir dos fragmentos.
+    """
+    conjuntos = num_conjuntos(config)
+    if not 1 <= fragmentos <= conjuntos:
+        raise ValueError(f"Com {conjuntos} conjunto(s) por cache, use entre 1 e {conjuntos} fragmentos "
+                         f"(recebido {fragmentos}); reduza a associatividade para dividir mais.")
+    if config.tamanho_llc > 0 and fragmentos > 1:
+        associatividade_llc = config.associatividade_llc if config.associatividade_llc is not None else config.tamanho_llc
+        conjuntos_llc = config.tamanho_llc // associatividade_llc
+        # Cada conjunto da LLC precisa receber blocos de um único fragmento
+        if conjuntos_llc % conjuntos != 0:
+            raise ValueError(f"Com LLC, o número de conjuntos dela ({conjuntos_llc}) precisa ser múltiplo "
+                             f"do das caches ({conjuntos}) para dividir a execução.")
+    if config.arquivo_ram is not None:
+        raise ValueError("A execução paralela não suporta imagem da RAM em arquivo.")
+    if config.buffer_escrita and fragmentos > 1:
+        # as drenagens dependem da ordem de todas as escritas de cada comprador, que os fragmentos dividem
+        raise ValueError("A execução paralela não suporta o buffer de escrita.")
+    if config.prebusca is not None and fragmentos > 1:
+        # os blocos pré-buscados caem em conjuntos de outros fragmentos
+        raise ValueError("A execução paralela não suporta a pré-busca.")
+    if config.semente_ram is None:
+        config = replace(config, semente_ram=random.getrandbits(64)) # todos os fragmentos partem da mesma RAM
+
+    inicio = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="moesi_") as pasta:
+        caminhos, resumo = particionar(operacoes, config, fragmentos, pasta)
+        with ProcessPoolExecutor(max_workers=fragmentos) as executor:
+            futuros = [executor.submit(_executar_fragmento, config, caminho, indice, fragmentos, coletar_ram)
+                       for indice, caminho in enumerate(caminhos)]
+            resultados = [futuro.result() for futuro in futuros]
+
+    partes = []
+    ram = RAM(config.tamanho_ram, config.semente_ram) if coletar_ram else None
+    for resumo_fragmento, dados, memoria_fragmento in resultados:
+        resumo.invalidas += resumo_fragmento.invalidas
+        resumo.lances_aceitos += resumo_fragmento.lances_aceitos
+        resumo.lances_rejeitados += resumo_fragmento.lances_rejeitados
+        resumo.vencedores.update(resumo_fragmento.vencedores)
+        partes.append(dados)
+        if ram is not None:
+            for endereco, valor in memoria_fragmento.items():
+                ram.escrever(endereco, valor)
+    resumo.duracao = time.perf_counter() - inicio
+
+    dados = estatisticas.combinar(partes)
+    resumo.ciclos = dados["ciclos"]
+    resumo.amat = {nome: contadores["amat"] for nome, contadores in dados["caches"].items()}
+    return ResultadoParalelo(resumo, dados, ram)
@@ -0,0 +1,307 @@
+"""
+Instrumentação e perfil de desempenho da simulação.
+
+Trechos medidos: os métodos do caminho crítico (cache, barramento, RAM, cores e
+log) são embrulhados por cronômetros apenas enquanto a medição está ativa;
+desligada, as funções originais ficam no lugar e o custo é zero. Só a lista fixa
+de _alvos é embrulhada, e as referências trocadas são as dos módulos do projeto em
+IMPORTADORES: closures, argumentos padrão e funções guardadas em instâncias
+continuam com a original e ficam fora da medição.
+
+Perfis: executam um cenário sob o cProfile (determinístico), sob um amostrador
+de pilhas (estatístico) ou com os trechos medidos, e gravam um relatório por função,
+ordenado, e um arquivo de pilhas colapsadas (formato "a;b;c N") para gráficos de
+chama. No modo trechos as pilhas são as dos trechos aninhados, em microssegundos
+de tempo próprio.
+
+A amostragem é enviesada pelo GIL: a coletora só roda quando a thread principal
+libera o GIL, o que acontece sobretudo nas chamadas de E/S. As amostras se acumulam
+onde a simulação faz E/S (com log ativo, quase todas em registro.registrar), e não
+onde o tempo de CPU é gasto; para a distribuição do tempo, use cprofile ou trechos.
+
+Uso:
+    python main.py rastro.txt --perfil cprofile --perfil-saida perfil
+"""
+from __future__ import annotations
+from typing import Callable
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+
+MODOS = ("cprofile", "amostragem", "trechos")
+INTERVALO_AMOSTRAGEM = 0.001 # segundos entre amostras de pilha
+PROFUNDIDADE_MAXIMA = 64 # limite das pilhas reconstruídas a partir do cProfile
+
+
+class Medicao():
+    """ Tempo acumulado de um trecho: chamadas, total e maior duração, em nanossegundos. """
+    __slots__ = ("chamadas", "total_ns", "maximo_ns")
+
+    def __init__(self):
+        self.chamadas : int = 0
+        self.total_ns : int = 0
+        self.maximo_ns : int = 0
+
+
+def _alvos() -> dict[str, tuple[object, str]]:
+    """ Trechos instrumentáveis: nome -> (classe ou objeto dono, atributo). """
+    from cache import Cache
+    from barramento import Barramento
+    from motor import MotorRastro
+    from ram import RAM
+    from llc import CacheCompartilhada
+    import colors
+    import registro
+    return {
+        "motor.aplicar": (MotorRastro, "aplicar"),
+        "cache.ler": (Cache, "ler"),
+        "cache.escrever": (Cache, "escrever"),
+        "cache.comparar_e_escrever": (Cache, "comparar_e_escrever"),
+        "cache.buscar_linha": (Cache, "buscar_linha"),
+        "cache.alocar_linha": (Cache, "_alocar_linha"),
+        "cache.prebuscar": (Cache, "_prebuscar"),
+        "barramento.solicitar_leitura": (Barramento, "solicitar_leitura"),
+        "barramento.solicitar_escrita": (Barramento, "solicitar_escrita"),
+        "barramento.solicitar_lance": (Barramento, "solicitar_lance"),
+        "barramento.solicitar_prebusca": (Barramento, "solicitar_prebusca"),
+        "barramento.write_back": (Barramento, "write_back"),
+        "barramento.escrita_externa": (Barramento, "escrita_externa"),
+        "llc.ler_bloco": (CacheCompartilhada, "ler_bloco"),
+        "llc.escrever_bloco": (CacheCompartilhada, "escrever_bloco"),
+        "ram.ler": (RAM, "ler"),
+        "ram.escrever": (RAM, "escrever"),
+        "ram.ler_bloco": (RAM, "ler_bloco"),
+        "ram.escrever_bloco": (RAM, "escrever_bloco"),
+        "colors.color": (colors, "color"),
+        "registro.registrar": (registro, "registrar"),
+        "logging.info": (registro.logger, "info"),
+    }
+
+
+# Módulos do projeto que importam funções instrumentadas com 'from modulo import nome'
+IMPORTADORES : dict[str, tuple[str, ...]] = {
+    "colors.color": ("leilao", "motor", "registro"),
+    "registro.registrar": ("leilao",),
+}
+
+medicoes : dict[str, Medicao] = {}
+pilhas_trechos : dict[str, int] = {} # pilha de trechos aninhados -> tempo próprio (ns)
+_originais : dict[str, tuple[object, str, object, bool]] = {}
+_ativos = threading.local() # trechos em execução em cada thread: [pilha, tempo dos filhos (ns)]
+
+
+def _cronometrar(nome : str, funcao : Callable, medicao : Medicao) -> Callable:
+    relogio = time.perf_counter_ns
+
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        ativos = getattr(_ativos, "quadros", None)
+        if ativos is None:
+            ativos = _ativos.quadros = []
+        quadro = [ativos[-1][0] + ";" + nome if ativos else nome, 0]
+        ativos.append(quadro)
+        inicio = relogio()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            duracao = relogio() - inicio
+            ativos.pop()
+            if ativos:
+                ativos[-1][1] += duracao
+            pilhas_trechos[quadro[0]] = pilhas_trechos.get(quadro[0], 0) + duracao - quadro[1]
+            medicao.chamadas += 1
+            medicao.total_ns += duracao
+            if duracao > medicao.maximo_ns:
+                medicao.maximo_ns = duracao
+    return medida
+
+
+def _trocar_referencias(nome : str, atributo : str, antiga : object, nova : object) -> None:
+    """ Troca *antiga* por *nova* nos módulos de IMPORTADORES[*nome*] já carregados. """
+    for modulo in IMPORTADORES.get(nome, ()):
+        espaco = vars(sys.modules[modulo]) if modulo in sys.modules else {}
+        if espaco.get(atributo) is antiga:
+            espaco[atributo] = nova
+
+
+def ativar(nomes : list[str] | None = None) -> None:
+    """ Embrulha os trechos *nomes* (todos, se omitidos) com cronômetros e zera as medições. """
+    alvos = _alvos()
+    pilhas_trechos.clear()
+    for nome in nomes if nomes is not None else alvos:
+        if nome in _originais:
+            continue
+        dono, atributo = alvos[nome]
+        original = getattr(dono, atributo)
+        proprio = atributo in vars(dono) # atributo do próprio objeto ou herdado da classe
+        medicoes[nome] = Medicao()
+        embrulhada = _cronometrar(nome, original, medicoes[nome])
+        setattr(dono, atributo, embrulhada)
+        _trocar_referencias(nome, atributo, original, embrulhada)
+        _originais[nome] = (dono, atributo, original, proprio)
+
+
+def desativar() -> None:
+    """ Devolve as funções originais; as medições continuam disponíveis. """
+    for nome, (dono, atributo, original, proprio) in _originais.items():
+        embrulhada = getattr(dono, atributo)
+        if proprio:
+            setattr(dono, atributo, original)
+        else:
+            delattr(dono, atributo)
+        _trocar_referencias(nome, atributo, embrulhada, original)
+    _originais.clear()
+
+
+def relatorio_trechos() -> str:
+    """ Tabela dos trechos medidos, do maior tempo total (inclusivo) para o menor. """
+    linhas = [f"{'trecho':<32} {'chamadas':>10} {'total (ms)':>12} {'média (ns)':>12} {'máximo (ns)':>12}"]
+    for nome, medicao in sorted(medicoes.items(), key=lambda par: -par[1].total_ns):
+        if medicao.chamadas:
+            linhas.append(f"{nome:<32} {medicao.chamadas:>10} {medicao.total_ns / 1e6:>12.2f} "
+                          f"{medicao.total_ns // medicao.chamadas:>12} {medicao.maximo_ns:>12}")
+    return "\n".join(linhas)
+
+
+def _nome_funcao(arquivo : str, linha : int, funcao : str) -> str:
+    if arquivo == "~":
+        return funcao # funções embutidas, ex.: <built-in method builtins.print>
+    return f"{funcao} ({arquivo.replace(chr(92), '/').rsplit('/', 1)[-1]}:{linha})"
+
+
+def _pilhas_cprofile(estatisticas : dict) -> dict[str, int]:
+    """
+    Reconstrói pilhas colapsadas (em microssegundos) a partir do grafo de chamadas do cProfile.
+    O tempo de cada função é repartido entre os caminhos na proporção das chamadas de cada chamador.
+    """
+    filhos : dict[tuple, list[tuple[tuple, float]]] = {}
+    for funcao, (_, _, _, _, chamadores) in estatisticas.items():
+        for chamador, (_, _, _, tempo_aresta) in chamadores.items():
+            filhos.setdefault(chamador, []).append((funcao, tempo_aresta))
+
+    pilhas : dict[str, int] = {}
+
+    def visitar(funcao : tuple, caminho : list[str], no_caminho : set, fracao : float) -> None:
+        _, _, tempo_proprio, tempo_total, _ = estatisticas[funcao]
+        caminho = caminho + [_nome_funcao(*funcao)]
+        pilha = ";".join(caminho)
+        pilhas[pilha] = pilhas.get(pilha, 0) + round(tempo_proprio * fracao * 1e6)
+        if len(caminho) >= PROFUNDIDADE_MAXIMA:
+            return
+        for filho, tempo_aresta in filhos.get(funcao, ()):
+            total_filho = estatisticas[filho][3]
+            parte = fracao * tempo_aresta / total_filho if total_filho else 0.0
+            if filho in no_caminho or total_filho * parte < 1e-6: # recursão ou contribuição desprezível
+                continue
+            visitar(filho, caminho, no_caminho | {filho}, parte)
+
+    for funcao, (_, _, _, _, chamadores) in estatisticas.items():
+        if not chamadores:
+            visitar(funcao, [], {funcao}, 1.0)
+    return {pilha: micros for pilha, micros in pilhas.items() if micros > 0}
+
+
+class Amostrador():
+    def __init__(self, intervalo : float = INTERVALO_AMOSTRAGEM, thread : threading.Thread | None = None):
+        """
+        Amostra periodicamente a pilha da *thread* (a principal, por padrão).
+        As amostras só são tiradas quando a *thread* libera o GIL: ver o viés no início do módulo.
+        """
+        self.intervalo : float = intervalo
+        self.id_thread : int = (thread or threading.main_thread()).ident
+        self.amostras : dict[tuple[tuple[str, int, str], ...], int] = {}
+        self.parar : threading.Event = threading.Event()
+        self.coletora : threading.Thread = threading.Thread(target=self._coletar, name="amostrador", daemon=True)
+
+    def _coletar(self) -> None:
+        while not self.parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append((codigo.co_filename, codigo.co_firstlineno, codigo.co_name))
+                quadro = quadro.f_back
+            if pilha:
+                chave = tuple(reversed(pilha))
+                self.amostras[chave] = self.amostras.get(chave, 0) + 1
+
+    def __enter__(self):
+        self.intervalo_troca = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.intervalo_troca, self.intervalo / 2)) # a coletora precisa do GIL a tempo
+        self.coletora.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self.parar.set()
+        self.coletora.join()
+        sys.setswitchinterval(self.intervalo_troca)
+
+    def pilhas(self) -> dict[str, int]:
+        """ Pilhas colapsadas, em número de amostras. """
+        return {";".join(_nome_funcao(*quadro) for quadro in pilha): total for pilha, total in self.amostras.items()}
+
+    def relatorio(self) -> str:
+        """ Funções ordenadas por amostras próprias (topo da pilha), com as inclusivas ao lado. """
+        proprias : dict[str, int] = {}
+        inclusivas : dict[str, int] = {}
+        for pilha, total in self.amostras.items():
+            nomes = [_nome_funcao(*quadro) for quadro in pilha]
+            proprias[nomes[-1]] = proprias.get(nomes[-1], 0) + total
+            for nome in set(nomes):
+                inclusivas[nome] = inclusivas.get(nome, 0) + total
+        soma = sum(self.amostras.values()) or 1
+        linhas = [f"{sum(self.amostras.values())} amostras a cada {self.intervalo * 1000:g} ms",
+                  f"{'próprias':>9} {'%':>6} {'inclusivas':>10} {'%':>6}  função"]
+        for nome, total in sorted(proprias.items(), key=lambda par: -par[1]):
+            linhas.append(f"{total:>9} {100 * total / soma:>6.1f} {inclusivas[nome]:>10} "
+                          f"{100 * inclusivas[nome] / soma:>6.1f}  {nome}")
+        return "\n".join(linhas)
+
+
+def _gravar_pilhas(pilhas : dict[str, int], caminho : str) -> None:
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for pilha, total in sorted(pilhas.items()):
+            arquivo.write(f"{pilha} {total}\n")
+
+
+def perfilar(cenario : Callable[[], object], modo : str, prefixo : str = "perfil") -> object:
+    """
+    Executa o *cenario* sob o perfil *modo* ("cprofile", "amostragem" ou "trechos")
+    e grava o relatório em *prefixo*.txt e as pilhas colapsadas em *prefixo*.folded.
+    Retorna o resultado do cenário.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de perfil desconhecido: {modo} (opções: {', '.join(MODOS)})")
+
+    if modo == "cprofile":
+        perfilador = cProfile.Profile()
+        resultado = perfilador.runcall(cenario)
+        texto = io.StringIO()
+        estatisticas = pstats.Stats(perfilador, stream=texto)
+        estatisticas.sort_stats(pstats.SortKey.TIME).print_stats()
+        relatorio = texto.getvalue()
+        pilhas = _pilhas_cprofile(estatisticas.stats)
+    elif modo == "amostragem":
+        with Amostrador() as amostrador:
+            resultado = cenario()
+        relatorio = amostrador.relatorio()
+        pilhas = amostrador.pilhas()
+    else:
+        ativar()
+        try:
+            resultado = cenario()
+        finally:
+            desativar()
+        relatorio = relatorio_trechos()
+        pilhas = {pilha: round(total / 1000) for pilha, total in pilhas_trechos.items() if total >= 500}
+
+    with open(prefixo + ".txt", "w", encoding="utf-8") as arquivo:
+        arquivo.write(relatorio + "\n")
+    _gravar_pilhas(pilhas, prefixo + ".folded")
+    logging.getLogger("moesi").info("Perfil (%s) gravado em %s.txt e %s.folded", modo, prefixo, prefixo)
+    return resultado
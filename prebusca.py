@@ -0,0 +1,120 @@
+"""
+Unidades de pré-busca (prefetch) das caches.
+
+A unidade é treinada pelos misses de leitura da sua cache e pelo primeiro uso de cada
+linha pré-buscada; a cada evento ela sugere blocos que o comprador deve consultar em
+seguida. A cache traz esses blocos com leituras especulativas em SHARED
+(Barramento.solicitar_prebusca), canceladas quando outra cache tem o bloco num estado que
+escreve sem o barramento (Protocolo.exclusivos: M e E, os que o protocolo tiver).
+Uma linha pré-buscada ainda não usada é a que tem a máscara *acessados* zerada.
+
+Modos:
+    proxima: os *grau* blocos seguintes ao do evento (next-line);
+    passo:   detecta um passo constante entre eventos seguidos e segue a sequência (stride);
+    popular: os *grau* blocos com mais eventos (itens disputados, que os lances dos outros
+             invalidam), trazidos de volta a cada miss (frequência).
+"""
+from abc import ABC, abstractmethod
+import heapq
+
+TAMANHO_TABELA_POPULAR = 64 # blocos acompanhados pelo modo popular
+LIMIAR_POPULAR = 2 # eventos para um bloco ser considerado popular
+
+
+class Prebusca(ABC):
+    def __init__(self, grau : int, tamanho_bloco : int, limite : int):
+        """
+        Unidade que sugere até *grau* blocos por evento, de *tamanho_bloco* palavras,
+        sempre abaixo do endereço *limite* (tamanho da RAM).
+        """
+        if grau <= 0:
+            raise ValueError(f"Grau de pré-busca inválido: {grau}")
+        self.grau : int = grau
+        self.tamanho_bloco : int = tamanho_bloco
+        self.limite : int = limite
+
+    def observar(self, inicio : int) -> list[int]:
+        """ Registra o evento no bloco em *inicio* e retorna o início dos blocos a pré-buscar. """
+        numero = inicio // self.tamanho_bloco
+        return [bloco * self.tamanho_bloco for bloco in self.sugerir(numero)
+                if bloco != numero and 0 <= bloco * self.tamanho_bloco < self.limite]
+
+    @abstractmethod
+    def sugerir(self, bloco : int) -> list[int]:
+        """ Números dos blocos sugeridos após um evento no *bloco*. """
+
+    def exportar(self) -> list[int]:
+        """ Estado interno como lista de inteiros (usado pelos checkpoints). """
+        return []
+
+    def importar(self, valores : list[int]) -> None:
+        """ Restaura o estado gerado por *exportar*. """
+
+
+class ProximaLinha(Prebusca):
+    """ Traz os blocos seguintes ao do evento. """
+    def sugerir(self, bloco : int) -> list[int]:
+        return [bloco + distancia for distancia in range(1, self.grau + 1)]
+
+
+class Passo(Prebusca):
+    """ Segue a sequência quando dois eventos seguidos repetem a mesma distância entre blocos. """
+    def __init__(self, grau : int, tamanho_bloco : int, limite : int):
+        super().__init__(grau, tamanho_bloco, limite)
+        self.ultimo : int = -1 # bloco do último evento; -1 = nenhum
+        self.passo : int = 0 # distância entre os dois últimos eventos; 0 = nenhuma
+
+    def sugerir(self, bloco : int) -> list[int]:
+        if self.ultimo < 0:
+            self.ultimo = bloco
+            return []
+        passo = bloco - self.ultimo
+        confirmado = passo != 0 and passo == self.passo
+        self.ultimo, self.passo = bloco, passo
+        if not confirmado:
+            return []
+        return [bloco + passo * distancia for distancia in range(1, self.grau + 1)]
+
+    def exportar(self) -> list[int]:
+        return [self.ultimo, self.passo]
+
+    def importar(self, valores : list[int]) -> None:
+        self.ultimo, self.passo = valores
+
+
+class Popular(Prebusca):
+    """
+    Conta os eventos por bloco numa tabela limitada (ao encher, as contagens caem pela
+    metade) e sugere os blocos mais frequentes, que a cache traz de volta se não os tiver.
+    """
+    def __init__(self, grau : int, tamanho_bloco : int, limite : int):
+        super().__init__(grau, tamanho_bloco, limite)
+        self.frequencia : dict[int, int] = {} # bloco -> eventos
+
+    def sugerir(self, bloco : int) -> list[int]:
+        frequencia = self.frequencia
+        if bloco not in frequencia and len(frequencia) >= TAMANHO_TABELA_POPULAR:
+            self.frequencia = frequencia = {outro: total // 2 for outro, total in frequencia.items() if total > 1}
+        frequencia[bloco] = frequencia.get(bloco, 0) + 1
+        populares = heapq.nlargest(self.grau + 1, frequencia.items(), key=lambda par: (par[1], -par[0]))
+        return [outro for outro, total in populares if total >= LIMIAR_POPULAR and outro != bloco][:self.grau]
+
+    def exportar(self) -> list[int]:
+        return [valor for par in self.frequencia.items() for valor in par]
+
+    def importar(self, valores : list[int]) -> None:
+        self.frequencia = dict(zip(valores[::2], valores[1::2]))
+
+
+MODOS_PREBUSCA = {
+    "proxima": ProximaLinha,
+    "passo": Passo,
+    "popular": Popular,
+}
+
+
+def criar_prebusca(modo : str, grau : int, tamanho_bloco : int, limite : int) -> Prebusca:
+    """ Instancia a unidade de pré-busca do *modo* pedido. """
+    if modo not in MODOS_PREBUSCA:
+        raise ValueError(f"Modo de pré-busca desconhecido: {modo} (opções: {', '.join(MODOS_PREBUSCA)})")
+    return MODOS_PREBUSCA[modo](grau, tamanho_bloco, limite)
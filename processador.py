@@ -1,7 +1,7 @@
 from abc import ABC
-from colors import color
 from cache import Cache
-import logging
+from registro import COMPLETO
+import registro
 class Processador(ABC):
     def __init__(self, id_processador: int, cache: Cache):
         """
@@ -11,23 +11,23 @@ class Processador(ABC):
         self.cache: Cache = cache
         
     
-    def log(self, msg: str) -> None:
-        """Registra uma mensagem no histórico do processador"""
-        print(color(f"[Processador {self.id}] {msg}", "processador"))
-        logging.info(f"[Processador {self.id}] {msg}")
+    def log(self, msg: str, *args, nivel: int = COMPLETO) -> None:
+        """Registra uma mensagem no histórico do processador, formatada apenas se o *nivel* estiver ativo"""
+        if nivel <= registro.nivel:
+            registro.registrar(nivel, "processador", "[Processador %d] " + msg, self.id, *args)
 
 
     def ler(self, endereco: int) -> int | None:
         """
         Realiza uma operação de leitura (load) de um endereço.
         """
-        self.log(f"Executando leitura do endereço {endereco}")
+        self.log("Executando leitura do endereço %d", endereco)
         dado = self.cache.ler(endereco)
         
         if dado is not None:
-            self.log(f"Leitura concluída. Valor: {dado}")
+            self.log("Leitura concluída. Valor: %s", dado)
         else:
-            self.log(f"Leitura falhou para endereço {endereco}")
+            self.log("Leitura falhou para endereço %d", endereco)
         
         return dado
     
@@ -36,14 +36,36 @@ class Processador(ABC):
         """
         Realiza uma operação de escrita (store) em um endereço.
         """
-        self.log(f"Executando escrita no endereço {endereco} com valor {valor}")
+        self.log("Executando escrita no endereço %d com valor %d", endereco, valor)
         self.cache.escrever(endereco, valor)
-        self.log(f"Escrita concluída. Valor: {valor}")
+        self.log("Escrita concluída. Valor: %d", valor)
     
+    def comparar_e_escrever(self, endereco: int, valor: int) -> tuple[bool, int | None]:
+        """
+        Escreve *valor* no endereço apenas se for maior que o atual, numa operação atômica
+        (no máximo uma transação no barramento). Retorna se escreveu e o valor que estava lá.
+        """
+        self.log("Executando compare-and-swap no endereço %d com valor %d", endereco, valor)
+        aceito, valor_atual = self.cache.comparar_e_escrever(endereco, valor)
+        self.log("Compare-and-swap %s. Valor anterior: %s", "concluído" if aceito else "recusado", valor_atual)
+        return aceito, valor_atual
+
+    def barreira(self) -> None:
+        """
+        Barreira de memória (fence): as escritas que estão no buffer de escrita da cache ficam visíveis.
+        """
+        self.log("Executando barreira")
+        self.cache.barreira()
+
+    @property
+    def ciclos(self) -> int:
+        """ Ciclos simulados gastos pelos acessos deste processador. """
+        return self.cache.relogio.ciclos_de(self.id)
+
     def mostrar_cache(self) -> None:
         """Exibe o estado atual da cache do processador"""
         print(f"\n{'='*50}")
-        self.log(f"Estado da Cache") 
+        self.log("Estado da Cache") 
         print(f"{'='*50}")
         print(self.cache)
 
@@ -0,0 +1,118 @@
+"""
+Protocolos de coerência dirigidos por tabela.
+
+Cada protocolo é uma tabela (estado, evento) -> Transicao, montada uma única vez
+na inicialização. A cache e o barramento não comparam estados: consultam a
+tabela do protocolo escolhido (MOESI, MESI, MSI ou MESIF) e seguem a transição.
+"""
+from enum import Enum
+from typing import NamedTuple
+from moesi import Estado
+
+M, O, E, S, I, F = Estado.MODIFIED, Estado.OWNED, Estado.EXCLUSIVE, Estado.SHARED, Estado.INVALID, Estado.FORWARD
+
+
+class Evento(Enum):
+    LEITURA = "PrRd" # leitura do processador local (hit)
+    ESCRITA = "PrWr" # escrita do processador local
+    BUS_RD = "BusRd" # leitura de outra cache, observada no barramento
+    BUS_RDX = "BusRdX" # escrita de outra cache (leitura exclusiva ou upgrade), observada no barramento
+    CARGA_EXCLUSIVA = "Fill-E" # bloco trazido num miss de leitura, sem outras cópias
+    CARGA_COMPARTILHADA = "Fill-S" # bloco trazido num miss de leitura, com outras cópias
+
+
+class Transicao(NamedTuple):
+    proximo : Estado
+    barramento : bool = False # a escrita local precisa invalidar as outras cópias (BusUpgr)
+    fornece : bool = False # a linha observada entrega o bloco à requisitante (cache-to-cache)
+    write_back : bool = False # a linha observada grava o bloco na RAM (flush) antes de compartilhar
+
+
+# Eventos locais iguais nos quatro protocolos: hits de leitura não mudam o estado,
+# escrever em linha exclusiva é silencioso e nas compartilhadas exige invalidar as cópias
+_LEITURA = {estado: Transicao(estado) for estado in (M, O, E, S, F)}
+_ESCRITA = {M: Transicao(M), E: Transicao(M), O: Transicao(M, barramento=True),
+            S: Transicao(M, barramento=True), F: Transicao(M, barramento=True)}
+# Numa escrita observada toda cópia é invalidada; só as sujas entregam o bloco
+_BUS_RDX = {M: Transicao(I, fornece=True), O: Transicao(I, fornece=True),
+            E: Transicao(I), S: Transicao(I), F: Transicao(I)}
+
+DEFINICOES : dict[str, dict] = {
+    # OWNED: a dona de um bloco modificado o compartilha sem gravar na RAM
+    "moesi": {
+        "estados": (M, O, E, S),
+        Evento.BUS_RD: {M: Transicao(O, fornece=True), O: Transicao(O, fornece=True),
+                        E: Transicao(S, fornece=True), S: Transicao(S, fornece=True)},
+        Evento.CARGA_EXCLUSIVA: E,
+        Evento.CARGA_COMPARTILHADA: S,
+    },
+    # Sem OWNED: compartilhar um bloco modificado obriga a gravá-lo na RAM
+    "mesi": {
+        "estados": (M, E, S),
+        Evento.BUS_RD: {M: Transicao(S, fornece=True, write_back=True),
+                        E: Transicao(S, fornece=True), S: Transicao(S, fornece=True)},
+        Evento.CARGA_EXCLUSIVA: E,
+        Evento.CARGA_COMPARTILHADA: S,
+    },
+    # Sem EXCLUSIVE: toda leitura chega em SHARED e a primeira escrita sempre vai ao barramento;
+    # cópias limpas não respondem, o bloco vem da RAM
+    "msi": {
+        "estados": (M, S),
+        Evento.BUS_RD: {M: Transicao(S, fornece=True, write_back=True), S: Transicao(S)},
+        Evento.CARGA_EXCLUSIVA: S,
+        Evento.CARGA_COMPARTILHADA: S,
+    },
+    # FORWARD: entre as cópias limpas, só a mais recente (F) responde às leituras
+    "mesif": {
+        "estados": (M, E, S, F),
+        Evento.BUS_RD: {M: Transicao(S, fornece=True, write_back=True), E: Transicao(S, fornece=True),
+                        F: Transicao(S, fornece=True), S: Transicao(S)},
+        Evento.CARGA_EXCLUSIVA: E,
+        Evento.CARGA_COMPARTILHADA: F,
+    },
+}
+PROTOCOLOS = tuple(DEFINICOES)
+PROTOCOLO_PADRAO = "moesi"
+
+
+class Protocolo():
+    def __init__(self, nome : str = PROTOCOLO_PADRAO):
+        """
+        Monta a tabela (estado, evento) -> Transicao do protocolo *nome*
+        e as tabelas por evento usadas no caminho crítico.
+        """
+        if nome not in DEFINICOES:
+            raise ValueError(f"Protocolo desconhecido: {nome} (opções: {', '.join(PROTOCOLOS)})")
+        definicao = DEFINICOES[nome]
+        self.nome : str = nome
+        self.estados : tuple[Estado, ...] = definicao["estados"]
+
+        self.tabela : dict[tuple[Estado, Evento], Transicao] = {}
+        for evento, transicoes in ((Evento.LEITURA, _LEITURA), (Evento.ESCRITA, _ESCRITA),
+                                   (Evento.BUS_RD, definicao[Evento.BUS_RD]), (Evento.BUS_RDX, _BUS_RDX)):
+            for estado in self.estados:
+                self.tabela[(estado, evento)] = transicoes[estado]
+        for evento in (Evento.CARGA_EXCLUSIVA, Evento.CARGA_COMPARTILHADA):
+            self.tabela[(I, evento)] = Transicao(definicao[evento])
+
+        self.escrita : dict[Estado, Transicao] = self._por_evento(Evento.ESCRITA)
+        self.bus_rd : dict[Estado, Transicao] = self._por_evento(Evento.BUS_RD)
+        self.bus_rdx : dict[Estado, Transicao] = self._por_evento(Evento.BUS_RDX)
+        self.carga_exclusiva : Estado = self.tabela[(I, Evento.CARGA_EXCLUSIVA)].proximo
+        self.carga_compartilhada : Estado = self.tabela[(I, Evento.CARGA_COMPARTILHADA)].proximo
+
+        # Estados sujos (write-back ao sair da cache) e os que escrevem sem sair do estado nem usar o barramento
+        self.sujos : frozenset[Estado] = frozenset(estado for estado, transicao in self.bus_rdx.items() if transicao.fornece)
+        self.escrita_local : frozenset[Estado] = frozenset(
+            estado for estado, transicao in self.escrita.items() if transicao.proximo == estado and not transicao.barramento)
+        # Cópias únicas: escrevem sem usar o barramento (a pré-busca não pode tirar delas a exclusividade)
+        self.exclusivos : frozenset[Estado] = frozenset(
+            estado for estado, transicao in self.escrita.items() if not transicao.barramento)
+        # Donos no diretório: o estado que responde sozinho às leituras do bloco
+        self.donos : frozenset[Estado] = self.sujos | {estado for estado in (E, F) if estado in self.estados}
+
+    def _por_evento(self, evento : Evento) -> dict[Estado, Transicao]:
+        return {estado: self.tabela[(estado, evento)] for estado in self.estados}
+
+    def __repr__(self) -> str:
+        return f"Protocolo({self.nome.upper()}, estados {'/'.join(estado.sigla for estado in self.estados)}/I)"
@@ -1,23 +1,128 @@
+from array import array
+import mmap
+import os
 import random
-from colors import color
-import logging
+import struct
+from registro import RESUMO
+from estatisticas import ContadoresRAM
+import registro
 TAMANHO_RAM = 50
+TAMANHO_PAGINA = 4096 # palavras por página, a unidade de inicialização preguiçosa
 
-class RAM: 
-    def __init__(self, tamanho = TAMANHO_RAM):
+# Cabeçalho da imagem em arquivo: mágico, tamanho, semente, palavras por página
+MAGICO_IMAGEM = b"MOESIRAM"
+CABECALHO_IMAGEM = struct.Struct("<8sqQq")
+
+class RAM:
+    def __init__(self, tamanho = TAMANHO_RAM, semente : int | None = None, arquivo : str | None = None):
         """
-        Inicializa a memória RAM com o tamanho especificado.
-        Preenche os endereços de memória com valores aleatórios, entre 1 e 9999.
+        Inicializa a memória RAM com o tamanho especificado, que pode chegar a bilhões de endereços.
+        As palavras são guardadas em páginas de inteiros de 64 bits, criadas apenas no primeiro acesso
+        e preenchidas com valores entre 1 e 9999 gerados a partir da *semente* e do número da página
+        (o conteúdo é o mesmo para a mesma semente, qualquer que seja a ordem dos acessos).
+        Com *arquivo*, a memória é uma imagem persistente mapeada em memória (mmap);
+        se o arquivo já existir, seu conteúdo é reaproveitado.
         """
         self.tamanho : int = tamanho
-        # Preenchendo a memória com valores aleatórios, uma lista de inteiros
-        self.memoria  : list[int] = [random.randint(1, 9999) for _ in range(tamanho)]
-    
+        self.semente : int = semente if semente is not None else random.getrandbits(64)
+        self.paginas : dict[int, array | memoryview] = {} # páginas já criadas
+        self.restauradas : dict[int, memoryview] = {} # páginas de um checkpoint, copiadas no primeiro acesso
+        self.contadores : ContadoresRAM = ContadoresRAM()
+        self.arquivo : str | None = arquivo
+        self.mapa : mmap.mmap | None = None
+        if arquivo is not None:
+            self._abrir_imagem(arquivo)
+
+    def _abrir_imagem(self, arquivo : str) -> None:
+        """ Mapeia a imagem do *arquivo*: cabeçalho, mapa de bits das páginas criadas e as palavras. """
+        num_paginas = -(-self.tamanho // TAMANHO_PAGINA)
+        self.inicio_bits : int = CABECALHO_IMAGEM.size
+        self.inicio_palavras : int = self.inicio_bits + -(-num_paginas // 64) * 8 # alinhado em 8 bytes
+        tamanho_arquivo = self.inicio_palavras + num_paginas * TAMANHO_PAGINA * 8
+
+        if os.path.exists(arquivo) and os.path.getsize(arquivo) > 0:
+            descritor = open(arquivo, "r+b")
+            magico, tamanho, semente, pagina = CABECALHO_IMAGEM.unpack(descritor.read(CABECALHO_IMAGEM.size))
+            if magico != MAGICO_IMAGEM or tamanho != self.tamanho or pagina != TAMANHO_PAGINA:
+                descritor.close()
+                raise ValueError(f"A imagem {arquivo} não corresponde a uma RAM de {self.tamanho} palavras.")
+            self.semente = semente
+        else:
+            descritor = open(arquivo, "w+b")
+            descritor.write(CABECALHO_IMAGEM.pack(MAGICO_IMAGEM, self.tamanho, self.semente, TAMANHO_PAGINA))
+            descritor.truncate(tamanho_arquivo) # arquivo esparso: páginas não tocadas não ocupam disco
+
+        with descritor:
+            self.mapa = mmap.mmap(descritor.fileno(), tamanho_arquivo)
+        self.bits : memoryview = memoryview(self.mapa)[self.inicio_bits:self.inicio_palavras]
+        self.palavras : memoryview = memoryview(self.mapa)[self.inicio_palavras:].cast("q")
+
+    def fechar(self) -> None:
+        """ Grava e fecha a imagem em arquivo, se houver. """
+        if self.mapa is None:
+            return
+        self.paginas.clear()
+        self.bits.release()
+        self.palavras.release()
+        self.mapa.flush()
+        self.mapa.close()
+        self.mapa = None
+
+    def _gerar_pagina(self, numero : int) -> list[int]:
+        """ Conteúdo inicial da página *numero*, determinado pela semente. """
+        rng = random.Random(self.semente * 1_000_003 + numero)
+        return rng.choices(range(1, 10000), k=TAMANHO_PAGINA)
+
+    def _pagina(self, numero : int) -> array | memoryview:
+        """ Página *numero*, criada (e inicializada) no primeiro acesso. """
+        pagina = self.paginas.get(numero)
+        if pagina is not None:
+            return pagina
 
-    def log(self, msg: str) -> None:
-        """ Função de log para a RAM """
-        print(color(f"[RAM] {msg}", "ram"))
-        logging.info(f"[RAM] {msg}")
+        if self.mapa is None:
+            restaurada = self.restauradas.pop(numero, None)
+            if restaurada is None:
+                pagina = array("q", self._gerar_pagina(numero))
+            else:
+                pagina = array("q")
+                pagina.frombytes(restaurada)
+        else:
+            inicio = numero * TAMANHO_PAGINA
+            pagina = self.palavras[inicio:inicio + TAMANHO_PAGINA]
+            byte, bit = divmod(numero, 8)
+            if not self.bits[byte] >> bit & 1: # página ainda não inicializada na imagem
+                pagina[:] = array("q", self._gerar_pagina(numero))
+                self.bits[byte] |= 1 << bit
+        self.paginas[numero] = pagina
+        return pagina
+
+    def carregar_pagina(self, numero : int, dados : memoryview) -> None:
+        """
+        Substitui o conteúdo da página *numero* pelos bytes em *dados* (ex.: ao restaurar um checkpoint).
+        Na RAM em memória a cópia é adiada até o primeiro acesso à página; na imagem em arquivo ela é imediata.
+        """
+        if self.mapa is None:
+            self.paginas.pop(numero, None)
+            self.restauradas[numero] = dados
+            return
+        inicio = numero * TAMANHO_PAGINA
+        pagina = self.palavras[inicio:inicio + TAMANHO_PAGINA]
+        pagina[:] = dados.cast("q")
+        self.bits[numero // 8] |= 1 << numero % 8
+        self.paginas[numero] = pagina
+
+    def paginas_criadas(self) -> list[int]:
+        """ Números das páginas já inicializadas (as demais têm o conteúdo gerado pela semente). """
+        if self.mapa is None:
+            return sorted(self.paginas.keys() | self.restauradas.keys())
+        return [numero for numero in range(-(-self.tamanho // TAMANHO_PAGINA))
+                if self.bits[numero // 8] >> numero % 8 & 1]
+
+
+    def log(self, msg: str, *args, nivel: int = RESUMO) -> None:
+        """ Função de log para a RAM, formatada apenas se o *nivel* estiver ativo """
+        if nivel <= registro.nivel:
+            registro.registrar(nivel, "ram", "[RAM] " + msg, *args)
 
     def ler(self, endereco : int) -> int | None:
         """
@@ -26,12 +131,14 @@ class RAM:
         """
 
         if 0 <= endereco < self.tamanho:
-            return self.memoria[endereco]
+            self.contadores.leituras += 1
+            numero, deslocamento = divmod(endereco, TAMANHO_PAGINA)
+            return self._pagina(numero)[deslocamento]
         else:
-            self.log(f"Endereço {endereco} inválido na RAM.")
+            self.log("Endereço %d inválido na RAM.", endereco)
             return None
-        
-            
+
+
     def escrever(self, endereco : int, valor : int ) -> None:
         """
         Escreve um valor no endereço especificado da memória RAM.
@@ -39,16 +146,75 @@ class RAM:
         """
 
         if 0 <= endereco < self.tamanho:
-            self.memoria[endereco] = valor
+            self.contadores.escritas += 1
+            numero, deslocamento = divmod(endereco, TAMANHO_PAGINA)
+            self._pagina(numero)[deslocamento] = valor
         else:
-            self.log(f"Endereço {endereco} inválido na RAM.")
+            self.log("Endereço %d inválido na RAM.", endereco)
+
+    def ler_intervalo(self, inicio : int, quantidade : int) -> array:
+        """
+        Cópia das *quantidade* palavras a partir de *inicio*, página a página, sem contar acessos.
+        Palavras além do fim da memória são lidas como zero.
+        """
+        fim = min(inicio + quantidade, self.tamanho)
+        resultado = array("q")
+        endereco = inicio
+        while endereco < fim:
+            numero, deslocamento = divmod(endereco, TAMANHO_PAGINA)
+            parte = min(TAMANHO_PAGINA - deslocamento, fim - endereco)
+            resultado.extend(self._pagina(numero)[deslocamento:deslocamento + parte])
+            endereco += parte
+        if len(resultado) < quantidade:
+            resultado.extend([0] * (quantidade - len(resultado)))
+        return resultado
+
+    def escrever_intervalo(self, inicio : int, dados : array) -> None:
+        """
+        Escreve *dados* a partir de *inicio*, página a página, sem contar acessos.
+        Palavras além do fim da memória são descartadas.
+        """
+        fim = min(inicio + len(dados), self.tamanho)
+        endereco = inicio
+        while endereco < fim:
+            numero, deslocamento = divmod(endereco, TAMANHO_PAGINA)
+            parte = min(TAMANHO_PAGINA - deslocamento, fim - endereco)
+            self._pagina(numero)[deslocamento:deslocamento + parte] = dados[endereco - inicio:endereco - inicio + parte]
+            endereco += parte
+
+    def ler_bloco(self, inicio : int, quantidade : int) -> array | None:
+        """
+        Lê *quantidade* palavras contíguas a partir de *inicio*, numa única transferência.
+        Palavras além do fim da memória são lidas como zero.
+        Retorna None se o início do bloco for inválido.
+        """
+        if not 0 <= inicio < self.tamanho:
+            self.log("Endereço %d inválido na RAM.", inicio)
+            return None
+
+        self.contadores.leituras += 1
+        return self.ler_intervalo(inicio, quantidade)
+
+    def escrever_bloco(self, inicio : int, dados : array) -> None:
+        """
+        Escreve o bloco *dados* a partir de *inicio*, numa única transferência.
+        Palavras além do fim da memória são descartadas.
+        """
+        if not 0 <= inicio < self.tamanho:
+            self.log("Endereço %d inválido na RAM.", inicio)
+            return
+
+        self.contadores.escritas += 1
+        self.escrever_intervalo(inicio, dados)
 
     def __repr__(self):
         """
         Representação em string da memória RAM.
-        Exibe os endereços e seus respectivos valores.
+        Exibe os endereços e seus respectivos valores (apenas das páginas já criadas).
         """
         repr_str = "[RAM]\n"
-        for endereco, valor in enumerate(self.memoria):
-            repr_str += f"Endereço {endereco}: {valor}\n"
-        return repr_str
\ No newline at end of file
+        for numero in self.paginas_criadas():
+            inicio = numero * TAMANHO_PAGINA
+            for deslocamento, valor in enumerate(self.ler_intervalo(inicio, min(TAMANHO_PAGINA, self.tamanho - inicio))):
+                repr_str += f"Endereço {inicio + deslocamento}: {valor}\n"
+        return repr_str
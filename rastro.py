@@ -0,0 +1,86 @@
+"""
+Leitura e escrita de rastros (traces) de operações do leilão.
+
+Cada linha do arquivo é uma operação, com campos separados por espaço:
+    item <nome> <preco_inicial>
+    comprador <nome>
+    ler <id_comprador> <id_item>
+    lance <id_comprador> <id_item> <valor>
+    encerrar <id_item>
+Linhas vazias e iniciadas por '#' são ignoradas.
+"""
+from typing import Iterable, Iterator, NamedTuple
+import mmap
+import os
+
+class Operacao(NamedTuple):
+    tipo : str # item, comprador, ler, lance ou encerrar
+    args : tuple # argumentos já convertidos (nomes como str, ids e valores como int)
+
+# quantidade de argumentos inteiros esperados por tipo de operação
+ARGUMENTOS_INTEIROS = {"ler": 2, "lance": 3, "encerrar": 1}
+
+
+def interpretar_linha(linha : str) -> Operacao | None:
+    """
+    Converte uma linha do rastro em uma Operacao.
+    Retorna None para linhas vazias ou comentários; lança ValueError se a linha for inválida.
+    """
+    campos = linha.split()
+    if not campos or campos[0].startswith("#"):
+        return None
+
+    tipo = campos[0]
+    if tipo == "item":
+        # o nome pode conter espaços, o preço é sempre o último campo
+        if len(campos) < 3:
+            raise ValueError(f"Operação 'item' incompleta: {linha.strip()}")
+        return Operacao(tipo, (" ".join(campos[1:-1]), int(campos[-1])))
+
+    if tipo == "comprador":
+        if len(campos) < 2:
+            raise ValueError(f"Operação 'comprador' incompleta: {linha.strip()}")
+        return Operacao(tipo, (" ".join(campos[1:]),))
+
+    quantidade = ARGUMENTOS_INTEIROS.get(tipo)
+    if quantidade is None:
+        raise ValueError(f"Operação desconhecida: {tipo}")
+    if len(campos) != quantidade + 1:
+        raise ValueError(f"Operação '{tipo}' espera {quantidade} argumento(s): {linha.strip()}")
+    return Operacao(tipo, tuple(int(campo) for campo in campos[1:]))
+
+
+def formatar_operacao(operacao : Operacao) -> str:
+    """ Converte uma Operacao de volta para uma linha do rastro. """
+    return " ".join([operacao.tipo, *(str(arg) for arg in operacao.args)])
+
+
+def _linhas(caminho : str, usar_mmap : bool) -> Iterator[bytes]:
+    """ Gera as linhas cruas do arquivo, sem carregá-lo inteiro na memória. """
+    with open(caminho, "rb") as arquivo:
+        if usar_mmap and os.fstat(arquivo.fileno()).st_size > 0:
+            with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                yield from iter(mapa.readline, b"")
+        else:
+            yield from arquivo
+
+
+def ler_rastro(caminho : str, usar_mmap : bool = False) -> Iterator[Operacao]:
+    """
+    Gerador que percorre o rastro do *caminho*, uma operação por vez.
+    Com *usar_mmap*, o arquivo é mapeado em memória em vez de lido por buffer.
+    """
+    for numero, linha in enumerate(_linhas(caminho, usar_mmap), start=1):
+        try:
+            operacao = interpretar_linha(linha.decode("utf-8"))
+        except ValueError as erro:
+            raise ValueError(f"{caminho}:{numero}: {erro}") from None
+        if operacao is not None:
+            yield operacao
+
+
+def escrever_rastro(caminho : str, operacoes : Iterable[Operacao]) -> None:
+    """ Grava as *operacoes* no *caminho*, no formato lido por *ler_rastro*. """
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for operacao in operacoes:
+            arquivo.write(formatar_operacao(operacao) + "\n")
@@ -0,0 +1,47 @@
+"""
+Registro (log) da simulação com níveis de verbosidade.
+
+As mensagens são passadas no estilo %, com os argumentos separados,
+e só são formatadas se o nível da mensagem estiver ativo.
+"""
+from colors import color
+import logging
+
+# Níveis de verbosidade, do mais silencioso ao mais detalhado
+SILENCIOSO = 0 # nada é exibido
+RESUMO = 1 # apenas resumos finais e erros
+TRANSICOES = 2 # transições de estado, transações de barramento e eventos do leilão
+COMPLETO = 3 # tudo, inclusive hits e cada operação dos processadores
+
+NIVEIS = {
+    "silencioso": SILENCIOSO,
+    "resumo": RESUMO,
+    "transicoes": TRANSICOES,
+    "completo": COMPLETO,
+}
+
+nivel : int = COMPLETO
+logger = logging.getLogger("moesi")
+
+
+def definir_nivel(novo_nivel : int) -> None:
+    """ Altera o nível de verbosidade global. """
+    global nivel
+    nivel = novo_nivel
+
+
+def ativo(nivel_mensagem : int) -> bool:
+    """ Indica se mensagens do *nivel_mensagem* serão exibidas. """
+    return nivel_mensagem <= nivel
+
+
+def registrar(nivel_mensagem : int, cor : str, msg : str, *args) -> None:
+    """
+    Exibe (colorida) e grava no log a mensagem *msg* % *args*.
+    Se o nível estiver desligado, retorna antes de formatar qualquer texto.
+    """
+    if nivel_mensagem > nivel:
+        return
+    texto = msg % args if args else msg
+    print(color(texto, cor))
+    logger.info(texto)
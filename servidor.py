@@ -0,0 +1,147 @@
+"""
+Servidor TCP (asyncio) do leilão, para muitos clientes simultâneos.
+
+Cada conexão é um comprador, com sua própria cache. O protocolo é de uma
+requisição JSON por linha, respondida também com uma linha JSON:
+    {"op": "ola", "nome": "Ana"}                  -> {"ok": true, "comprador": 0}
+    {"op": "item", "nome": "Vaso", "preco": 100}  -> {"ok": true, "item": 0}
+    {"op": "preco", "item": 0}                    -> {"ok": true, "preco": 100}
+    {"op": "lance", "item": 0, "valor": 150}      -> {"ok": true, "aceito": true}
+    {"op": "encerrar", "item": 0}                 -> {"ok": true, "vencedor": "Ana", "preco": 150}
+    {"op": "estatisticas"}                        -> {"ok": true, "estatisticas": {...}}
+Erros são respondidos com {"ok": false, "erro": "..."}.
+
+As operações no simulador rodam numa única thread auxiliar (executor com um
+trabalhador): o acesso ao barramento fica serializado e o laço de eventos
+continua livre para atender as conexões.
+
+Uso:
+    python servidor.py --porta 8765 --coerencia diretorio
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from configuracao import Configuracao
+from leilao import Leilao, Comprador
+from registro import NIVEIS
+from substituicao import POLITICAS
+from protocolo import PROTOCOLOS
+from carga import PORTA_PADRAO
+import registro
+import estatisticas
+import argparse
+import asyncio
+import json
+
+
+class ServidorLeilao():
+    def __init__(self, leilao : Leilao):
+        """ Atende os clientes do *leilao*, um comprador por conexão. """
+        self.leilao : Leilao = leilao
+        self.executor : ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="barramento")
+        self.conexoes : int = 0
+
+    async def executar(self, funcao, *args):
+        """ Executa *funcao* na thread do simulador, sem bloquear o laço de eventos. """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, funcao, *args)
+
+    def _item(self, requisicao : dict):
+        id_item = requisicao.get("item")
+        if not isinstance(id_item, int) or not 0 <= id_item < len(self.leilao.itens):
+            raise ValueError(f"Item inválido: {id_item}")
+        return self.leilao.itens[id_item]
+
+    def processar(self, comprador : Comprador, requisicao : dict) -> dict:
+        """ Aplica uma *requisicao* do *comprador* no leilão (roda na thread do simulador). """
+        op = requisicao.get("op")
+
+        if op == "ola":
+            comprador.nome = str(requisicao.get("nome", comprador.nome))
+            return {"ok": True, "comprador": comprador.id}
+
+        if op == "item":
+            item = self.leilao.adicionar_item(str(requisicao["nome"]), int(requisicao["preco"]))
+            return {"ok": True, "item": item.id}
+
+        if op == "preco":
+            return {"ok": True, "preco": comprador.verificar_preco(self._item(requisicao))}
+
+        if op == "lance":
+            return {"ok": True, "aceito": comprador.dar_lance(self._item(requisicao), int(requisicao["valor"]))}
+
+        if op == "encerrar":
+            resultado = self.leilao.encerrar_item(self._item(requisicao))
+            if resultado is None:
+                return {"ok": False, "erro": "O leilão desse item já foi encerrado."}
+            vencedor, preco = resultado
+            return {"ok": True, "vencedor": vencedor.nome if vencedor else None, "preco": preco}
+
+        if op == "estatisticas":
+            return {"ok": True, "estatisticas": estatisticas.coletar(self.leilao)}
+
+        raise ValueError(f"Operação desconhecida: {op}")
+
+    def _responder(self, comprador : Comprador, linha : bytes) -> dict:
+        try:
+            requisicao = json.loads(linha)
+            if not isinstance(requisicao, dict):
+                raise ValueError("A requisição deve ser um objeto JSON.")
+            return self.processar(comprador, requisicao)
+        except (ValueError, KeyError, TypeError) as erro:
+            return {"ok": False, "erro": str(erro)}
+
+    async def atender(self, leitor : asyncio.StreamReader, escritor : asyncio.StreamWriter) -> None:
+        """ Atende uma conexão: cria o comprador e responde às requisições até o cliente desconectar. """
+        self.conexoes += 1
+        comprador = await self.executar(self.leilao.adicionar_comprador, f"cliente{self.conexoes}")
+        try:
+            while linha := await leitor.readline():
+                if not linha.strip():
+                    continue
+                resposta = await self.executar(self._responder, comprador, linha)
+                escritor.write(json.dumps(resposta).encode() + b"\n")
+                await escritor.drain()
+        except ConnectionError:
+            pass # cliente desconectou no meio da resposta
+        finally:
+            escritor.close()
+
+    async def servir(self, host : str = "127.0.0.1", porta : int = PORTA_PADRAO) -> None:
+        """ Aceita conexões em *host*:*porta* até o processo ser interrompido. """
+        servidor = await asyncio.start_server(self.atender, host, porta, limit=2 ** 20)
+        enderecos = ", ".join(str(socket.getsockname()) for socket in servidor.sockets)
+        print(f"Servidor do leilão ouvindo em {enderecos}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def ler_argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Servidor do leilão MOESI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--verbosidade", choices=list(NIVEIS), default="silencioso")
+    parser.add_argument("--tamanho-ram", type=int, default=Configuracao.tamanho_ram)
+    parser.add_argument("--tamanho-cache", type=int, default=Configuracao.tamanho_cache)
+    parser.add_argument("--associatividade", type=int, default=None)
+    parser.add_argument("--tamanho-bloco", type=int, default=Configuracao.tamanho_bloco)
+    parser.add_argument("--coerencia", choices=["broadcast", "diretorio"], default=Configuracao.coerencia)
+    parser.add_argument("--politica", choices=list(POLITICAS), default=Configuracao.politica)
+    parser.add_argument("--protocolo", choices=list(PROTOCOLOS), default=Configuracao.protocolo)
+    return parser.parse_args()
+
+
+def main():
+    args = ler_argumentos()
+    registro.definir_nivel(NIVEIS[args.verbosidade])
+    config = Configuracao(tamanho_ram=args.tamanho_ram, tamanho_cache=args.tamanho_cache,
+                          associatividade=args.associatividade, tamanho_bloco=args.tamanho_bloco,
+                          coerencia=args.coerencia, politica=args.politica, protocolo=args.protocolo)
+    try:
+        asyncio.run(ServidorLeilao(Leilao(config)).servir(args.host, args.porta))
+    except KeyboardInterrupt:
+        print("Servidor encerrado.")
+
+if __name__ == "__main__":
+    main()
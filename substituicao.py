@@ -0,0 +1,152 @@
+"""
+Políticas de substituição de linhas dentro de um conjunto da cache.
+
+Cada conjunto possui sua própria instância de política, que acompanha as vias
+(posições 0 .. associatividade-1) e indica qual delas deve ser substituída.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import random
+
+class PoliticaSubstituicao(ABC):
+    def __init__(self, vias : int):
+        self.vias : int = vias
+
+    @abstractmethod
+    def inserir(self, via : int) -> None:
+        """ Uma nova linha foi colocada na *via*. """
+
+    @abstractmethod
+    def acessar(self, via : int) -> None:
+        """ A linha da *via* foi acessada (hit). """
+
+    @abstractmethod
+    def vitima(self) -> int:
+        """ Via que deve ser substituída quando o conjunto está cheio. """
+
+    def exportar(self) -> list[int]:
+        """ Estado interno da política como lista de inteiros (usado pelos checkpoints). """
+        return []
+
+    def importar(self, valores : list[int]) -> None:
+        """ Restaura o estado gerado por *exportar*. """
+
+
+class FIFO(PoliticaSubstituicao):
+    """ Substitui a linha inserida há mais tempo; acessos não alteram a ordem. """
+    def __init__(self, vias : int):
+        super().__init__(vias)
+        self.ordem : OrderedDict[int, None] = OrderedDict()
+
+    def inserir(self, via : int) -> None:
+        self.ordem[via] = None
+        self.ordem.move_to_end(via)
+
+    def acessar(self, via : int) -> None:
+        pass
+
+    def vitima(self) -> int:
+        return next(iter(self.ordem))
+
+    def exportar(self) -> list[int]:
+        return list(self.ordem)
+
+    def importar(self, valores : list[int]) -> None:
+        self.ordem = OrderedDict.fromkeys(valores)
+
+
+class LRU(FIFO):
+    """ LRU verdadeiro em O(1): cada acesso move a via para o fim da ordem. """
+    def acessar(self, via : int) -> None:
+        self.ordem.move_to_end(via)
+
+
+class PseudoLRU(PoliticaSubstituicao):
+    """
+    Tree-PLRU: uma árvore binária de (vias - 1) bits. Cada bit aponta para a
+    metade usada há menos tempo; a vítima é encontrada seguindo os bits a partir da raiz.
+    """
+    def __init__(self, vias : int):
+        validar_vias("plru", vias)
+        super().__init__(vias)
+        self.bits : list[int] = [0] * (vias - 1)
+
+    def acessar(self, via : int) -> None:
+        no, inicio, tamanho = 0, 0, self.vias
+        while tamanho > 1:
+            metade = tamanho // 2
+            if via < inicio + metade:
+                self.bits[no] = 1 # a metade direita passa a ser a menos recente
+                no = 2 * no + 1
+            else:
+                self.bits[no] = 0 # a metade esquerda passa a ser a menos recente
+                no = 2 * no + 2
+                inicio += metade
+            tamanho = metade
+
+    def inserir(self, via : int) -> None:
+        self.acessar(via)
+
+    def vitima(self) -> int:
+        no, inicio, tamanho = 0, 0, self.vias
+        while tamanho > 1:
+            metade = tamanho // 2
+            if self.bits[no] == 0:
+                no = 2 * no + 1
+            else:
+                no = 2 * no + 2
+                inicio += metade
+            tamanho = metade
+        return inicio
+
+    def exportar(self) -> list[int]:
+        return list(self.bits)
+
+    def importar(self, valores : list[int]) -> None:
+        self.bits = list(valores)
+
+
+class Aleatoria(PoliticaSubstituicao):
+    """ Vítima sorteada; a semente é fixa por cache e conjunto, para execuções reproduzíveis. """
+    def __init__(self, vias : int, semente : str = ""):
+        super().__init__(vias)
+        self.rng : random.Random = random.Random(semente)
+
+    def inserir(self, via : int) -> None:
+        pass
+
+    def acessar(self, via : int) -> None:
+        pass
+
+    def vitima(self) -> int:
+        return self.rng.randrange(self.vias)
+
+    def exportar(self) -> list[int]:
+        versao, estado, _ = self.rng.getstate()
+        return [versao, *estado]
+
+    def importar(self, valores : list[int]) -> None:
+        self.rng.setstate((valores[0], tuple(valores[1:]), None))
+
+
+POLITICAS = {
+    "fifo": FIFO,
+    "lru": LRU,
+    "plru": PseudoLRU,
+    "aleatoria": Aleatoria,
+}
+
+
+def validar_vias(nome : str, vias : int) -> None:
+    """ Confere se a política *nome* aceita conjuntos com *vias* vias (a PLRU exige potência de 2). """
+    if nome == "plru" and (vias <= 0 or vias & (vias - 1)):
+        raise ValueError(f"PLRU exige associatividade potência de 2, recebido {vias}.")
+
+
+def criar_politica(nome : str, vias : int, semente : str = "") -> PoliticaSubstituicao:
+    """ Instancia a política *nome* para um conjunto com *vias* vias. """
+    if nome not in POLITICAS:
+        raise ValueError(f"Política de substituição desconhecida: {nome}")
+    if nome == "aleatoria":
+        return Aleatoria(vias, semente)
+    return POLITICAS[nome](vias)
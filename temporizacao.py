@@ -0,0 +1,61 @@
+"""
+Modelo de temporização em ciclos.
+
+Cada evento de memória cobra um custo configurável (Latencias) do relógio
+simulado, atribuído ao processador que iniciou a operação. O total do relógio
+é a soma dos ciclos de todos os processadores mais os eventos sem processador
+(como o cadastro de itens direto na RAM).
+"""
+from dataclasses import dataclass, fields
+
+
+@dataclass
+class Latencias:
+    hit : int = 1 # consulta à cache (todo acesso paga, mesmo os misses)
+    barramento : int = 10 # arbitragem e snoop de uma transação no barramento
+    transferencia : int = 20 # bloco fornecido por outra cache (cache-to-cache)
+    invalidacao : int = 5 # cada cópia invalidada em outra cache
+    ram_leitura : int = 100 # leitura de um bloco na RAM
+    ram_escrita : int = 100 # escrita direta na RAM (fora das caches)
+    write_back : int = 100 # escrita de uma linha suja de volta na RAM
+    llc : int = 30 # acesso à cache compartilhada de último nível (hit, ou consulta antes da RAM)
+    entre_clusters : int = 40 # travessia da camada de coerência entre clusters (transação remota)
+
+
+def interpretar_latencias(pares : list[str]) -> Latencias:
+    """ Cria as latências a partir de pares 'nome=ciclos'; os nomes omitidos mantêm o padrão. """
+    nomes = {campo.name for campo in fields(Latencias)}
+    valores = {}
+    for par in pares:
+        nome, _, ciclos = par.partition("=")
+        if nome not in nomes:
+            raise ValueError(f"Latência desconhecida: {nome} (opções: {', '.join(sorted(nomes))})")
+        valores[nome] = int(ciclos)
+    return Latencias(**valores)
+
+
+class Relogio():
+    def __init__(self, latencias : Latencias | None = None):
+        """ Relógio global da simulação, com os ciclos acumulados por processador. """
+        self.latencias : Latencias = latencias if latencias is not None else Latencias()
+        self.ciclos_por_processador : dict[int, int] = {}
+        self.ciclos_sem_processador : int = 0
+
+    def cobrar(self, id_processador : int | None, ciclos : int) -> None:
+        """ Soma *ciclos* ao relógio, na conta do *id_processador* (None = evento externo). """
+        if id_processador is None:
+            self.ciclos_sem_processador += ciclos
+        else:
+            self.ciclos_por_processador[id_processador] = self.ciclos_por_processador.get(id_processador, 0) + ciclos
+
+    @property
+    def ciclos(self) -> int:
+        """ Total de ciclos simulados. """
+        return sum(self.ciclos_por_processador.values()) + self.ciclos_sem_processador
+
+    def ciclos_de(self, id_processador : int) -> int:
+        return self.ciclos_por_processador.get(id_processador, 0)
+
+    def amat(self, id_processador : int, acessos : int) -> float:
+        """ Tempo médio de acesso à memória (AMAT) do processador, em ciclos por acesso. """
+        return self.ciclos_de(id_processador) / acessos if acessos else 0.0
@@ -0,0 +1,90 @@
+"""
+Configuração comum dos testes: os módulos do simulador ficam na raiz do repositório,
+e os motores rodam em silêncio. O rastro fixo é pequeno o bastante para comparar os
+motores alternativos com o motor de objetos (MotorRastro) em poucos segundos.
+"""
+from __future__ import annotations
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import registro
+from configuracao import Configuracao
+from leilao import Leilao
+from moesi import Estado
+from motor import MotorRastro, Resumo
+from rastro import Operacao
+
+registro.definir_nivel(registro.SILENCIOSO)
+
+ITENS = 12
+COMPRADORES = 6
+
+
+def gerar_rastro(semente : int, operacoes : int = 1500) -> list[Operacao]:
+    """ Rastro fixo: itens e compradores, consultas e lances misturados, e o encerramento de todos os itens. """
+    rng = random.Random(semente)
+    rastro = [Operacao("item", (f"item{id_item}", rng.randint(1, 50))) for id_item in range(ITENS)]
+    rastro += [Operacao("comprador", (f"comprador{id_comprador}",)) for id_comprador in range(COMPRADORES)]
+    for _ in range(operacoes):
+        if rng.random() < 0.35:
+            rastro.append(Operacao("ler", (rng.randrange(COMPRADORES), rng.randrange(ITENS))))
+        else:
+            rastro.append(Operacao("lance", (rng.randrange(COMPRADORES), rng.randrange(ITENS), rng.randint(1, 400))))
+    rastro += [Operacao("encerrar", (id_item,)) for id_item in range(ITENS)]
+    return rastro
+
+
+def vencedores_esperados(rastro : list[Operacao]) -> dict[int, tuple[str | None, int]]:
+    """ Oráculo sem caches: o maior lance de cada item vence, e o preço inicial fica se nenhum for aceito. """
+    precos : list[int] = []
+    vencedores : list[str | None] = []
+    nomes : list[str] = []
+    encerrados : dict[int, tuple[str | None, int]] = {}
+    for tipo, argumentos in rastro:
+        if tipo == "item":
+            precos.append(argumentos[1])
+            vencedores.append(None)
+        elif tipo == "comprador":
+            nomes.append(argumentos[0])
+        elif tipo == "lance":
+            id_comprador, id_item, valor = argumentos
+            if id_item not in encerrados and valor > precos[id_item]:
+                precos[id_item], vencedores[id_item] = valor, nomes[id_comprador]
+        elif tipo == "encerrar" and argumentos[0] not in encerrados:
+            encerrados[argumentos[0]] = (vencedores[argumentos[0]], precos[argumentos[0]])
+    return encerrados
+
+
+def executar_objetos(config : Configuracao, rastro : list[Operacao]) -> tuple[Leilao, Resumo]:
+    """ Referência: o rastro aplicado pelo motor de objetos. """
+    leilao = Leilao(config)
+    return leilao, MotorRastro(leilao).executar(rastro)
+
+
+def linhas_validas(leilao : Leilao) -> dict[int, dict[int, Estado]]:
+    """ Endereço inicial do bloco -> {id da cache: estado} das cópias válidas nas caches privadas. """
+    copias : dict[int, dict[int, Estado]] = {}
+    for comprador in leilao.compradores:
+        for conjunto in comprador.cache.conjuntos:
+            for linha in conjunto.linhas.values():
+                if linha.estado != Estado.INVALID:
+                    copias.setdefault(linha.inicio, {})[comprador.id] = linha.estado
+    return copias
+
+
+def conferir_coerencia(leilao : Leilao) -> None:
+    """ Um único dono (M, O, E ou F) por bloco, e nenhuma outra cópia válida ao lado de M ou E. """
+    donos = leilao.barramento.protocolo.donos
+    for inicio, estados in linhas_validas(leilao).items():
+        assert sum(estado in donos for estado in estados.values()) <= 1, (inicio, estados)
+        if Estado.MODIFIED in estados.values() or Estado.EXCLUSIVE in estados.values():
+            assert len(estados) == 1, (inicio, estados)
+
+
+@pytest.fixture
+def rastro() -> list[Operacao]:
+    return gerar_rastro(7)
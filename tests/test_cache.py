@@ -0,0 +1,39 @@
+import pytest
+import estatisticas
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+from conftest import executar_objetos, vencedores_esperados, conferir_coerencia
+
+GEOMETRIAS = [(8, 2), (4, 1), (4, None), (16, 4)]
+
+# Rastro fixo (semente 7) numa cache de 8 linhas, 2 vias, blocos de 2 palavras e LRU
+BARRAMENTO_DOURADO = {
+    "bus_rd": 137, "bus_rdx": 0, "bus_upgr": 23, "bus_lance": 269, "transacoes_economizadas": 23,
+    "invalidacoes": 127, "invalidacoes_falso_compartilhamento": 31, "transferencias_cache": 394,
+    "leituras_ram": 12, "write_backs": 0, "bus_prebusca": 0, "lances_recusados": 244,
+}
+CICLOS_DOURADOS = 16705
+
+
+@pytest.mark.parametrize("tamanho, associatividade", GEOMETRIAS)
+@pytest.mark.parametrize("politica", ["fifo", "lru", "plru", "aleatoria"])
+def test_vencedores_e_coerencia_em_cada_geometria(rastro, tamanho, associatividade, politica):
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=tamanho, associatividade=associatividade, politica=politica))
+    motor = MotorRastro(leilao)
+    for operacao in rastro:
+        motor.aplicar(operacao)
+        conferir_coerencia(leilao)
+    assert motor.resumo.vencedores == vencedores_esperados(rastro)
+
+
+def test_rastro_dourado_da_cache_associativa(rastro):
+    config = Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=2, politica="lru")
+    leilao, resumo = executar_objetos(config, rastro)
+    assert estatisticas.coletar(leilao)["barramento"] == BARRAMENTO_DOURADO
+    assert resumo.ciclos == CICLOS_DOURADOS
+
+
+def test_associatividade_invalida_e_recusada():
+    with pytest.raises(ValueError):
+        Configuracao(tamanho_cache=8, associatividade=3)
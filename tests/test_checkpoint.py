@@ -0,0 +1,54 @@
+import itertools
+import json
+import pytest
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+import checkpoint
+import estatisticas
+from conftest import executar_objetos
+
+
+def estado_das_caches(leilao : Leilao) -> list:
+    return [(linha.via, linha.tag, linha.inicio, linha.estado, linha.dados.tolist(), linha.autores.tolist(),
+             linha.acessados)
+            for comprador in leilao.compradores for conjunto in comprador.cache.conjuntos
+            for linha in conjunto.vias if linha.tag is not None]
+
+
+@pytest.mark.parametrize("config", [
+    Configuracao(semente_ram=11),
+    Configuracao(semente_ram=11, tamanho_cache=12, associatividade=3, tamanho_bloco=2, politica="lru"),
+    Configuracao(semente_ram=11, tamanho_cache=16, associatividade=4, tamanho_bloco=4, coerencia="diretorio",
+                 politica="aleatoria", protocolo="mesif"),
+    Configuracao(semente_ram=11, tamanho_cache=8, associatividade=4, tamanho_bloco=70, politica="plru"),
+    Configuracao(semente_ram=11, tamanho_cache=4, tamanho_llc=8, inclusao_llc="inclusiva", clusters=2),
+    Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, buffer_escrita=4, prebusca="passo"),
+])
+def test_restaurar_continua_igual_a_execucao_sem_checkpoint(tmp_path, rastro, config):
+    leilao, resumo = executar_objetos(config, rastro)
+
+    caminho = str(tmp_path / "estado.ckp")
+    motor = MotorRastro(Leilao(config))
+    checkpoint.executar_com_checkpoints(motor, itertools.islice(rastro, 900), caminho, 400)
+    restaurado = checkpoint.restaurar(caminho)
+    assert restaurado.resumo.operacoes == 800
+    continuado = restaurado.executar(rastro[800:])
+
+    assert continuado.vencedores == resumo.vencedores
+    assert (continuado.por_tipo, continuado.lances_aceitos, continuado.ciclos) == \
+           (resumo.por_tipo, resumo.lances_aceitos, resumo.ciclos)
+    assert json.dumps(estatisticas.coletar(restaurado.leilao), sort_keys=True) == \
+           json.dumps(estatisticas.coletar(leilao), sort_keys=True)
+    assert estado_das_caches(restaurado.leilao) == estado_das_caches(leilao)
+    tamanho = config.tamanho_ram
+    assert restaurado.leilao.ram.ler_intervalo(0, tamanho) == leilao.ram.ler_intervalo(0, tamanho)
+
+
+def test_checkpoint_de_outra_versao_e_recusado(tmp_path):
+    caminho = str(tmp_path / "estado.ckp")
+    checkpoint.salvar(Leilao(Configuracao(semente_ram=11)), caminho)
+    with open(caminho, "r+b") as arquivo:
+        arquivo.write(checkpoint.CABECALHO.pack(checkpoint.MAGICO, checkpoint.VERSAO - 1))
+    with pytest.raises(ValueError):
+        checkpoint.carregar(caminho)
@@ -0,0 +1,40 @@
+import random
+import pytest
+from configuracao import Configuracao
+from concorrencia import MotorConcorrente
+from leilao import Leilao
+from rastro import Operacao
+from conftest import ITENS, COMPRADORES, executar_objetos, conferir_coerencia
+
+
+def rastro_de_lances_distintos(semente : int, lances : int = 3000) -> list[Operacao]:
+    """ Lances com valores distintos: o vencedor de cada item não depende da ordem entre as threads. """
+    rng = random.Random(semente)
+    valores = rng.sample(range(20, 1_000_000), lances)
+    rastro = [Operacao("item", (f"item{id_item}", 10)) for id_item in range(ITENS)]
+    rastro += [Operacao("comprador", (f"comprador{id_comprador}",)) for id_comprador in range(COMPRADORES)]
+    for valor in valores:
+        if rng.random() < 0.3:
+            rastro.append(Operacao("ler", (rng.randrange(COMPRADORES), rng.randrange(ITENS))))
+        rastro.append(Operacao("lance", (rng.randrange(COMPRADORES), rng.randrange(ITENS), valor)))
+    return rastro
+
+
+@pytest.mark.parametrize("config", [
+    Configuracao(semente_ram=11, tamanho_cache=16, concorrente=True),
+    Configuracao(semente_ram=11, tamanho_cache=16, associatividade=4, tamanho_bloco=2, coerencia="diretorio",
+                 politica="lru", concorrente=True),
+])
+def test_motor_concorrente_chega_aos_mesmos_vencedores(config):
+    rastro = rastro_de_lances_distintos(3)
+    encerramentos = [Operacao("encerrar", (id_item,)) for id_item in range(ITENS)]
+    _, resumo = executar_objetos(config, rastro + encerramentos)
+
+    leilao = Leilao(config)
+    motor = MotorConcorrente(leilao)
+    motor.executar(iter(rastro))
+    conferir_coerencia(leilao)
+    concorrente = motor.executar(encerramentos)
+
+    assert concorrente.vencedores == resumo.vencedores
+    assert concorrente.lances_aceitos + concorrente.lances_rejeitados == resumo.lances_aceitos + resumo.lances_rejeitados
@@ -0,0 +1,28 @@
+import estatisticas
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+from conftest import executar_objetos, vencedores_esperados, conferir_coerencia, linhas_validas
+from test_cache import BARRAMENTO_DOURADO, CICLOS_DOURADOS
+
+
+def test_compartilhadores_cobrem_todas_as_copias_validas(rastro):
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=2, coerencia="diretorio"))
+    motor = MotorRastro(leilao)
+    compartilhadores = leilao.barramento.diretorio.compartilhadores
+    for operacao in rastro:
+        motor.aplicar(operacao)
+        conferir_coerencia(leilao)
+        for inicio, estados in linhas_validas(leilao).items():
+            assert set(estados) <= compartilhadores.get(inicio, set()), (inicio, estados)
+    assert motor.resumo.vencedores == vencedores_esperados(rastro)
+
+
+def test_diretorio_reproduz_o_broadcast(rastro):
+    """ O diretório só poupa snoops: as linhas, os contadores do barramento e os ciclos são os mesmos. """
+    geometria = dict(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=2)
+    difusao, resumo_difusao = executar_objetos(Configuracao(**geometria), rastro)
+    diretorio, resumo_diretorio = executar_objetos(Configuracao(coerencia="diretorio", **geometria), rastro)
+    assert linhas_validas(diretorio) == linhas_validas(difusao)
+    assert estatisticas.coletar(diretorio)["barramento"] == estatisticas.coletar(difusao)["barramento"] == BARRAMENTO_DOURADO
+    assert resumo_diretorio.ciclos == resumo_difusao.ciclos == CICLOS_DOURADOS
@@ -0,0 +1,35 @@
+import pytest
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+from conftest import ITENS, executar_objetos, vencedores_esperados, linhas_validas
+
+# Rastro fixo (semente 7), cache de 8 linhas, 2 vias e blocos de 2 palavras: início do bloco -> cache dona
+DONOS_DOURADOS = [(0, 3), (2, 5), (4, 1), (6, 4), (8, 2), (10, 2)]
+
+
+def donos_por_varredura(leilao : Leilao) -> dict[int, int]:
+    sujos = leilao.barramento.protocolo.sujos
+    return {inicio: id_cache for inicio, estados in linhas_validas(leilao).items()
+            for id_cache, estado in estados.items() if estado in sujos}
+
+
+@pytest.mark.parametrize("protocolo", ["moesi", "mesi", "msi", "mesif"])
+@pytest.mark.parametrize("tamanho_bloco", [1, 4])
+def test_indice_igual_a_varredura_das_caches(rastro, protocolo, tamanho_bloco):
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=tamanho_bloco,
+                                 protocolo=protocolo))
+    motor = MotorRastro(leilao)
+    for operacao in rastro:
+        motor.aplicar(operacao)
+        assert leilao.barramento.indice_donos == donos_por_varredura(leilao)
+
+
+def test_encerrar_itens_de_uma_vez(rastro):
+    leilao, _ = executar_objetos(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=2),
+                                 rastro[:-ITENS])
+    assert sorted(leilao.barramento.indice_donos.items()) == DONOS_DOURADOS
+    resultados = leilao.encerrar_itens()
+    vencedores = {id_item: (vencedor.nome if vencedor else None, preco) for id_item, (vencedor, preco) in resultados.items()}
+    assert vencedores == vencedores_esperados(rastro)
+    assert leilao.encerrar_itens() == {}
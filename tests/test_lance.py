@@ -0,0 +1,38 @@
+from configuracao import Configuracao
+from leilao import Leilao
+from moesi import Estado
+from conftest import executar_objetos
+
+
+def test_lance_recusado_custa_uma_transacao_e_nao_traz_o_bloco():
+    leilao = Leilao(Configuracao(semente_ram=11))
+    item = leilao.adicionar_item("item", 10)
+    primeiro, segundo, terceiro = (leilao.adicionar_comprador(nome) for nome in ("a", "b", "c"))
+    contadores = leilao.barramento.contadores
+
+    assert primeiro.dar_lance(item, 100)
+    assert (contadores.bus_lance, contadores.lances_recusados, contadores.transacoes_economizadas) == (1, 0, 0)
+    assert primeiro.cache.buscar_linha(item.id).estado == Estado.MODIFIED
+
+    # Cada lance baixo é um miss: paga o BUS_LANCE e a linha continua fora da cache
+    assert not segundo.dar_lance(item, 50)
+    assert not segundo.dar_lance(item, 60)
+    assert (contadores.bus_lance, contadores.lances_recusados) == (3, 2)
+    assert segundo.cache.buscar_linha(item.id) is None
+    assert primeiro.cache.buscar_linha(item.id).estado == Estado.MODIFIED
+
+    # Aceito com outra cópia: a leitura + escrita teriam custado uma transação a mais
+    assert terceiro.dar_lance(item, 200)
+    assert (contadores.bus_lance, contadores.lances_recusados, contadores.transacoes_economizadas) == (4, 2, 1)
+    assert primeiro.cache.buscar_linha(item.id).estado == Estado.INVALID
+    vencedor, preco = leilao.descobrir_vencedor(item)
+    assert (vencedor.nome, preco) == ("c", 200)
+
+
+def test_lances_recusados_no_resumo(rastro):
+    config = Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2)
+    leilao, resumo = executar_objetos(config, rastro)
+    contadores = leilao.barramento.contadores
+    assert 0 < contadores.lances_recusados <= resumo.lances_rejeitados
+    assert contadores.lances_recusados + contadores.transacoes_economizadas <= contadores.bus_lance
+
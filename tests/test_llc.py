@@ -0,0 +1,38 @@
+import pytest
+import estatisticas
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+from conftest import executar_objetos, vencedores_esperados, conferir_coerencia, linhas_validas
+
+# Rastro fixo (semente 7), caches privadas de 4 linhas e LLC de 8 linhas com 2 vias
+LLC_DOURADA = {
+    "inclusiva": {"acertos": 639, "faltas": 499, "write_backs_absorvidos": 46, "substituicoes": 491,
+                  "invalidacoes_inclusao": 469, "write_backs_ram": 46, "acessos_ram_evitados": 639},
+    "exclusiva": {"acertos": 360, "faltas": 244, "write_backs_absorvidos": 36, "substituicoes": 94,
+                  "invalidacoes_inclusao": 0, "write_backs_ram": 36, "acessos_ram_evitados": 360},
+    "nine": {"acertos": 433, "faltas": 171, "write_backs_absorvidos": 36, "substituicoes": 188,
+             "invalidacoes_inclusao": 0, "write_backs_ram": 33, "acessos_ram_evitados": 436},
+}
+
+
+@pytest.mark.parametrize("inclusao", list(LLC_DOURADA))
+def test_vencedores_com_llc(rastro, inclusao):
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=4, tamanho_llc=8, associatividade_llc=2,
+                                 tamanho_bloco=2, inclusao_llc=inclusao))
+    motor = MotorRastro(leilao)
+    llc = leilao.barramento.llc
+    for operacao in rastro:
+        motor.aplicar(operacao)
+        conferir_coerencia(leilao)
+        if inclusao == "inclusiva":
+            assert all(llc.buscar_linha(inicio) is not None for inicio in linhas_validas(leilao))
+    assert motor.resumo.vencedores == vencedores_esperados(rastro)
+
+
+@pytest.mark.parametrize("inclusao", list(LLC_DOURADA))
+def test_rastro_dourado_da_llc(rastro, inclusao):
+    leilao, _ = executar_objetos(Configuracao(semente_ram=11, tamanho_cache=4, tamanho_llc=8, associatividade_llc=2,
+                                              inclusao_llc=inclusao), rastro)
+    contadores = estatisticas.coletar(leilao)["llc"]
+    assert {chave: contadores[chave] for chave in LLC_DOURADA[inclusao]} == LLC_DOURADA[inclusao]
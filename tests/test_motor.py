@@ -0,0 +1,26 @@
+from rastro import Operacao, escrever_rastro, ler_rastro
+from configuracao import Configuracao
+from conftest import executar_objetos, vencedores_esperados, ITENS, COMPRADORES
+
+
+def test_rastro_gravado_e_lido_de_volta(tmp_path, rastro):
+    caminho = str(tmp_path / "rastro.txt")
+    escrever_rastro(caminho, rastro)
+    assert list(ler_rastro(caminho)) == rastro
+    assert list(ler_rastro(caminho, usar_mmap=True)) == rastro
+
+
+def test_resumo_do_motor(rastro):
+    _, resumo = executar_objetos(Configuracao(semente_ram=11), rastro)
+    lances = sum(tipo == "lance" for tipo, _ in rastro)
+    assert resumo.operacoes == len(rastro)
+    assert resumo.por_tipo["item"] == ITENS and resumo.por_tipo["comprador"] == COMPRADORES
+    assert resumo.lances_aceitos + resumo.lances_rejeitados == lances
+    assert resumo.vencedores == vencedores_esperados(rastro)
+
+
+def test_operacoes_invalidas_sao_contadas_e_ignoradas(rastro):
+    invalidas = [Operacao("ler", (COMPRADORES, 0)), Operacao("lance", (0, ITENS + 5, 10)), Operacao("encerrar", (-1,))]
+    _, resumo = executar_objetos(Configuracao(semente_ram=11), rastro[:-ITENS] + invalidas + rastro[-ITENS:])
+    assert resumo.invalidas == len(invalidas)
+    assert resumo.vencedores == vencedores_esperados(rastro)
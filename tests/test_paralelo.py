@@ -0,0 +1,26 @@
+import json
+import pytest
+from configuracao import Configuracao
+from paralelo import executar_paralelo
+import estatisticas
+from conftest import executar_objetos
+
+
+@pytest.mark.parametrize("config", [
+    Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2),
+    Configuracao(semente_ram=11, tamanho_cache=16, associatividade=4, tamanho_bloco=2, coerencia="diretorio",
+                 politica="lru", protocolo="mesi"),
+])
+@pytest.mark.parametrize("fragmentos", [1, 2, 4])
+def test_execucao_paralela_igual_a_de_um_processo(rastro, config, fragmentos):
+    leilao, resumo = executar_objetos(config, rastro)
+    resultado = executar_paralelo(iter(rastro), config, fragmentos, coletar_ram=True)
+
+    assert resultado.resumo.vencedores == resumo.vencedores
+    assert resultado.resumo.por_tipo == resumo.por_tipo
+    assert (resultado.resumo.lances_aceitos, resultado.resumo.lances_rejeitados) == \
+           (resumo.lances_aceitos, resumo.lances_rejeitados)
+    assert json.dumps(resultado.estatisticas, sort_keys=True) == \
+           json.dumps(estatisticas.coletar(leilao), sort_keys=True)
+    tamanho = config.tamanho_ram
+    assert resultado.ram.ler_intervalo(0, tamanho) == leilao.ram.ler_intervalo(0, tamanho)
@@ -0,0 +1,61 @@
+import pytest
+import estatisticas
+from configuracao import Configuracao
+from leilao import Leilao
+from motor import MotorRastro
+from protocolo import PROTOCOLOS, Protocolo
+from conftest import executar_objetos, vencedores_esperados, conferir_coerencia, linhas_validas
+
+# Rastro fixo (semente 7) numa cache de 8 linhas e 2 vias: contadores comuns a todos os protocolos...
+BARRAMENTO_COMUM = {
+    "bus_rd": 239, "bus_rdx": 0, "bus_upgr": 15, "bus_lance": 426, "transacoes_economizadas": 27,
+    "invalidacoes": 98, "invalidacoes_falso_compartilhamento": 0, "bus_prebusca": 0, "lances_recusados": 393,
+}
+# ... e os que mudam: (transferencias_cache, leituras_ram, write_backs, ciclos)
+DOURADOS = {
+    "moesi": (471, 194, 17, 40510),
+    "mesi": (289, 376, 43, 57670),
+    "msi": (100, 565, 43, 72790),
+    "mesif": (273, 392, 43, 58950),
+}
+
+
+@pytest.mark.parametrize("protocolo", PROTOCOLOS)
+def test_vencedores_e_estados_permitidos(rastro, protocolo):
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, tamanho_bloco=2, protocolo=protocolo))
+    motor = MotorRastro(leilao)
+    permitidos = set(leilao.barramento.protocolo.estados)
+    for operacao in rastro:
+        motor.aplicar(operacao)
+        conferir_coerencia(leilao)
+        for estados in linhas_validas(leilao).values():
+            assert set(estados.values()) <= permitidos
+    assert motor.resumo.vencedores == vencedores_esperados(rastro)
+
+
+@pytest.mark.parametrize("protocolo", PROTOCOLOS)
+def test_rastro_dourado_de_cada_protocolo(rastro, protocolo):
+    leilao, resumo = executar_objetos(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2,
+                                                   protocolo=protocolo), rastro)
+    barramento = estatisticas.coletar(leilao)["barramento"]
+    assert {chave: barramento[chave] for chave in BARRAMENTO_COMUM} == BARRAMENTO_COMUM
+    assert (barramento["transferencias_cache"], barramento["leituras_ram"], barramento["write_backs"],
+            resumo.ciclos) == DOURADOS[protocolo]
+
+
+@pytest.mark.parametrize("protocolo", PROTOCOLOS)
+def test_vencedor_com_a_linha_substituida(protocolo):
+    """ O autor gravado no write-back vence, mesmo sem cópia suja do lance em cache alguma. """
+    leilao = Leilao(Configuracao(semente_ram=11, tamanho_cache=1, protocolo=protocolo))
+    item, outro = leilao.adicionar_item("item", 10), leilao.adicionar_item("outro", 10)
+    comprador = leilao.adicionar_comprador("a")
+    assert comprador.dar_lance(item, 100)
+    comprador.verificar_preco(outro)
+    assert comprador.cache.buscar_linha(item.id) is None
+    vencedor, preco = leilao.descobrir_vencedor(item)
+    assert (vencedor.nome, preco) == ("a", 100)
+
+
+def test_protocolo_desconhecido_e_recusado():
+    with pytest.raises(ValueError):
+        Protocolo("dragon")
@@ -0,0 +1,41 @@
+import pytest
+import estatisticas
+from configuracao import Configuracao
+from topologia import Topologia
+from conftest import executar_objetos, vencedores_esperados, linhas_validas
+
+# Rastro fixo (semente 7) em 2 clusters, caches de 8 linhas e 2 vias
+CLUSTERS_DOURADOS = {
+    "0": {"transacoes": 333, "transacoes_remotas": 194, "transferencias_remotas": 30, "invalidacoes_remotas": 33,
+          "snoops_recebidos": 241, "transacoes_locais": 139},
+    "1": {"transacoes": 347, "transacoes_remotas": 241, "transferencias_remotas": 39, "invalidacoes_remotas": 24,
+          "snoops_recebidos": 194, "transacoes_locais": 106},
+}
+
+
+@pytest.mark.parametrize("clusters", [2, 3])
+@pytest.mark.parametrize("coerencia", ["broadcast", "diretorio"])
+def test_clusters_reproduzem_o_barramento_unico(rastro, clusters, coerencia):
+    """ Os clusters só separam o tráfego local do remoto: linhas, contadores e vencedores não mudam. """
+    geometria = dict(semente_ram=11, tamanho_cache=8, associatividade=2, coerencia=coerencia)
+    unico, _ = executar_objetos(Configuracao(**geometria), rastro)
+    agrupado, resumo = executar_objetos(Configuracao(clusters=clusters, **geometria), rastro)
+    assert resumo.vencedores == vencedores_esperados(rastro)
+    assert linhas_validas(agrupado) == linhas_validas(unico)
+    dados = estatisticas.coletar(agrupado)
+    barramento = dados["barramento"]
+    assert barramento == estatisticas.coletar(unico)["barramento"]
+    transacoes = sum(cluster["transacoes"] for cluster in dados["clusters"].values())
+    assert transacoes == barramento["bus_rd"] + barramento["bus_rdx"] + barramento["bus_upgr"] + barramento["bus_lance"]
+
+
+def test_rastro_dourado_dos_clusters(rastro):
+    leilao, _ = executar_objetos(Configuracao(semente_ram=11, tamanho_cache=8, associatividade=2, clusters=2), rastro)
+    clusters = estatisticas.coletar(leilao)["clusters"]
+    assert {id_cluster: {chave: contadores[chave] for chave in CLUSTERS_DOURADOS[id_cluster]}
+            for id_cluster, contadores in clusters.items()} == CLUSTERS_DOURADOS
+
+
+def test_numero_de_clusters_invalido():
+    with pytest.raises(ValueError):
+        Topologia(0)
@@ -0,0 +1,21 @@
+import pytest
+from configuracao import Configuracao
+from rastro import escrever_rastro
+
+pytest.importorskip("numpy")
+from vetorial import validar
+
+
+@pytest.mark.parametrize("protocolo", ["moesi", "mesi", "msi", "mesif"])
+@pytest.mark.parametrize("tamanho_cache, associatividade, tamanho_bloco, coerencia", [
+    (4, None, 1, "broadcast"),
+    (8, 2, 2, "diretorio"),
+    (8, 4, 4, "broadcast"),
+])
+def test_motor_vetorial_igual_ao_de_objetos(tmp_path, rastro, protocolo, tamanho_cache, associatividade,
+                                             tamanho_bloco, coerencia):
+    caminho = str(tmp_path / "rastro.txt")
+    escrever_rastro(caminho, rastro)
+    config = Configuracao(semente_ram=11, tamanho_cache=tamanho_cache, associatividade=associatividade,
+                          tamanho_bloco=tamanho_bloco, coerencia=coerencia, politica="lru", protocolo=protocolo)
+    assert validar(caminho, config) == []
@@ -0,0 +1,125 @@
+"""
+Topologia em clusters: grupos de caches em barramentos locais, ligados por uma
+camada de coerência entre clusters.
+
+Uma transação observa primeiro as caches do cluster da requisitante (barramento
+local) e só atravessa para os outros clusters (transação remota) quando precisa:
+na leitura, se nenhuma cache local fornece o bloco; na escrita, se outro cluster
+tem cópias a invalidar. Sem diretório, a camada entre clusters é um filtro de
+presença por bloco (os clusters que podem ter cópias), conservador: substituições
+não o atualizam, e um cluster consultado sem cópia válida sai do filtro. Com
+diretório, as compartilhadoras registradas nele já dizem quais caches consultar.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator
+from moesi import Estado
+from estatisticas import ContadoresCluster
+
+if TYPE_CHECKING:
+    from barramento import Barramento
+    from cache import Cache
+
+
+class Topologia():
+    def __init__(self, clusters : int, compradores_por_cluster : int = 0):
+        """
+        Inicializa *clusters* barramentos locais.
+        As caches são distribuídas em rodízio (um comprador em cada cluster) ou, com
+        *compradores_por_cluster*, em grupos de compradores consecutivos.
+        """
+        if clusters < 1:
+            raise ValueError(f"Número de clusters inválido: {clusters}")
+        if compradores_por_cluster < 0:
+            raise ValueError(f"Compradores por cluster inválido: {compradores_por_cluster}")
+        self.clusters : int = clusters
+        self.compradores_por_cluster : int = compradores_por_cluster
+        self.cluster_de : dict[int, int] = {} # id da cache -> cluster
+        self.membros : list[list[Cache]] = [[] for _ in range(clusters)]
+        self.presenca : dict[int, set[int]] = {} # início do bloco -> clusters que podem ter cópias (sem diretório)
+        self.contadores : list[ContadoresCluster] = [ContadoresCluster() for _ in range(clusters)]
+
+    def posicionar(self, id_cache : int) -> int:
+        """ Cluster padrão da cache *id_cache*, pela regra de distribuição. """
+        if self.compradores_por_cluster:
+            return id_cache // self.compradores_por_cluster % self.clusters
+        return id_cache % self.clusters
+
+    def conectar(self, cache : Cache, cluster : int | None = None) -> None:
+        """ Liga a *cache* ao barramento local do *cluster* (o padrão da distribuição, se omitido). """
+        if cluster is None:
+            cluster = self.posicionar(cache.id)
+        if not 0 <= cluster < self.clusters:
+            raise ValueError(f"Cluster {cluster} inválido (existem {self.clusters}).")
+        self.cluster_de[cache.id] = cluster
+        self.membros[cluster].append(cache)
+
+    def grupos(self, barramento : Barramento, inicio : int, id_requisitante : int | None,
+               leitura : bool) -> Iterator[list[Cache]]:
+        """
+        Caches que observam a transação do bloco em *inicio*, em até dois grupos: as do cluster
+        da requisitante e, se quem percorre pedir o próximo grupo, as dos outros clusters.
+        Sem requisitante (escrita externa, back-invalidation da LLC) vem um único grupo.
+        """
+        filtro = barramento.diretorio is None
+        if filtro:
+            presentes = sorted(self.presenca.get(inicio, ()))
+            candidatas = None
+        else:
+            candidatas = barramento._candidatos(inicio, leitura)
+
+        cluster = self.cluster_de.get(id_requisitante) if id_requisitante is not None else None
+        if cluster is None:
+            if filtro:
+                yield [cache for outro in presentes for cache in self.membros[outro]]
+            else:
+                yield candidatas
+            return
+
+        contadores = self.contadores[cluster]
+        contadores.transacoes += 1
+        if filtro:
+            yield self.membros[cluster]
+            remotos = [outro for outro in presentes if outro != cluster]
+        else:
+            yield [cache for cache in candidatas if self.cluster_de[cache.id] == cluster]
+            remotos = sorted({self.cluster_de[cache.id] for cache in candidatas} - {cluster})
+        if not remotos:
+            return
+
+        contadores.transacoes_remotas += 1
+        for outro in remotos:
+            self.contadores[outro].snoops_recebidos += 1
+        if filtro:
+            yield [cache for outro in remotos for cache in self.membros[outro]]
+            # Os clusters consultados que não tinham cópia válida saem do filtro
+            for outro in remotos:
+                if not any(self._tem_copia(cache, inicio) for cache in self.membros[outro]):
+                    self.presenca[inicio].discard(outro)
+        else:
+            yield [cache for cache in candidatas if self.cluster_de[cache.id] != cluster]
+
+    @staticmethod
+    def _tem_copia(cache : Cache, inicio : int) -> bool:
+        linha = cache.buscar_linha(inicio)
+        return linha is not None and linha.estado != Estado.INVALID
+
+    def registrar_leitura(self, inicio : int, id_cache : int, fornecedor : int | None = None) -> None:
+        """ A cache *id_cache* recebeu uma cópia do bloco, entregue pela cache *fornecedor* (None = memória). """
+        cluster = self.cluster_de[id_cache]
+        self.presenca.setdefault(inicio, set()).add(cluster)
+        if fornecedor is not None and self.cluster_de[fornecedor] != cluster:
+            self.contadores[cluster].transferencias_remotas += 1
+
+    def registrar_escrita(self, inicio : int, id_cache : int, fornecedor : int | None = None,
+                          invalidacoes_remotas : int = 0) -> None:
+        """ As outras cópias foram invalidadas (*invalidacoes_remotas* delas em outros clusters): só o cluster da *id_cache* tem o bloco. """
+        cluster = self.cluster_de[id_cache]
+        self.presenca[inicio] = {cluster}
+        contadores = self.contadores[cluster]
+        contadores.invalidacoes_remotas += invalidacoes_remotas
+        if fornecedor is not None and self.cluster_de[fornecedor] != cluster:
+            contadores.transferencias_remotas += 1
+
+    def esquecer(self, inicio : int) -> None:
+        """ Todas as cópias do bloco foram invalidadas. """
+        self.presenca.pop(inicio, None)
@@ -0,0 +1,674 @@
+"""
+Motor vetorial de rastros, para populações muito grandes de compradores.
+
+Em vez de um objeto Cache por comprador e um LinhaCache por linha, o conteúdo
+das linhas de todas as caches fica num único array estruturado do NumPy, de forma
+(caches, conjuntos, vias), com ordem de acesso, palavras, autores e palavras usadas;
+as tags e os estados, percorridos em todo snoop, ficam em arrays contíguos por
+conjunto, de forma (conjuntos, caches, vias). A observação (snoop) de um bloco, a invalidação
+das cópias e a busca da dona são operações vetorizadas sobre todas as caches de
+uma vez. O rastro é consumido em lotes: nas sequências de leituras, os acertos são
+classificados e aplicados em bloco, e só as faltas passam pelo barramento uma a uma.
+
+As regras são as do motor de objetos (Cache, Barramento, protocolo, políticas de
+substituição e temporização), e o resultado — RAM, estados das linhas, vencedores e
+contadores — é o mesmo com a mesma configuração; validar() executa os dois e compara.
+Não há LLC, clusters, buffer de escrita, pré-busca, modo concorrente nem histórico neste motor.
+
+Uso:
+    python main.py rastro.txt --vetorial
+    python main.py rastro.txt --validar-vetorial
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import replace
+from typing import Iterable
+from itertools import islice
+from configuracao import Configuracao
+from estatisticas import ContadoresBarramento, ContadoresCache
+from leilao import Leilao
+from moesi import Estado
+from motor import MotorRastro, Resumo
+from protocolo import Protocolo
+from ram import RAM, TAMANHO_PAGINA
+from rastro import Operacao, ler_rastro
+from substituicao import criar_politica
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError: # o NumPy só é necessário para este motor
+    np = None
+
+ESTADOS = tuple(Estado)
+CODIGO = {estado: codigo for codigo, estado in enumerate(ESTADOS)}
+INVALIDO = CODIGO[Estado.INVALID]
+VAZIA = -1 # tag de uma via que nunca recebeu linha
+TAMANHO_LOTE = 4096 # operações do rastro consumidas de cada vez
+
+# Colunas dos contadores por cache: os de ContadoresCache e os ciclos do relógio
+COLUNAS = {nome: coluna for coluna, nome in enumerate((*ContadoresCache.__slots__, "ciclos"))}
+LEITURAS_HIT, LEITURAS_MISS = COLUNAS["leituras_hit"], COLUNAS["leituras_miss"]
+ESCRITAS_HIT, ESCRITAS_MISS = COLUNAS["escritas_hit"], COLUNAS["escritas_miss"]
+SUBSTITUICOES, WRITE_BACKS, CICLOS = COLUNAS["substituicoes"], COLUNAS["write_backs"], COLUNAS["ciclos"]
+
+
+class MotorVetorial():
+    def __init__(self, config : Configuracao | None = None, capacidade : int = 64):
+        """
+        Inicializa a RAM e o array de linhas de todas as caches, com espaço para *capacidade*
+        compradores (dobrado quando preciso). A *config* segue as regras do Leilao.
+        """
+        if np is None:
+            raise ImportError("O motor vetorial exige o NumPy (pip install numpy).")
+        self.config : Configuracao = config if config is not None else Configuracao()
+        config = self.config
+        if (config.tamanho_llc > 0 or config.clusters > 1 or config.concorrente or config.buffer_escrita
+                or config.prebusca is not None):
+            raise ValueError("O motor vetorial não suporta LLC, clusters, buffer de escrita, pré-busca nem o modo concorrente.")
+        if config.coerencia not in ("broadcast", "diretorio"):
+            raise ValueError(f"Modo de coerência desconhecido: {config.coerencia}")
+        # O diretório só restringe quais caches são consultadas; aqui todas são observadas de uma vez
+
+        vias = config.associatividade if config.associatividade is not None else config.tamanho_cache
+        if vias <= 0 or config.tamanho_cache % vias != 0:
+            raise ValueError(f"Associatividade {vias} inválida para cache de tamanho {config.tamanho_cache}.")
+        criar_politica(config.politica, vias) # valida a política (ex.: PLRU exige potência de 2)
+
+        self.ram : RAM = RAM(config.tamanho_ram, config.semente_ram, config.arquivo_ram)
+        self.tamanho_bloco : int = config.tamanho_bloco
+        self.vias : int = vias
+        self.num_conjuntos : int = config.tamanho_cache // vias
+        self.politica : str = config.politica
+        self.latencias = config.latencias
+
+        # Conteúdo das linhas num array estruturado (cache, conjunto, via); tags e estados, percorridos
+        # em todo snoop, ficam em arrays próprios (conjunto, cache, via), contíguos por conjunto
+        self.tipo_linha = np.dtype([
+            ("ordem", np.int64), ("dados", np.int64, (self.tamanho_bloco,)),
+            ("autores", np.int64, (self.tamanho_bloco,)), ("acessados", np.bool_, (self.tamanho_bloco,)),
+        ])
+        self.linhas = np.zeros((capacidade, self.num_conjuntos, vias), self.tipo_linha)
+        self.tags = np.full((self.num_conjuntos, capacidade, vias), VAZIA, np.int64)
+        self.estados = np.full((self.num_conjuntos, capacidade, vias), INVALIDO, np.int8)
+        self.arvores = np.zeros((capacidade, self.num_conjuntos, max(vias - 1, 1)), np.int8) # bits da PLRU
+        self.contadores_caches = np.zeros((capacidade, len(COLUNAS)), np.int64)
+        self._ligar_campos()
+        self.sorteios : dict[tuple[int, int], random.Random] = {} # (cache, conjunto) -> gerador da política aleatória
+        self.tempo : int = 0 # carimbo da ordem de inserção/acesso (FIFO e LRU)
+
+        self.protocolo : Protocolo = Protocolo(config.protocolo)
+        self._montar_tabelas()
+        self.contadores : ContadoresBarramento = ContadoresBarramento()
+        self.ciclos_sem_processador : int = 0
+        self.write_backs_por_endereco : dict[int, int] = {}
+        self.autores_ram : dict[int, int] = {}
+
+        self.nomes : list[str] = []
+        self.lances = np.zeros(capacidade, np.int64)
+        self.lances_aceitos = np.zeros(capacidade, np.int64)
+        self.encerrados : list[bool] = [] # um por item; o id do item é o seu endereço
+        self.resumo : Resumo = Resumo()
+
+    def _ligar_campos(self) -> None:
+        """ Visões de cada campo do array de linhas, refeitas quando ele cresce. """
+        self.ordem = self.linhas["ordem"]
+        self.dados = self.linhas["dados"]
+        self.autores = self.linhas["autores"]
+        self.acessados = self.linhas["acessados"]
+
+    def _montar_tabelas(self) -> None:
+        """ Tabelas do protocolo indexadas pelo código do estado, para aplicar transições a muitas linhas de uma vez. """
+        protocolo = self.protocolo
+        identidade = np.arange(len(ESTADOS), dtype=np.int8)
+        self.rd_proximo, self.rdx_proximo = identidade.copy(), identidade.copy()
+        self.rd_fornece = np.zeros(len(ESTADOS), np.bool_)
+        self.rd_write_back = np.zeros(len(ESTADOS), np.bool_)
+        self.rdx_fornece = np.zeros(len(ESTADOS), np.bool_)
+        self.sujos = np.zeros(len(ESTADOS), np.bool_)
+        for estado, transicao in protocolo.bus_rd.items():
+            codigo = CODIGO[estado]
+            self.rd_proximo[codigo] = CODIGO[transicao.proximo]
+            self.rd_fornece[codigo] = transicao.fornece
+            self.rd_write_back[codigo] = transicao.write_back
+        for estado, transicao in protocolo.bus_rdx.items():
+            self.rdx_proximo[CODIGO[estado]] = CODIGO[transicao.proximo]
+            self.rdx_fornece[CODIGO[estado]] = transicao.fornece
+        for estado in protocolo.sujos:
+            self.sujos[CODIGO[estado]] = True
+        self.escrita = {CODIGO[estado]: (CODIGO[transicao.proximo], transicao.barramento)
+                        for estado, transicao in protocolo.escrita.items()}
+        self.carga_exclusiva : int = CODIGO[protocolo.carga_exclusiva]
+        self.carga_compartilhada : int = CODIGO[protocolo.carga_compartilhada]
+        self.modificado : int = CODIGO[Estado.MODIFIED]
+
+    # --- cadastro ---
+
+    def adicionar_comprador(self, nome : str) -> int:
+        """ Acrescenta uma cache vazia para o comprador *nome* e retorna o seu id. """
+        id_cache = len(self.nomes)
+        capacidade = len(self.linhas)
+        if id_cache == capacidade:
+            self.linhas = np.concatenate([self.linhas, np.zeros_like(self.linhas)])
+            self.tags = np.concatenate([self.tags, np.full_like(self.tags, VAZIA)], axis=1)
+            self.estados = np.concatenate([self.estados, np.full_like(self.estados, INVALIDO)], axis=1)
+            self.arvores = np.concatenate([self.arvores, np.zeros_like(self.arvores)])
+            self.contadores_caches = np.concatenate([self.contadores_caches, np.zeros_like(self.contadores_caches)])
+            self.lances = np.concatenate([self.lances, np.zeros_like(self.lances)])
+            self.lances_aceitos = np.concatenate([self.lances_aceitos, np.zeros_like(self.lances_aceitos)])
+            self._ligar_campos()
+        self.nomes.append(nome)
+        return id_cache
+
+    def adicionar_item(self, nome : str, preco_inicial : int) -> int:
+        """ Registra um item e escreve o preço inicial na RAM, invalidando as cópias do bloco. """
+        id_item = len(self.encerrados)
+        self.encerrados.append(False)
+        self.escrita_externa(id_item, preco_inicial)
+        return id_item
+
+    # --- endereços, políticas e relógio ---
+
+    def dividir_endereco(self, endereco : int) -> tuple[int, int, int]:
+        """ Divide o *endereco* em (índice do conjunto, tag, deslocamento da palavra no bloco). """
+        bloco, deslocamento = divmod(endereco, self.tamanho_bloco)
+        tag, indice = divmod(bloco, self.num_conjuntos)
+        return indice, tag, deslocamento
+
+    def montar_endereco(self, indice : int, tag : int) -> int:
+        """ Endereço da primeira palavra do bloco de (*indice*, *tag*). """
+        return (tag * self.num_conjuntos + indice) * self.tamanho_bloco
+
+    def cobrar(self, id_cache : int | None, ciclos : int) -> None:
+        if id_cache is None:
+            self.ciclos_sem_processador += ciclos
+        else:
+            self.contadores_caches[id_cache, CICLOS] += ciclos
+
+    def _buscar(self, id_cache : int, indice : int, tag : int) -> int:
+        """ Via do conjunto *indice* da cache com a *tag* (válida ou não), ou -1. """
+        encontradas = np.flatnonzero(self.tags[indice, id_cache] == tag)
+        return int(encontradas[0]) if encontradas.size else -1
+
+    def _inserir(self, id_cache : int, indice : int, via : int) -> None:
+        """ Uma nova linha foi colocada na *via* (política de substituição). """
+        if self.politica in ("fifo", "lru"):
+            self.tempo += 1
+            self.ordem[id_cache, indice, via] = self.tempo
+        elif self.politica == "plru":
+            self._acessar_plru(id_cache, indice, via)
+
+    def _acessar(self, id_cache : int, indice : int, via : int) -> None:
+        """ A linha da *via* foi acessada (hit). """
+        if self.politica == "lru":
+            self.tempo += 1
+            self.ordem[id_cache, indice, via] = self.tempo
+        elif self.politica == "plru":
+            self._acessar_plru(id_cache, indice, via)
+
+    def _acessar_plru(self, id_cache : int, indice : int, via : int) -> None:
+        bits = self.arvores[id_cache, indice]
+        no, inicio, tamanho = 0, 0, self.vias
+        while tamanho > 1:
+            metade = tamanho // 2
+            if via < inicio + metade:
+                bits[no] = 1
+                no = 2 * no + 1
+            else:
+                bits[no] = 0
+                no = 2 * no + 2
+                inicio += metade
+            tamanho = metade
+
+    def _vitima(self, id_cache : int, indice : int) -> int:
+        """ Via a substituir no conjunto cheio, pela política de substituição. """
+        if self.politica in ("fifo", "lru"):
+            return int(self.ordem[id_cache, indice].argmin())
+        if self.politica == "plru":
+            bits = self.arvores[id_cache, indice]
+            no, inicio, tamanho = 0, 0, self.vias
+            while tamanho > 1:
+                metade = tamanho // 2
+                if bits[no] == 0:
+                    no = 2 * no + 1
+                else:
+                    no = 2 * no + 2
+                    inicio += metade
+                tamanho = metade
+            return inicio
+        chave = (id_cache, indice)
+        if chave not in self.sorteios:
+            self.sorteios[chave] = criar_politica("aleatoria", self.vias, f"{id_cache}:{indice}").rng
+        return self.sorteios[chave].randrange(self.vias)
+
+    # --- memória e barramento ---
+
+    def _observar(self, indice : int, tag : int, id_requisitante : int | None):
+        """ Caches (e vias) com cópia válida do bloco, exceto a requisitante: o snoop em todas de uma vez. """
+        total = len(self.nomes)
+        copias = (self.tags[indice, :total] == tag) & (self.estados[indice, :total] != INVALIDO)
+        if id_requisitante is not None:
+            copias[id_requisitante] = False
+        return np.divmod(np.flatnonzero(copias), self.vias)
+
+    def _ler_ram(self, inicio : int):
+        """ Bloco que começa em *inicio*, lido da RAM (palavras sem autor), ou None se o endereço for inválido. """
+        dados = self.ram.ler_bloco(inicio, self.tamanho_bloco)
+        if dados is None:
+            return None
+        return np.frombuffer(dados, np.int64), np.full(self.tamanho_bloco, -1, np.int64)
+
+    def _write_back(self, id_cache : int, inicio : int, indice : int, via : int) -> None:
+        """ Grava na RAM o bloco da linha suja da cache *id_cache*. """
+        autores = self.autores[id_cache, indice, via]
+        for deslocamento in np.flatnonzero(autores >= 0).tolist():
+            self.autores_ram[inicio + deslocamento] = int(autores[deslocamento])
+        self.contadores_caches[id_cache, WRITE_BACKS] += 1
+        self.contadores.write_backs += 1
+        self.write_backs_por_endereco[inicio] = self.write_backs_por_endereco.get(inicio, 0) + 1
+        self.cobrar(id_cache, self.latencias.write_back)
+        self.ram.escrever_bloco(inicio, array("q", self.dados[id_cache, indice, via].tolist()))
+
+    def _invalidar(self, caches, indice : int, vias, deslocamento : int | None) -> int:
+        """ Invalida as cópias observadas; conta as que nunca usaram a palavra escrita. Retorna quantas eram. """
+        if deslocamento is not None:
+            self.contadores.invalidacoes_falso_compartilhamento += int(
+                np.count_nonzero(~self.acessados[caches, indice, vias, deslocamento]))
+        self.estados[indice, caches, vias] = self.rdx_proximo[self.estados[indice, caches, vias]]
+        self.contadores.invalidacoes += len(caches)
+        return len(caches)
+
+    def _alocar(self, id_cache : int, indice : int, tag : int) -> int:
+        """ Reserva uma via para a *tag*, substituindo (com write-back, se suja) uma linha válida só se preciso. """
+        estados = self.estados[indice, id_cache]
+        livres = np.flatnonzero((self.tags[indice, id_cache] == VAZIA) | (estados == INVALIDO))
+        via = int(livres[0]) if livres.size else self._vitima(id_cache, indice)
+
+        estado = estados[via]
+        if estado != INVALIDO:
+            self.contadores_caches[id_cache, SUBSTITUICOES] += 1
+            if self.sujos[estado]:
+                self._write_back(id_cache, self.montar_endereco(indice, int(self.tags[indice, id_cache, via])), indice, via)
+            estados[via] = INVALIDO
+        self.tags[indice, id_cache, via] = tag
+        self._inserir(id_cache, indice, via)
+        return via
+
+    def _preencher(self, id_cache : int, indice : int, via : int, bloco, deslocamento : int, estado : int) -> None:
+        self.dados[id_cache, indice, via], self.autores[id_cache, indice, via] = bloco
+        self.acessados[id_cache, indice, via] = False
+        self.acessados[id_cache, indice, via, deslocamento] = True
+        self.estados[indice, id_cache, via] = estado
+
+    def escrita_externa(self, endereco : int, valor : int) -> None:
+        """ Escrita direta na RAM (cadastro de item): as cópias do bloco são invalidadas antes, com write-back das sujas. """
+        indice, tag, _ = self.dividir_endereco(endereco)
+        caches, vias = self._observar(indice, tag, None)
+        inicio = endereco - endereco % self.tamanho_bloco
+        for cache, via in zip(caches.tolist(), vias.tolist()):
+            if self.sujos[self.estados[indice, cache, via]]:
+                self._write_back(cache, inicio, indice, via)
+        copias = self._invalidar(caches, indice, vias, None)
+        self.cobrar(None, copias * self.latencias.invalidacao + self.latencias.ram_escrita)
+        self.autores_ram.pop(endereco, None)
+        self.ram.escrever(endereco, valor)
+
+    def _bus_rd(self, id_cache : int, indice : int, tag : int, inicio : int):
+        """ Miss de leitura: retorna o bloco (None se o endereço for inválido) e o código do estado da requisitante. """
+        self.contadores.bus_rd += 1
+        latencias = self.latencias
+        caches, vias = self._observar(indice, tag, id_cache)
+        anteriores = self.estados[indice, caches, vias]
+        for posicao in np.flatnonzero(self.rd_write_back[anteriores]).tolist():
+            self._write_back(int(caches[posicao]), inicio, indice, int(vias[posicao]))
+        self.estados[indice, caches, vias] = self.rd_proximo[anteriores]
+
+        fornecedoras = np.flatnonzero(self.rd_fornece[anteriores])
+        if fornecedoras.size:
+            cache, via = caches[fornecedoras[-1]], vias[fornecedoras[-1]]
+            self.contadores.transferencias_cache += 1
+            self.cobrar(id_cache, latencias.barramento + latencias.transferencia)
+            bloco = self.dados[cache, indice, via].copy(), self.autores[cache, indice, via].copy()
+        else:
+            self.contadores.leituras_ram += 1
+            self.cobrar(id_cache, latencias.barramento + latencias.ram_leitura)
+            bloco = self._ler_ram(inicio)
+            if bloco is None:
+                return None, INVALIDO
+        return bloco, self.carga_compartilhada if len(caches) else self.carga_exclusiva
+
+    def _bus_lance(self, id_cache : int, indice : int, tag : int, inicio : int, deslocamento : int, valor : int):
+        """ Compare-and-swap numa transação: retorna (bloco, valor atual); o bloco é None se o lance for recusado. """
+        self.contadores.bus_lance += 1
+        latencias = self.latencias
+        ciclos = latencias.barramento
+        caches, vias = self._observar(indice, tag, id_cache)
+        fornecedoras = np.flatnonzero(self.rdx_fornece[self.estados[indice, caches, vias]])
+        if fornecedoras.size:
+            cache, via = caches[fornecedoras[-1]], vias[fornecedoras[-1]]
+            self.contadores.transferencias_cache += 1
+            ciclos += latencias.transferencia
+            bloco = self.dados[cache, indice, via].copy(), self.autores[cache, indice, via].copy()
+        else:
+            self.contadores.leituras_ram += 1
+            ciclos += latencias.ram_leitura
+            bloco = self._ler_ram(inicio)
+            if bloco is None:
+                self.cobrar(id_cache, ciclos)
+                return None, None
+
+        valor_atual = int(bloco[0][deslocamento])
+        if valor <= valor_atual:
+            self.contadores.lances_recusados += 1
+            self.cobrar(id_cache, ciclos)
+            return None, valor_atual
+        copias = self._invalidar(caches, indice, vias, deslocamento)
+        if copias:
+            self.contadores.transacoes_economizadas += 1
+        self.cobrar(id_cache, ciclos + copias * latencias.invalidacao)
+        return bloco, valor_atual
+
+    # --- acessos dos compradores ---
+
+    def ler(self, id_cache : int, endereco : int) -> int | None:
+        """ Leitura (load) do *endereco* pela cache *id_cache*; retorna o valor ou None se o endereço for inválido. """
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        via = self._buscar(id_cache, indice, tag)
+        self.cobrar(id_cache, self.latencias.hit)
+        if via >= 0 and self.estados[indice, id_cache, via] != INVALIDO:
+            self.contadores_caches[id_cache, LEITURAS_HIT] += 1
+            self._acessar(id_cache, indice, via)
+            self.acessados[id_cache, indice, via, deslocamento] = True
+            return int(self.dados[id_cache, indice, via, deslocamento])
+
+        self.contadores_caches[id_cache, LEITURAS_MISS] += 1
+        if via >= 0:
+            self._inserir(id_cache, indice, via) # reaproveita a via da linha INVALID
+        else:
+            via = self._alocar(id_cache, indice, tag)
+        bloco, estado = self._bus_rd(id_cache, indice, tag, endereco - deslocamento)
+        if bloco is None:
+            return None
+        self._preencher(id_cache, indice, via, bloco, deslocamento, estado)
+        return int(self.dados[id_cache, indice, via, deslocamento])
+
+    def comparar_e_escrever(self, id_cache : int, endereco : int, valor : int) -> tuple[bool, int | None]:
+        """ Escreve *valor* apenas se for maior que o atual; retorna se escreveu e o valor que estava no endereço. """
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        via = self._buscar(id_cache, indice, tag)
+        self.cobrar(id_cache, self.latencias.hit)
+        estado = self.estados[indice, id_cache, via] if via >= 0 else INVALIDO
+        if estado != INVALIDO:
+            valor_atual = int(self.dados[id_cache, indice, via, deslocamento])
+            self._acessar(id_cache, indice, via)
+            self.acessados[id_cache, indice, via, deslocamento] = True
+            if valor <= valor_atual:
+                self.contadores_caches[id_cache, LEITURAS_HIT] += 1
+                return False, valor_atual
+
+            self.contadores_caches[id_cache, ESCRITAS_HIT] += 1
+            proximo, barramento = self.escrita[estado]
+            if barramento:
+                # Linha compartilhada: upgrade, só invalida as outras cópias
+                self.contadores.bus_upgr += 1
+                caches, vias = self._observar(indice, tag, id_cache)
+                copias = self._invalidar(caches, indice, vias, deslocamento)
+                self.cobrar(id_cache, self.latencias.barramento + copias * self.latencias.invalidacao)
+            self.estados[indice, id_cache, via] = proximo
+            self.dados[id_cache, indice, via, deslocamento] = valor
+            self.autores[id_cache, indice, via, deslocamento] = id_cache
+            return True, valor_atual
+
+        bloco, valor_atual = self._bus_lance(id_cache, indice, tag, endereco - deslocamento, deslocamento, valor)
+        if bloco is None:
+            self.contadores_caches[id_cache, LEITURAS_MISS] += 1
+            return False, valor_atual
+        self.contadores_caches[id_cache, ESCRITAS_MISS] += 1
+        if via >= 0:
+            self._inserir(id_cache, indice, via)
+        else:
+            via = self._alocar(id_cache, indice, tag)
+        self._preencher(id_cache, indice, via, bloco, deslocamento, self.modificado)
+        self.dados[id_cache, indice, via, deslocamento] = valor
+        self.autores[id_cache, indice, via, deslocamento] = id_cache
+        return True, valor_atual
+
+    def descobrir_vencedor(self, endereco : int) -> tuple[int | None, int | None]:
+        """
+        Autor e valor atual da palavra do *endereco*: os da cópia suja (M ou O), procurada em
+        todas as caches de uma vez, ou os da RAM, com o autor do último write-back.
+        """
+        indice, tag, deslocamento = self.dividir_endereco(endereco)
+        total = len(self.nomes)
+        donas = (self.tags[indice, :total] == tag) & self.sujos[self.estados[indice, :total]]
+        posicoes = np.flatnonzero(donas)
+        if posicoes.size:
+            cache, via = divmod(int(posicoes[0]), self.vias)
+            autor = int(self.autores[cache, indice, via, deslocamento])
+            valor = int(self.dados[cache, indice, via, deslocamento])
+        else:
+            autor = self.autores_ram.get(endereco, -1)
+            valor = self.ram.ler(endereco)
+        return (autor if autor >= 0 else None), valor
+
+    # --- execução do rastro ---
+
+    def aplicar(self, operacao : Operacao) -> None:
+        """ Executa uma única *operacao*, com as mesmas regras do MotorRastro. """
+        resumo = self.resumo
+        resumo.operacoes += 1
+        resumo.por_tipo[operacao.tipo] = resumo.por_tipo.get(operacao.tipo, 0) + 1
+        tipo, args = operacao
+
+        if tipo in ("ler", "lance"):
+            id_cache, id_item = args[0], args[1]
+            if not (0 <= id_cache < len(self.nomes) and 0 <= id_item < len(self.encerrados)):
+                resumo.invalidas += 1
+                return
+            if tipo == "ler":
+                self.ler(id_cache, id_item)
+                return
+            self.lances[id_cache] += 1
+            valor = args[2]
+            if not self.encerrados[id_item] and valor > 0 and self.comparar_e_escrever(id_cache, id_item, valor)[0]:
+                self.lances_aceitos[id_cache] += 1
+                resumo.lances_aceitos += 1
+            else:
+                resumo.lances_rejeitados += 1
+
+        elif tipo == "item":
+            self.adicionar_item(*args)
+
+        elif tipo == "comprador":
+            self.adicionar_comprador(*args)
+
+        elif tipo == "encerrar":
+            id_item = args[0]
+            if not 0 <= id_item < len(self.encerrados) or self.encerrados[id_item]:
+                resumo.invalidas += 1
+                return
+            autor, preco = self.descobrir_vencedor(id_item)
+            self.encerrados[id_item] = True
+            resumo.vencedores[id_item] = (self.nomes[autor] if autor is not None else None, preco)
+
+        else:
+            resumo.invalidas += 1
+
+    def _leituras(self, operacoes : list[Operacao]) -> None:
+        """
+        Sequência de leituras: os acertos são classificados de uma vez contra o estado do início
+        da sequência e aplicados em bloco; as faltas (e, depois de uma falta, os acessos ao mesmo
+        conjunto da mesma cache, cujo resultado ela pode mudar) passam por ler(), uma a uma.
+        Leituras nunca invalidam as cópias das outras caches, então só a própria falta muda os acertos seguintes.
+        """
+        resumo = self.resumo
+        resumo.operacoes += len(operacoes)
+        resumo.por_tipo["ler"] = resumo.por_tipo.get("ler", 0) + len(operacoes)
+        pares = np.array([operacao.args for operacao in operacoes], np.int64).reshape(-1, 2)
+        validas = ((pares[:, 0] >= 0) & (pares[:, 0] < len(self.nomes)) &
+                   (pares[:, 1] >= 0) & (pares[:, 1] < len(self.encerrados)))
+        resumo.invalidas += int(np.count_nonzero(~validas))
+        caches, enderecos = pares[validas, 0], pares[validas, 1]
+        if not caches.size:
+            return
+
+        blocos, deslocamentos = np.divmod(enderecos, self.tamanho_bloco)
+        tags, indices = np.divmod(blocos, self.num_conjuntos)
+        iguais = (self.tags[indices, caches] == tags[:, None]) & (self.estados[indices, caches] != INVALIDO)
+        falta = ~iguais.any(axis=1)
+        vias = iguais.argmax(axis=1)
+
+        # Acessos precedidos, no mesmo (cache, conjunto), por uma falta da sequência vão para ler()
+        chave = caches * self.num_conjuntos + indices
+        ordem = np.argsort(chave, kind="stable")
+        falta_ordenada = falta[ordem].astype(np.int64)
+        acumulado = np.cumsum(falta_ordenada) - falta_ordenada # faltas antes de cada acesso, na ordem por chave
+        inicio_grupo = np.ones(len(ordem), np.bool_)
+        inicio_grupo[1:] = chave[ordem][1:] != chave[ordem][:-1]
+        antes_do_grupo = np.maximum.accumulate(np.where(inicio_grupo, acumulado, 0))
+        individual = np.empty(len(ordem), np.bool_)
+        individual[ordem] = (falta_ordenada > 0) | (acumulado > antes_do_grupo)
+
+        anterior = 0
+        for posicao in [*np.flatnonzero(individual).tolist(), len(caches)]:
+            if posicao > anterior:
+                self._aplicar_acertos(caches[anterior:posicao], indices[anterior:posicao],
+                                      vias[anterior:posicao], deslocamentos[anterior:posicao])
+            if posicao < len(caches):
+                self.ler(int(caches[posicao]), int(enderecos[posicao]))
+            anterior = posicao + 1
+
+    def _aplicar_acertos(self, caches, indices, vias, deslocamentos) -> None:
+        """ Read hits em bloco: contadores, ciclos, palavras usadas e política de substituição. """
+        np.add.at(self.contadores_caches[:, LEITURAS_HIT], caches, 1)
+        np.add.at(self.contadores_caches[:, CICLOS], caches, self.latencias.hit)
+        self.acessados[caches, indices, vias, deslocamentos] = True
+        if self.politica == "lru":
+            carimbos = self.tempo + 1 + np.arange(len(caches), dtype=np.int64)
+            np.maximum.at(self.ordem, (caches, indices, vias), carimbos) # o último acesso de cada linha prevalece
+            self.tempo += len(caches)
+        elif self.politica == "plru":
+            for cache, indice, via in zip(caches.tolist(), indices.tolist(), vias.tolist()):
+                self._acessar_plru(cache, indice, via)
+
+    def executar(self, operacoes : Iterable[Operacao], tamanho_lote : int = TAMANHO_LOTE) -> Resumo:
+        """ Consome as *operacoes* em lotes de *tamanho_lote* e retorna o resumo acumulado. """
+        inicio = time.perf_counter()
+        operacoes = iter(operacoes)
+        while lote := list(islice(operacoes, tamanho_lote)):
+            posicao = 0
+            while posicao < len(lote):
+                fim = posicao
+                while fim < len(lote) and lote[fim].tipo == "ler":
+                    fim += 1
+                if fim > posicao:
+                    self._leituras(lote[posicao:fim])
+                    posicao = fim
+                else:
+                    self.aplicar(lote[posicao])
+                    posicao += 1
+        self.resumo.duracao += time.perf_counter() - inicio
+        self.medir_tempo()
+        return self.resumo
+
+    def medir_tempo(self) -> None:
+        """ Copia para o resumo o total de ciclos e o AMAT de cada comprador. """
+        contadores = self.contadores_caches[:len(self.nomes)]
+        self.resumo.ciclos = int(contadores[:, CICLOS].sum()) + self.ciclos_sem_processador
+        acessos = contadores[:, [LEITURAS_HIT, LEITURAS_MISS, ESCRITAS_HIT, ESCRITAS_MISS]].sum(axis=1)
+        for nome, ciclos, total in zip(self.nomes, contadores[:, CICLOS].tolist(), acessos.tolist()):
+            self.resumo.amat[nome] = ciclos / total if total else 0.0
+
+    # --- inspeção ---
+
+    def linha(self, id_cache : int, indice : int, via : int) -> tuple[int | None, Estado, list[int] | None, list[int] | None]:
+        """ (tag, estado, palavras, autores) de uma via; tag None se a via está vazia, palavras só se a linha for válida. """
+        tag = int(self.tags[indice, id_cache, via])
+        estado = ESTADOS[self.estados[indice, id_cache, via]]
+        if estado == Estado.INVALID:
+            return (tag if tag != VAZIA else None), estado, None, None
+        return tag, estado, self.dados[id_cache, indice, via].tolist(), self.autores[id_cache, indice, via].tolist()
+
+    def estatisticas(self) -> dict:
+        """ Contadores no formato de estatisticas.coletar (sem matriz de transições). """
+        caches = {}
+        for id_cache, nome in enumerate(self.nomes):
+            contadores = dict(zip(COLUNAS, self.contadores_caches[id_cache].tolist()))
+            acessos = sum(contadores[nome] for nome in ("leituras_hit", "leituras_miss", "escritas_hit", "escritas_miss"))
+            acertos = contadores["leituras_hit"] + contadores["escritas_hit"]
+            contadores["taxa_acerto"] = acertos / acessos if acessos else 0.0
+            contadores["amat"] = contadores["ciclos"] / acessos if acessos else 0.0
+            contadores["lances"] = int(self.lances[id_cache])
+            contadores["lances_aceitos"] = int(self.lances_aceitos[id_cache])
+            caches[nome] = contadores
+        barramento = self.contadores.como_dict()
+        transacoes = barramento["bus_rd"] + barramento["bus_rdx"] + barramento["bus_upgr"] + barramento["bus_lance"]
+        lances = int(self.lances[:len(self.nomes)].sum())
+        return {
+            "caches": caches,
+            "barramento": barramento,
+            "ram": self.ram.contadores.como_dict(),
+            "write_backs_por_endereco": {str(endereco): total for endereco, total in sorted(self.write_backs_por_endereco.items())},
+            "lances": lances,
+            "transacoes_por_lance": transacoes / lances if lances else 0.0,
+            "ciclos": self.resumo.ciclos,
+        }
+
+
+def comparar(leilao : Leilao, resumo : Resumo, motor : MotorVetorial) -> list[str]:
+    """
+    Diferenças entre o motor de objetos (*leilao* e o seu *resumo*) e o *motor* vetorial:
+    conteúdo da RAM, linhas de cada cache, vencedores e contadores. Lista vazia = equivalentes.
+    """
+    diferencas = []
+    tamanho = leilao.ram.tamanho
+    for numero in sorted(set(leilao.ram.paginas_criadas()) | set(motor.ram.paginas_criadas())):
+        inicio = numero * TAMANHO_PAGINA
+        quantidade = min(TAMANHO_PAGINA, tamanho - inicio)
+        if leilao.ram.ler_intervalo(inicio, quantidade) != motor.ram.ler_intervalo(inicio, quantidade):
+            diferencas.append(f"RAM: página {numero} diferente")
+
+    if len(leilao.compradores) != len(motor.nomes):
+        diferencas.append(f"Compradores: {len(leilao.compradores)} != {len(motor.nomes)}")
+    for comprador in leilao.compradores[:len(motor.nomes)]:
+        for indice, conjunto in enumerate(comprador.cache.conjuntos):
+            for via, linha in enumerate(conjunto.vias):
+                if linha.tag is None:
+                    esperada = None, Estado.INVALID, None, None
+                elif linha.estado == Estado.INVALID:
+                    esperada = linha.tag, linha.estado, None, None
+                else:
+                    esperada = linha.tag, linha.estado, linha.dados.tolist(), linha.autores.tolist()
+                obtida = motor.linha(comprador.id, indice, via)
+                if esperada != obtida:
+                    diferencas.append(f"Cache {comprador.id}, conjunto {indice}, via {via}: {esperada} != {obtida}")
+
+    if resumo.vencedores != motor.resumo.vencedores:
+        diferencas.append(f"Vencedores: {resumo.vencedores} != {motor.resumo.vencedores}")
+    if leilao.barramento.contadores.como_dict() != motor.contadores.como_dict():
+        diferencas.append(f"Barramento: {leilao.barramento.contadores.como_dict()} != {motor.contadores.como_dict()}")
+    for comprador in leilao.compradores[:len(motor.nomes)]:
+        esperados = [*comprador.cache.contadores.como_dict().values(), leilao.barramento.relogio.ciclos_de(comprador.id)]
+        obtidos = motor.contadores_caches[comprador.id].tolist()
+        if esperados != obtidos:
+            diferencas.append(f"Contadores da cache {comprador.id}: {esperados} != {obtidos}")
+    if resumo.ciclos != motor.resumo.ciclos:
+        diferencas.append(f"Ciclos: {resumo.ciclos} != {motor.resumo.ciclos}")
+    return diferencas
+
+
+def validar(caminho : str, config : Configuracao, usar_mmap : bool = False) -> list[str]:
+    """
+    Executa o rastro do *caminho* no motor de objetos e no vetorial, partindo da mesma RAM,
+    e retorna as diferenças encontradas por comparar().
+    """
+    if config.arquivo_ram is not None:
+        raise ValueError("A validação não suporta imagem da RAM em arquivo.")
+    if config.semente_ram is None:
+        config = replace(config, semente_ram=random.getrandbits(64)) # os dois motores partem da mesma RAM
+    motor = MotorVetorial(config)
+    motor.executar(ler_rastro(caminho, usar_mmap))
+    leilao = Leilao(config)
+    resumo = MotorRastro(leilao).executar(ler_rastro(caminho, usar_mmap))
+    return comparar(leilao, resumo, motor)